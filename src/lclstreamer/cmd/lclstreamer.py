@@ -10,13 +10,15 @@ from typing import (
 import typer
 from mpi4py import MPI
 from stream.core import Source, stream
-from stream.ops import map, take, tap  # pyright: ignore[reportUnknownVariableType]
+from stream.ops import take, tap  # pyright: ignore[reportUnknownVariableType]
 
+from ..data_handlers.common.fan_out import DataHandlerFanOut
 from ..data_handlers.setup import initialize_data_handlers
 from ..data_serializers.setup import initialize_data_serializer
 from ..event_data_sources.setup import initialize_event_source
 from ..models.parameters import Parameters
 from ..processing_pipelines.setup import initialize_processing_pipeline
+from ..utils.aggregation import MpiStatisticsAggregator
 from ..utils.parameters import load_configuration_parameters
 from ..utils.protocols import (
     DataHandlerProtocol,
@@ -24,12 +26,23 @@ from ..utils.protocols import (
     EventSourceProtocol,
     ProcessingPipelineProtocol,
 )
+from ..utils.statistics import (
+    RateReporter,
+    StageStatistics,
+    stage_statistics_report,
+)
 from ..utils.stream import (
-    clock,
+    message_completion,
+    message_emission,
+    stage_input,
+    stage_output,
+    threaded_stage,
 )
 from ..utils.typing import StrFloatIntNDArray
+from .tune_compression import tune_compression
 
 app = typer.Typer()
+app.command(name="tune-compression")(tune_compression)
 
 
 @stream
@@ -74,23 +87,20 @@ def _filter_incomplete_events(
     print(f"Processed {ev_num + 1} events with {num_dropped} dropped.")
 
 
-def _data_counter(data: bytes) -> int:
+def _print_job_report(job_report: dict[str, int | float]) -> None:
     """
-    Computes the size of the input data
+    Prints a job-wide statistics report
 
     Arguments:
 
-        data: A byte object storing the data
-
-    Returns:
-
-        size: The size of the data in bytes
+        job_report: The job-wide statistics, computed by rank 0
     """
-    return len(data)
+    print(f"[Job] {job_report}", flush=True)
 
 
-@app.command()
+@app.callback(invoke_without_command=True)
 def main(
+    context: typer.Context,
     config: Annotated[
         Path,
         typer.Option(
@@ -113,6 +123,8 @@ def main(
     applications. The event source, data processing, serialization strategy, and
     further data handling are defined by the content of a configuration file
     """
+    if context.invoked_subcommand is not None:
+        return
 
     # 1. Read and recover configuration parameters
     mpi_size: int = MPI.COMM_WORLD.Get_size()
@@ -144,6 +156,47 @@ def main(
     data_handlers: list[DataHandlerProtocol] = initialize_data_handlers(parameters)
     print(f"[Rank {mpi_rank}] Initializing data handlers: Done!")
 
+    threaded: bool = parameters.execution.mode == "threaded"
+
+    event_source_statistics: StageStatistics = StageStatistics("event_source")
+    processing_pipeline_statistics: StageStatistics = StageStatistics(
+        "processing_pipeline"
+    )
+    data_serializer_statistics: StageStatistics = StageStatistics(
+        "data_serializer", details=data_serializer.statistics
+    )
+    data_handlers_statistics: StageStatistics = StageStatistics(
+        "data_handlers",
+        details=lambda: {
+            key: value
+            for data_handler in data_handlers
+            for key, value in data_handler.statistics().items()
+        },
+    )
+    stage_statistics: list[StageStatistics] = [
+        event_source_statistics,
+        processing_pipeline_statistics,
+        data_serializer_statistics,
+        data_handlers_statistics,
+    ]
+    reporter: RateReporter = RateReporter(
+        events=event_source_statistics,
+        messages=data_serializer_statistics,
+        interval_seconds=parameters.reporting.interval_seconds,
+        interval_messages=parameters.reporting.interval_messages,
+        latency_window=parameters.reporting.latency_window,
+    )
+    aggregator: MpiStatisticsAggregator | None = (
+        MpiStatisticsAggregator(
+            events=event_source_statistics,
+            messages=data_serializer_statistics,
+            interval_seconds=parameters.reporting.aggregation_interval_seconds,
+            report=_print_job_report,
+        )
+        if parameters.reporting.aggregation_interval_seconds > 0
+        else None
+    )
+
     workflow: Any = source.get_events()
 
     if num_events > 0:
@@ -152,19 +205,79 @@ def main(
     if parameters.skip_incomplete_events is True:
         workflow >>= _filter_incomplete_events(max_consecutive=1)
 
+    workflow >>= stage_output(statistics=event_source_statistics)
+
+    if threaded:
+        workflow >>= threaded_stage(
+            queue_depth=parameters.execution.event_source_queue_depth,
+            name="event_source",
+        )
+
+    workflow >>= stage_input(statistics=processing_pipeline_statistics)
     workflow >>= processing_pipeline
 
     workflow = Source(workflow)
+    workflow >>= stage_output(statistics=processing_pipeline_statistics)
+
+    if threaded:
+        workflow >>= threaded_stage(
+            queue_depth=parameters.execution.processing_pipeline_queue_depth,
+            name="processing_pipeline",
+        )
+
+    workflow >>= stage_input(statistics=data_serializer_statistics)
     workflow >>= data_serializer
 
     workflow = Source(workflow)
-    data_handler: DataHandlerProtocol
+    workflow >>= stage_output(statistics=data_serializer_statistics)
+    workflow >>= message_emission(reporter=reporter)
+
+    if threaded:
+        workflow >>= threaded_stage(
+            queue_depth=parameters.execution.data_serializer_queue_depth,
+            name="data_serializer",
+        )
+
+    workflow >>= stage_input(statistics=data_handlers_statistics)
+
+    if parameters.execution.concurrent_data_handlers:
+        workflow >>= DataHandlerFanOut(
+            data_handlers,
+            max_in_flight=parameters.execution.data_handler_max_in_flight,
+        )
+        workflow = Source(workflow)
+    else:
+        data_handler: DataHandlerProtocol
+        for data_handler in data_handlers:
+            workflow >>= tap(data_handler)
+
+    workflow >>= stage_output(statistics=data_handlers_statistics)
+    workflow >>= message_completion(reporter=reporter)
+
+    for _ in workflow:
+        if reporter.report_due():
+            print(
+                f"[Rank {mpi_rank}] {reporter.report()} "
+                f"{stage_statistics_report(stage_statistics)}",
+                flush=True,
+            )
+        if aggregator is not None:
+            job_report: dict[str, int | float] | None = aggregator.update()
+            if job_report is not None:
+                _print_job_report(job_report)
+
     for data_handler in data_handlers:
-        workflow >>= tap(data_handler)
+        data_handler.close()
 
-    workflow >>= map(_data_counter)
+    print(
+        f"[Rank {mpi_rank}] Final statistics: {reporter.report()} "
+        f"{stage_statistics_report(stage_statistics)}",
+        flush=True,
+    )
 
-    for stat in workflow >> clock():
-        print(f"[Rank {mpi_rank}] {stat}]", flush=True)
+    if aggregator is not None:
+        final_job_report: dict[str, int | float] | None = aggregator.finalize()
+        if final_job_report is not None:
+            print(f"[Job] Final statistics: {final_job_report}", flush=True)
 
     print(f"[Rank {mpi_rank}] Hello, I'm done now.  Have a most excellent day!")
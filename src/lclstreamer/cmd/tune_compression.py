@@ -0,0 +1,320 @@
+import os
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
+from typing import Annotated, Any, TextIO
+
+import numpy
+import typer
+from bitshuffle import (  # pyright: ignore[reportMissingTypeStubs]
+    compress_lz4,  # pyright: ignore[reportUnknownVariableType]
+)
+from numpy.typing import NDArray
+from yaml import safe_dump, safe_load
+
+from ..data_serializers.files.hdf5 import HDF5BinarySerializer
+from ..data_serializers.generic.multipart import NumpyMultipartSerializer
+from ..event_data_sources.setup import initialize_event_source
+from ..models.parameters import (
+    HDF5BinarySerializerParameters,
+    NumpyMultipartSerializerParameters,
+    Parameters,
+    SimplonBinarySerializerParameters,
+)
+from ..processing_pipelines.setup import initialize_processing_pipeline
+from ..utils.logging import log_error_and_exit
+from ..utils.parameters import load_configuration_parameters
+from ..utils.protocols import (
+    DataSerializerProtocol,
+    EventSourceProtocol,
+    ProcessingPipelineProtocol,
+)
+from ..utils.statistics import data_size
+from ..utils.typing import StrFloatIntNDArray
+
+# Compression algorithms and levels tried for the HDF5 Data Serializer
+_HDF5_CANDIDATES: list[tuple[str | None, int]] = [
+    (None, 0),
+    ("bitshuffle_with_lz4", 0),
+    *(("bitshuffle_with_zstd", level) for level in (1, 3, 5, 9)),
+    *(("gzip", level) for level in (1, 3, 6, 9)),
+    *(("gzip_with_shuffle", level) for level in (1, 3, 6, 9)),
+    ("zfp", 0),
+]
+
+# Compression algorithms and levels tried for the NumPy Multipart Data Serializer
+_NUMPY_MULTIPART_CANDIDATES: list[tuple[str | None, int]] = [
+    (None, 0),
+    ("bitshuffle_with_lz4", 0),
+    *(("bitshuffle_with_zstd", level) for level in (1, 3, 5, 9)),
+]
+
+# Block sizes (in number of elements) tried for the Simplon Data Serializer
+_SIMPLON_BLOCK_SIZES: list[int] = [2**exponent for exponent in range(8, 16)]
+
+
+@dataclass
+class _BenchmarkResult:
+    """
+    Dataclass used to store the result of a compression benchmark
+
+    Attributes:
+
+        setting: A human-readable description of the compression setting
+
+        update: The serializer configuration parameters that select the setting
+
+        rate_per_core: The compression throughput of a single core, in MB/s of
+            uncompressed data
+
+        ratio: The compression ratio (uncompressed size / compressed size)
+    """
+
+    setting: str
+    update: dict[str, Any]
+    rate_per_core: float
+    ratio: float
+
+
+def _sample_batches(
+    parameters: Parameters, num_events: int
+) -> list[dict[str, StrFloatIntNDArray | None]]:
+    # Pulls a sample of events through the event source and the processing pipeline,
+    # and returns the resulting batches. The batches are copied, so that the buffers
+    # of the processing pipeline are released
+
+    source: EventSourceProtocol = initialize_event_source(
+        parameters=parameters, worker_pool_size=1, worker_rank=0
+    )
+    processing_pipeline: ProcessingPipelineProtocol = initialize_processing_pipeline(
+        parameters
+    )
+
+    events: Iterator[dict[str, StrFloatIntNDArray | None]] = islice(
+        iter(source.get_events()), num_events
+    )
+    if parameters.skip_incomplete_events:
+        events = (
+            event
+            for event in events
+            if all(value is not None for value in event.values())
+        )
+
+    return [
+        {
+            name: numpy.array(value) if value is not None else None
+            for name, value in batch.items()
+        }
+        for batch in processing_pipeline(events)
+    ]
+
+
+def _benchmark_serializer(
+    parameters: HDF5BinarySerializerParameters | NumpyMultipartSerializerParameters,
+    batches: list[dict[str, StrFloatIntNDArray | None]],
+) -> list[_BenchmarkResult]:
+    # Serializes the batches with each candidate compression setting of the HDF5 or
+    # NumPy Multipart Data Serializer, in a single process and a single thread
+
+    fields: Iterable[str] | None = parameters.fields
+    uncompressed_bytes: int = sum(
+        data_size(value)
+        for batch in batches
+        for name, value in batch.items()
+        if fields is None or name in fields
+    )
+
+    candidates: list[tuple[str | None, int]] = (
+        _HDF5_CANDIDATES
+        if isinstance(parameters, HDF5BinarySerializerParameters)
+        else _NUMPY_MULTIPART_CANDIDATES
+    )
+    results: list[_BenchmarkResult] = []
+    compression: str | None
+    level: int
+    for compression, level in candidates:
+        update: dict[str, Any] = {"compression": compression}
+        if compression in ("bitshuffle_with_zstd", "gzip", "gzip_with_shuffle"):
+            update["compression_level"] = level
+        setting: str = (
+            f"{compression} (level {level})"
+            if "compression_level" in update
+            else str(compression)
+        )
+        serializer: DataSerializerProtocol
+        if isinstance(parameters, HDF5BinarySerializerParameters):
+            serializer = HDF5BinarySerializer(
+                parameters.model_copy(
+                    update={
+                        **update,
+                        "number_of_worker_processes": 0,
+                        "number_of_compression_threads": 0,
+                        "adaptive_compression": False,
+                    }
+                )
+            )
+        else:
+            serializer = NumpyMultipartSerializer(parameters.model_copy(update=update))
+        start: float = perf_counter()
+        try:
+            compressed_bytes: int = sum(
+                data_size(message) for message in serializer(iter(batches))
+            )
+        except Exception as exception:
+            # Some algorithms (e.g. zfp) do not support all data types
+            print(f"Skipping {setting}: {exception}")
+            continue
+        elapsed: float = max(perf_counter() - start, 1e-9)
+        results.append(
+            _BenchmarkResult(
+                setting=setting,
+                update=update,
+                rate_per_core=uncompressed_bytes / elapsed / 1e6,
+                ratio=uncompressed_bytes / max(compressed_bytes, 1),
+            )
+        )
+
+    return results
+
+
+def _benchmark_simplon(
+    parameters: SimplonBinarySerializerParameters,
+    batches: list[dict[str, StrFloatIntNDArray | None]],
+) -> list[_BenchmarkResult]:
+    # Compresses the frames that the Simplon Data Serializer would encode (every
+    # frame of every batch) with each candidate bitshuffle block size
+
+    frames: list[NDArray[Any]] = [
+        frame
+        for batch in batches
+        if (value := batch.get(parameters.data_source_to_serialize)) is not None
+        for frame in value
+    ]
+    uncompressed_bytes: int = sum(frame.nbytes for frame in frames)
+
+    results: list[_BenchmarkResult] = []
+    block_size: int
+    for block_size in _SIMPLON_BLOCK_SIZES:
+        start: float = perf_counter()
+        compressed_bytes: int = sum(
+            int(compress_lz4(frame, block_size=block_size).nbytes)  # pyright: ignore[reportUnknownArgumentType, reportUnknownMemberType]
+            for frame in frames
+        )
+        elapsed: float = max(perf_counter() - start, 1e-9)
+        results.append(
+            _BenchmarkResult(
+                setting=f"bitshuffle-lz4 (block size {block_size})",
+                update={"compression_block_size": block_size},
+                rate_per_core=uncompressed_bytes / elapsed / 1e6,
+                ratio=uncompressed_bytes / max(compressed_bytes, 1),
+            )
+        )
+
+    return results
+
+
+def _recommend(
+    results: list[_BenchmarkResult], target_throughput: float, cores: int
+) -> _BenchmarkResult:
+    # Returns the setting with the best compression ratio among the ones that reach
+    # the target throughput with the available cores, or the fastest setting if
+    # none of them does
+
+    fast_enough: list[_BenchmarkResult] = [
+        result
+        for result in results
+        if result.rate_per_core * cores >= target_throughput
+    ]
+    if len(fast_enough) == 0:
+        return max(results, key=lambda result: result.rate_per_core)
+    return max(fast_enough, key=lambda result: result.ratio)
+
+
+def tune_compression(
+    config: Annotated[
+        Path,
+        typer.Option(
+            "--config",
+            "-c",
+            help="configuration file (default: lclstreamer.yaml file in the current "
+            "working directory",
+        ),
+    ] = Path("lclstreamer.yaml"),
+    num_events: Annotated[
+        int,
+        typer.Option(
+            "--num-events", "-n", help="number of data events to use as a sample"
+        ),
+    ] = 100,
+    target_throughput: Annotated[
+        float,
+        typer.Option(
+            "--target-throughput",
+            "-t",
+            help="required compression throughput of each worker, in MB/s",
+        ),
+    ] = 0.0,
+    cores: Annotated[
+        int,
+        typer.Option(
+            "--cores",
+            help="number of CPU cores available to each worker (default: the cores "
+            "available to this process)",
+        ),
+    ] = 0,
+    output: Annotated[
+        Path | None,
+        typer.Option(
+            "--output",
+            "-o",
+            help="file where the configuration, updated with the recommended "
+            "setting, is written",
+        ),
+    ] = None,
+) -> None:
+    """
+    Benchmarks the compression settings of the configured Data Serializer on a
+    sample of events, and recommends the setting with the best compression ratio
+    that reaches the target throughput
+    """
+    parameters: Parameters = load_configuration_parameters(filename=config)
+    if cores <= 0:
+        cores = len(os.sched_getaffinity(0))
+
+    print(f"Pulling a sample of {num_events} events....")
+    batches: list[dict[str, StrFloatIntNDArray | None]] = _sample_batches(
+        parameters, num_events
+    )
+    if len(batches) == 0:
+        log_error_and_exit("No data could be retrieved from the event source")
+    print(f"Pulling a sample of {num_events} events: Done ({len(batches)} batches)")
+
+    results: list[_BenchmarkResult]
+    if isinstance(parameters.data_serializer, SimplonBinarySerializerParameters):
+        results = _benchmark_simplon(parameters.data_serializer, batches)
+    else:
+        results = _benchmark_serializer(parameters.data_serializer, batches)
+
+    print(f"{'setting':<40} {'MB/s per core':>14} {'ratio':>8}")
+    result: _BenchmarkResult
+    for result in results:
+        print(
+            f"{result.setting:<40} {result.rate_per_core:>14.1f} {result.ratio:>8.2f}"
+        )
+
+    recommendation: _BenchmarkResult = _recommend(results, target_throughput, cores)
+    print(
+        f"Recommended setting for {target_throughput} MB/s with {cores} cores: "
+        f"{recommendation.setting} ({recommendation.update})"
+    )
+
+    if output is not None:
+        open_file: TextIO
+        with open(config, "r") as open_file:
+            yaml_parameters: dict[str, Any] = safe_load(open_file)
+        yaml_parameters["data_serializer"].update(recommendation.update)
+        with open(output, "w") as open_file:
+            safe_dump(yaml_parameters, open_file, sort_keys=False)
+        print(f"Configuration with the recommended setting written to {output}")
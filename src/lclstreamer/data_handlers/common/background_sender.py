@@ -0,0 +1,210 @@
+import os
+import struct
+from collections import deque
+from collections.abc import Callable
+from pathlib import Path
+from threading import Condition, Thread
+from typing import cast
+
+from ...utils.logging import log
+from ...utils.typing import SerializedData
+from .buffers import message_buffers, write_buffers
+
+# Header of a spill file: whether the message is a multipart message, and the
+# number of buffers in the message. The header is followed by the size of each
+# buffer, and then by the buffers themselves
+_SPILL_HEADER: struct.Struct = struct.Struct("<?I")
+
+
+def _write_spill_file(filename: Path, data: SerializedData) -> int:
+    # Writes a serialized message to a spill file, and returns the size of the file
+
+    buffers: list[memoryview] = message_buffers(data)
+    header: bytes = _SPILL_HEADER.pack(
+        isinstance(data, list), len(buffers)
+    ) + struct.pack(f"<{len(buffers)}Q", *(buffer.nbytes for buffer in buffers))
+    fd: int = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        return write_buffers(fd, [memoryview(header), *buffers])
+    finally:
+        os.close(fd)
+
+
+def _read_spill_file(filename: Path) -> SerializedData:
+    # Reads a serialized message from a spill file written by `_write_spill_file`
+
+    content: memoryview = memoryview(filename.read_bytes())
+    multipart: bool
+    number_of_buffers: int
+    multipart, number_of_buffers = _SPILL_HEADER.unpack_from(content)
+    sizes: tuple[int, ...] = struct.unpack_from(
+        f"<{number_of_buffers}Q", content, _SPILL_HEADER.size
+    )
+    offset: int = _SPILL_HEADER.size + 8 * number_of_buffers
+    buffers: list[memoryview] = []
+    size: int
+    for size in sizes:
+        buffers.append(content[offset : offset + size])
+        offset += size
+    return buffers if multipart else buffers[0]
+
+
+class BackgroundSender:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self,
+        send: Callable[[SerializedData], None],
+        queue_size: int,
+        spill_directory: Path | None = None,
+        max_spill_bytes: int = 0,
+    ) -> None:
+        """
+        Initializes a background sender
+
+        A background thread sends the serialized messages, taking them from a
+        bounded in-memory queue, so that queueing a message returns immediately
+        even when the consumer of the messages is stalled. When the queue is full,
+        and a spill directory is provided, further messages are written to files
+        in the directory, and sent, in order, once the queue has been drained.
+        Without a spill directory (or when the spill files reach their maximum
+        size), queueing a message waits until there is space for it
+
+        Arguments:
+
+            send: The function that sends a serialized message
+
+            queue_size: The maximum number of messages kept in memory
+
+            spill_directory: The directory where the messages that do not fit in
+                the queue are written. If None, messages are never spilled
+
+            max_spill_bytes: The maximum total size of the spill files, in bytes.
+                0 means no limit
+        """
+        self._send: Callable[[SerializedData], None] = send
+        self._queue_size: int = queue_size
+        self._spill_directory: Path | None = spill_directory
+        self._max_spill_bytes: int = max_spill_bytes
+        if self._spill_directory is not None:
+            self._spill_directory.mkdir(exist_ok=True, parents=True)
+
+        self._queue: deque[SerializedData] = deque()
+        self._spilled: deque[tuple[Path, int]] = deque()
+        self._spilled_bytes: int = 0
+        self._spilled_total: int = 0
+        self._spill_counter: int = 0
+        self._closing: bool = False
+        self._condition: Condition = Condition()
+        self._thread: Thread = Thread(
+            target=self._run, name="background_sender", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        # Sends the queued messages, then the spilled ones, until the sender is
+        # closed and there is nothing left to send
+
+        while True:
+            data: SerializedData
+            spill_file: tuple[Path, int] | None = None
+            with self._condition:
+                while (
+                    len(self._queue) == 0
+                    and len(self._spilled) == 0
+                    and not self._closing
+                ):
+                    self._condition.wait()
+                if len(self._queue) > 0:
+                    data = self._queue.popleft()
+                    self._condition.notify_all()
+                elif len(self._spilled) > 0:
+                    # The spill file stays in the list until it has been sent, so
+                    # that new messages keep being spilled behind it
+                    spill_file = self._spilled[0]
+                else:
+                    return
+
+            if spill_file is not None:
+                data = _read_spill_file(spill_file[0])
+            try:
+                self._send(data)
+            except Exception as err:
+                log.error(f"Background sending failed: {err}")
+            del data
+
+            if spill_file is not None:
+                spill_file[0].unlink()
+                with self._condition:
+                    self._spilled.popleft()
+                    self._spilled_bytes -= spill_file[1]
+                    self._condition.notify_all()
+
+    def _spill_allowed(self) -> bool:
+        # Checks whether a new message can be written to a spill file. Must be
+        # called while holding the lock
+
+        return self._spill_directory is not None and (
+            self._max_spill_bytes == 0 or self._spilled_bytes < self._max_spill_bytes
+        )
+
+    def __call__(self, data: SerializedData) -> None:
+        """
+        Queues a serialized message for sending
+
+        Arguments:
+
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
+        """
+        with self._condition:
+            while True:
+                # Once messages have been spilled, new messages are spilled behind
+                # them, so that they are sent in order
+                if len(self._spilled) == 0 and len(self._queue) < self._queue_size:
+                    self._queue.append(data)
+                    self._condition.notify_all()
+                    return
+                if self._spill_allowed():
+                    break
+                self._condition.wait()
+
+        filename: Path = (
+            cast(Path, self._spill_directory)
+            / f"{os.getpid()}_{self._spill_counter}.spill"
+        )
+        self._spill_counter += 1
+        size: int = _write_spill_file(filename, data)
+        with self._condition:
+            self._spilled.append((filename, size))
+            self._spilled_bytes += size
+            self._spilled_total += 1
+            self._condition.notify_all()
+
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns the statistics of the sender
+
+        Returns:
+
+            statistics: The number of messages in the in-memory queue, the number
+                of messages currently spilled to disk, and the total number of
+                messages that have been spilled
+        """
+        return {
+            "send_queue": len(self._queue),
+            "spilled": len(self._spilled),
+            "spilled_total": self._spilled_total,
+        }
+
+    def close(self) -> None:
+        """
+        Waits until all the queued and spilled messages have been sent, then stops
+        the background thread
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
@@ -0,0 +1,55 @@
+import os
+
+from ...utils.typing import SerializedData
+
+# Maximum number of buffers that can be passed to a single writev call
+_IOV_MAX: int = os.sysconf("SC_IOV_MAX") if "SC_IOV_MAX" in os.sysconf_names else 1024
+
+
+def message_buffers(data: SerializedData) -> list[memoryview]:
+    """
+    Returns the buffers of a serialized message as flat byte views
+
+    Arguments:
+
+        data: A serialized message: a buffer, or a list of buffers forming a
+            multipart message
+
+    Returns:
+
+        buffers: A list of byte views of the buffers of the message, without
+            copying them
+    """
+    if isinstance(data, list):
+        return [memoryview(part).cast("B") for part in data]
+    return [memoryview(data).cast("B")]
+
+
+def write_buffers(fd: int, buffers: list[memoryview]) -> int:
+    """
+    Writes buffers one after the other to a file descriptor, with scatter-gather
+    writes, without joining them
+
+    Partial writes are resumed until all the data is written
+
+    Arguments:
+
+        fd: An open file descriptor
+
+        buffers: The buffers to write
+
+    Returns:
+
+        size: The number of bytes written
+    """
+    pending: list[memoryview] = [buffer for buffer in buffers if buffer.nbytes > 0]
+    total: int = 0
+    while len(pending) > 0:
+        written: int = os.writev(fd, pending[:_IOV_MAX])
+        total += written
+        while written > 0 and written >= pending[0].nbytes:
+            written -= pending[0].nbytes
+            pending.pop(0)
+        if written > 0:
+            pending[0] = pending[0][written:]
+    return total
@@ -0,0 +1,135 @@
+import asyncio
+from collections.abc import AsyncGenerator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from ...utils.protocols import DataHandlerProtocol
+from ...utils.typing import SerializedData
+
+
+class DataHandlerFanOut:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self, data_handlers: list[DataHandlerProtocol], max_in_flight: int
+    ) -> None:
+        """
+        Initializes a concurrent fan-out of serialized data to data handlers
+
+        Each serialized message is handed to all the data handlers at the same
+        time. Each data handler runs in its own thread, and processes the
+        messages one at a time, in the order in which they were produced. A
+        message is considered handled only when all the data handlers are done
+        with it
+
+        The number of messages in flight is bounded separately for each data
+        handler: a fast data handler keeps processing new messages while a slow
+        one works through its own backlog, and the stream only waits when a data
+        handler has reached its bound
+
+        Arguments:
+
+            data_handlers: The data handlers that receive the serialized messages
+
+            max_in_flight: The maximum number of serialized messages that each data
+                handler can have queued or in progress at any time
+        """
+        self._data_handlers: list[DataHandlerProtocol] = data_handlers
+        self._max_in_flight: int = max_in_flight
+        self._executors: list[ThreadPoolExecutor] = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="data_handler")
+            for _ in data_handlers
+        ]
+
+    async def _dispatch(
+        self, data: SerializedData, slots: list[asyncio.Semaphore]
+    ) -> asyncio.Future[list[None]]:
+        # Hands a serialized message to all data handlers, each as soon as it has a
+        # free slot, and returns a future that completes when all of them are done
+        # with it
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        handled: list[asyncio.Future[None]] = []
+        executor: ThreadPoolExecutor
+        data_handler: DataHandlerProtocol
+        handler_slots: asyncio.Semaphore
+        for executor, data_handler, handler_slots in zip(
+            self._executors, self._data_handlers, slots
+        ):
+            await handler_slots.acquire()
+            handler_future: asyncio.Future[None] = loop.run_in_executor(
+                executor, data_handler, data
+            )
+            handler_future.add_done_callback(partial(_release, handler_slots))
+            handled.append(handler_future)
+        return asyncio.gather(*handled)
+
+    async def _fan_out(
+        self, byte_stream: Iterator[SerializedData]
+    ) -> AsyncGenerator[SerializedData]:
+        # Dispatches the serialized messages in a stream concurrently, yielding them
+        # in order as soon as all data handlers are done with them
+
+        slots: list[asyncio.Semaphore] = [
+            asyncio.Semaphore(self._max_in_flight) for _ in self._data_handlers
+        ]
+        dispatched: asyncio.Queue[
+            tuple[SerializedData, asyncio.Future[list[None]]] | None
+        ] = asyncio.Queue()
+
+        async def dispatch_stream() -> None:
+            # Dispatches the messages one after the other, marking the end of the
+            # stream even if reading from it fails
+            try:
+                data: SerializedData
+                for data in byte_stream:
+                    await dispatched.put((data, await self._dispatch(data, slots)))
+            finally:
+                dispatched.put_nowait(None)
+
+        dispatcher: asyncio.Task[None] = asyncio.ensure_future(dispatch_stream())
+        try:
+            while (message := await dispatched.get()) is not None:
+                await message[1]
+                yield message[0]
+            await dispatcher
+        finally:
+            dispatcher.cancel()
+            await asyncio.gather(dispatcher, return_exceptions=True)
+
+    def __call__(
+        self, byte_stream: Iterator[SerializedData]
+    ) -> Iterator[SerializedData]:
+        """
+        Hands each serialized message in a stream to all data handlers concurrently
+
+        Arguments:
+
+            byte_stream: An iterator of serialized messages
+
+        Yields:
+
+            data: The serialized messages, in their original order, once all the
+                data handlers are done with them
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        handled: AsyncGenerator[SerializedData] = self._fan_out(byte_stream)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(anext(handled))
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(handled.aclose())
+            loop.close()
+            executor: ThreadPoolExecutor
+            for executor in self._executors:
+                executor.shutdown()
+
+
+def _release(slots: asyncio.Semaphore, _: asyncio.Future[None]) -> None:
+    # Frees the slot of a data handler once it is done with a message
+    slots.release()
@@ -1,3 +1,5 @@
+import os
+import time
 from pathlib import Path
 
 from mpi4py import MPI
@@ -6,6 +8,9 @@ from ...models.parameters import (
     BinaryFileWritingDataHandlerParameters,
 )
 from ...utils.protocols import DataHandlerProtocol
+from ...utils.typing import SerializedData
+from ..common.buffers import message_buffers, write_buffers
+from .container import ContainerFileWriter
 
 
 class BinaryFileWritingDataHandler(DataHandlerProtocol):
@@ -35,22 +40,83 @@ class BinaryFileWritingDataHandler(DataHandlerProtocol):
         self._write_directory: Path = data_handler_parameters.write_directory
         self._file_counter: int = 0
 
+        self._container_files: bool = data_handler_parameters.container_files
+        self._max_container_file_size: int = (
+            data_handler_parameters.max_container_file_size
+        )
+        self._max_container_file_duration: float = (
+            data_handler_parameters.max_container_file_duration
+        )
+        self._container_file: ContainerFileWriter | None = None
+        self._container_file_start_time: float = 0.0
+
         self._write_directory.mkdir(exist_ok=True, parents=True)
 
-    def __call__(self, data: bytes) -> None:
+    def _filename(self, extension: str) -> Path:
+        # Returns the path of the next file written by the data handler
+
+        return (
+            self._write_directory
+            / f"{self._prefix}r{self._rank}_{self._file_counter}.{extension}"
+        )
+
+    def _close_container_file(self) -> None:
+        # Closes the current container file, if any, writing its index
+
+        if self._container_file is not None:
+            self._container_file.close()
+            self._container_file = None
+            self._file_counter += 1
+
+    def _append_to_container_file(self, data: SerializedData) -> None:
+        # Appends a serialized message to the current container file, starting a
+        # new container file when the current one is too old or too large
+
+        if (
+            self._container_file is not None
+            and self._max_container_file_duration > 0.0
+            and time.monotonic() - self._container_file_start_time
+            >= self._max_container_file_duration
+        ):
+            self._close_container_file()
+        if self._container_file is None:
+            self._container_file = ContainerFileWriter(
+                self._filename(f"{self._suffix}.container")
+            )
+            self._container_file_start_time = time.monotonic()
+        self._container_file.write(message_buffers(data))
+        if self._container_file.size >= self._max_container_file_size:
+            self._close_container_file()
+
+    def __call__(self, data: SerializedData) -> None:
         """
-        Writes a bytes object to the filesystem as a single file
+        Writes a serialized message to the filesystem as a single file, or appends
+        it to the current container file
+
+        The buffers of a multipart message are written one after the other, with
+        scatter-gather writes, without joining them
 
         Arguments:
 
-            data: A bytes object
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
         """
-        filename: Path = (
-            self._write_directory
-            / f"{self._prefix}r{self._rank}_{self._file_counter}.{self._suffix}"
-        )
+        if self._container_files:
+            self._append_to_container_file(data)
+            return
 
-        with open(filename, "wb") as fh:
-            fh.write(data)
+        filename: Path = self._filename(self._suffix)
+
+        fd: int = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            write_buffers(fd, message_buffers(data))
+        finally:
+            os.close(fd)
 
         self._file_counter += 1
+
+    def close(self) -> None:
+        """
+        Closes the current container file, if any, writing its index
+        """
+        self._close_container_file()
@@ -0,0 +1,243 @@
+import os
+import struct
+from collections.abc import Iterator
+from pathlib import Path
+from types import TracebackType
+
+from ..common.buffers import write_buffers
+
+# Identifier stored at the start of each container file
+CONTAINER_FILE_MAGIC: bytes = b"LCLSCONT"
+
+# Version of the container file format
+CONTAINER_FILE_VERSION: int = 1
+
+# Identifier stored at the end of each container file whose index has been written
+_INDEX_MAGIC: bytes = b"LCLSINDX"
+
+# Header of a container file: identifier, format version, and a reserved field
+_FILE_HEADER: struct.Struct = struct.Struct("<8sII")
+
+# Header of each blob: the size of the blob, in bytes
+_BLOB_HEADER: struct.Struct = struct.Struct("<Q")
+
+# Trailer of a container file: the offset of the index, and an identifier
+_TRAILER: struct.Struct = struct.Struct("<Q8s")
+
+
+def _read(fd: int, size: int, offset: int) -> bytes:
+    # Reads exactly `size` bytes from a file descriptor at the given offset.
+    # Large reads can be split by the operating system
+
+    chunks: list[bytes] = []
+    while size > 0:
+        chunk: bytes = os.pread(fd, size, offset)
+        if len(chunk) == 0:
+            raise EOFError("The container file is truncated")
+        chunks.append(chunk)
+        size -= len(chunk)
+        offset += len(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+class ContainerFileWriter:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(self, filename: Path) -> None:
+        """
+        Initializes a writer of a container file
+
+        A container file stores a sequence of binary blobs, appended one after the
+        other. The file starts with a 16-byte header (the `LCLSCONT` identifier, the
+        version of the format and a reserved field). Each blob is preceded by its
+        size, stored as a little-endian 64-bit integer. When the file is closed, an
+        index is appended: the number of blobs and the offset of each of them, as
+        little-endian 64-bit integers, followed by the offset of the index and the
+        `LCLSINDX` identifier. Container files whose index is missing (because the
+        writer did not close them) can still be read sequentially
+
+        Arguments:
+
+            filename: The path of the container file. An existing file is
+                overwritten
+        """
+        self._fd: int = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._offsets: list[int] = []
+        self._size: int = write_buffers(
+            self._fd,
+            [
+                memoryview(
+                    _FILE_HEADER.pack(CONTAINER_FILE_MAGIC, CONTAINER_FILE_VERSION, 0)
+                )
+            ],
+        )
+
+    @property
+    def size(self) -> int:
+        """
+        The current size of the container file, in bytes
+        """
+        return self._size
+
+    def write(self, buffers: list[memoryview]) -> None:
+        """
+        Appends a blob to the container file
+
+        Arguments:
+
+            buffers: The buffers forming the blob, written one after the other with
+                scatter-gather writes, without joining them
+        """
+        self._offsets.append(self._size)
+        self._size += write_buffers(
+            self._fd,
+            [
+                memoryview(_BLOB_HEADER.pack(sum(buffer.nbytes for buffer in buffers))),
+                *buffers,
+            ],
+        )
+
+    def close(self) -> None:
+        """
+        Appends the index to the container file, and closes it
+        """
+        if self._fd < 0:
+            return
+        index: bytes = struct.pack(
+            f"<Q{len(self._offsets)}Q", len(self._offsets), *self._offsets
+        )
+        self._size += write_buffers(
+            self._fd,
+            [memoryview(index), memoryview(_TRAILER.pack(self._size, _INDEX_MAGIC))],
+        )
+        os.close(self._fd)
+        self._fd = -1
+
+
+class ContainerFileReader:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(self, filename: Path | str) -> None:
+        """
+        Initializes a reader of a container file
+
+        The blobs can be read one after the other, by iterating over the reader, or
+        accessed directly by index, using the index stored at the end of the file.
+        If the index is missing, it is rebuilt by scanning the file
+
+        Arguments:
+
+            filename: The path of the container file
+        """
+        self._fd: int = os.open(filename, os.O_RDONLY)
+        magic: bytes
+        version: int
+        magic, version, _ = _FILE_HEADER.unpack(_read(self._fd, _FILE_HEADER.size, 0))
+        if magic != CONTAINER_FILE_MAGIC:
+            os.close(self._fd)
+            raise ValueError(f"{filename} is not a container file")
+        if version != CONTAINER_FILE_VERSION:
+            os.close(self._fd)
+            raise ValueError(
+                f"{filename} uses version {version} of the container file format, "
+                f"but only version {CONTAINER_FILE_VERSION} is supported"
+            )
+        self._offsets: list[int] = self._read_index()
+
+    def _read_index(self) -> list[int]:
+        # Reads the offsets of the blobs from the index at the end of the file, or
+        # rebuilds them by scanning the file if the index is missing
+
+        file_size: int = os.fstat(self._fd).st_size
+        if file_size >= _FILE_HEADER.size + _TRAILER.size:
+            index_offset: int
+            magic: bytes
+            index_offset, magic = _TRAILER.unpack(
+                _read(self._fd, _TRAILER.size, file_size - _TRAILER.size)
+            )
+            if magic == _INDEX_MAGIC:
+                count: int = _BLOB_HEADER.unpack(
+                    _read(self._fd, _BLOB_HEADER.size, index_offset)
+                )[0]
+                return list(
+                    struct.unpack(
+                        f"<{count}Q",
+                        _read(self._fd, 8 * count, index_offset + _BLOB_HEADER.size),
+                    )
+                )
+
+        offsets: list[int] = []
+        offset: int = _FILE_HEADER.size
+        while offset + _BLOB_HEADER.size <= file_size:
+            size: int = _BLOB_HEADER.unpack(_read(self._fd, _BLOB_HEADER.size, offset))[
+                0
+            ]
+            # A blob cut short by an interrupted write is ignored
+            if offset + _BLOB_HEADER.size + size > file_size:
+                break
+            offsets.append(offset)
+            offset += _BLOB_HEADER.size + size
+        return offsets
+
+    def __len__(self) -> int:
+        """
+        Returns the number of blobs in the container file
+
+        Returns:
+
+            count: The number of blobs
+        """
+        return len(self._offsets)
+
+    def __getitem__(self, index: int) -> bytes:
+        """
+        Reads a blob from the container file
+
+        Arguments:
+
+            index: The position of the blob in the container file
+
+        Returns:
+
+            blob: The content of the blob
+        """
+        offset: int = self._offsets[index]
+        size: int = _BLOB_HEADER.unpack(_read(self._fd, _BLOB_HEADER.size, offset))[0]
+        return _read(self._fd, size, offset + _BLOB_HEADER.size)
+
+    def __iter__(self) -> Iterator[bytes]:
+        """
+        Reads the blobs of the container file, in order
+
+        Yields:
+
+            blob: The content of a blob
+        """
+        index: int
+        for index in range(len(self._offsets)):
+            yield self[index]
+
+    def close(self) -> None:
+        """
+        Closes the container file
+        """
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "ContainerFileReader":
+        """Returns the reader, to be used as a context manager"""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Closes the container file when leaving the context"""
+        self.close()
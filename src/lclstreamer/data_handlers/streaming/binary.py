@@ -1,13 +1,72 @@
+import asyncio
 import sys
 import time
+from collections import deque
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from errno import EHOSTUNREACH
+from threading import Event, Lock, Thread
+from time import perf_counter
+from typing import Any
 
-from zmq import LINGER, PUSH, SNDHWM, Context, Socket, ZMQError
+from pynng import NNGException, Pair1, Pub0, Push0
+from pynng import Socket as NngSocket
+from typing_extensions import Buffer
+from zmq import (
+    IMMEDIATE,
+    LINGER,
+    POLLIN,
+    PUSH,
+    ROUTER,
+    ROUTER_MANDATORY,
+    SNDBUF,
+    SNDHWM,
+    SNDMORE,
+    Context,
+    MessageTracker,
+    NotDone,
+    Socket,
+    ZMQError,
+)
 
 from ...models.parameters import (
     BinaryDataStreamingDataHandlerParameters,
 )
 from ...utils.logging import log
 from ...utils.protocols import DataHandlerProtocol
+from ...utils.statistics import data_size
+from ...utils.typing import SerializedData
+from ..common.background_sender import BackgroundSender
+from ..common.buffers import message_buffers
+
+# Maximum time, in seconds, spent waiting for each message still queued when the
+# socket is closed
+_CLOSE_TIMEOUT: float = 1.0
+
+# Time, in milliseconds, between two checks that the data handler is closing while
+# waiting for consumer credits
+_CREDIT_POLL_INTERVAL: int = 100
+
+# Time, in seconds, between two warnings while waiting for consumer credits
+_CREDIT_WARNING_INTERVAL: float = 10.0
+
+# Maximum number of asynchronous NNG sends that can be pending at the same time
+_MAX_PENDING_NNG_SENDS: int = 2
+
+# Time, in seconds, between two checks that the data handler is closing while
+# waiting for an NNG send to complete
+_NNG_SEND_POLL_INTERVAL: float = 0.1
+
+# Time, in seconds, between two warnings while waiting for an NNG send to complete
+_NNG_SEND_WARNING_INTERVAL: float = 10.0
+
+# NNG socket classes for each socket type
+_NNG_SOCKETS: dict[str, type[NngSocket]] = {
+    "push": Push0,
+    "pub": Pub0,
+    "pair": Pair1,
+}
 
 
 class BinaryDataStreamingDataHandler(DataHandlerProtocol):
@@ -21,28 +80,77 @@ class BinaryDataStreamingDataHandler(DataHandlerProtocol):
         """
         Initializes a Binary Data Streaming Data Handler
 
-        This data handler sends a byte object through a network socket
+        This data handler sends a byte object through a network socket, using
+        either the ZMQ or the NNG library
 
         Arguments:
 
               parameters: The data handler configuration parameters
         """
-        if data_handler_parameters.library == "zmq":
-            self._streaming: BinaryStreamingPushDataHandlerZmq = (
-                BinaryStreamingPushDataHandlerZmq(data_handler_parameters)
+        self._streaming: (
+            BinaryStreamingPushDataHandlerZmq | BinaryStreamingDataHandlerNng
+        )
+        if data_handler_parameters.library == "nng":
+            self._streaming = BinaryStreamingDataHandlerNng(data_handler_parameters)
+        elif data_handler_parameters.socket_type == "router":
+            self._streaming = BinaryStreamingRouterDataHandlerZmq(
+                data_handler_parameters
             )
         else:
             self._streaming = BinaryStreamingPushDataHandlerZmq(data_handler_parameters)
 
-    def __call__(self, data: bytes) -> None:
+        self._background_sender: BackgroundSender | None = None
+        if data_handler_parameters.background_sending:
+            self._background_sender = BackgroundSender(
+                self._streaming,
+                queue_size=data_handler_parameters.send_queue_size,
+                spill_directory=data_handler_parameters.spill_directory,
+                max_spill_bytes=data_handler_parameters.max_spill_bytes,
+            )
+
+    def __call__(self, data: SerializedData) -> None:
         """
-        Forwards a binary object to the underlying streaming transport
+        Forwards a serialized message to the underlying streaming transport, or
+        queues it for the background sender
 
         Arguments:
 
-            data: A bytes object containing serialized event data
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
         """
-        self._streaming(data)
+        if self._background_sender is not None:
+            self._background_sender(data)
+        else:
+            self._streaming(data)
+
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns the statistics of the underlying streaming transport, and of the
+        background sender
+
+        Returns:
+
+            statistics: A dictionary of statistics
+        """
+        if self._background_sender is not None:
+            return {
+                **self._background_sender.statistics(),
+                **self._streaming.statistics(),
+            }
+        return self._streaming.statistics()
+
+    def close(self) -> None:
+        """
+        Waits until the background sender, if any, has sent all the queued
+        messages, then closes the underlying streaming transport
+
+        Once closing has started, the transport stops waiting for consumers
+        indefinitely, so that closing always completes
+        """
+        self._streaming.interrupt()
+        if self._background_sender is not None:
+            self._background_sender.close()
+        self._streaming.close()
 
 
 class BinaryStreamingPushDataHandlerZmq:
@@ -50,6 +158,9 @@ class BinaryStreamingPushDataHandlerZmq:
     See documentation of the `__init__` function
     """
 
+    # Type of the ZMQ socket
+    _socket_type: int = PUSH
+
     def __init__(
         self, data_handler_parameters: BinaryDataStreamingDataHandlerParameters
     ) -> None:
@@ -62,12 +173,26 @@ class BinaryStreamingPushDataHandlerZmq:
                 data_handler
         """
         self.data_handler_parameters = data_handler_parameters
-        self._context: Context[Socket[bytes]] = Context()
-        self._socket: Socket[bytes] = self._context.socket(PUSH)
+        self._context: Context[Socket[bytes]] = Context(
+            io_threads=data_handler_parameters.io_threads
+        )
+        self._socket: Socket[bytes] = self._context.socket(self._socket_type)
         # Set linger to 0 so socket closes immediately without waiting
         self._socket.setsockopt(LINGER, 0)
-        # Queue 5 messages if there is no receiver
-        self._socket.setsockopt(SNDHWM, 5)
+        # Number of messages queued if there is no receiver
+        self._socket.setsockopt(SNDHWM, data_handler_parameters.send_high_water_mark)
+        if data_handler_parameters.send_buffer_size is not None:
+            self._socket.setsockopt(SNDBUF, data_handler_parameters.send_buffer_size)
+        self._socket.setsockopt(IMMEDIATE, int(data_handler_parameters.immediate))
+        # Set when the data handler starts closing
+        self._closing: Event = Event()
+        # Set when a multipart message could only be partially sent
+        self._incomplete_message: bool = False
+        # Trackers of the messages that ZMQ has not finished sending yet. The
+        # messages can be sent by a background thread while the statistics are read
+        # by the main thread
+        self._in_flight: deque[MessageTracker] = deque()
+        self._in_flight_lock: Lock = Lock()
         url: str
         for url in data_handler_parameters.urls:
             try:
@@ -84,21 +209,104 @@ class BinaryStreamingPushDataHandlerZmq:
                 )
                 sys.exit(1)
 
-    def __call__(self, data: bytes) -> None:
+    def _send_frames(self, frames: list[Buffer]) -> None:
+        # Sends a list of buffers as the frames of a multipart message, without
+        # copying them, and keeps track of the message until it has been sent.
+        # Raises a ZMQError if the message cannot be sent. If the sending fails
+        # after some frames have been queued, the socket is left with an incomplete
+        # multipart message, to which any later frame would be appended: a
+        # RuntimeError is raised instead, now and for every later message
+
+        if self._incomplete_message:
+            raise RuntimeError(
+                "The ZMQ socket cannot be used anymore: an earlier multipart message "
+                "could not be sent completely"
+            )
+        trackers: list[MessageTracker] = []
+        index: int = 0
+        try:
+            frame: Buffer
+            for index, frame in enumerate(frames):
+                tracker: MessageTracker | None = self._socket.send(
+                    frame,
+                    flags=SNDMORE if index < len(frames) - 1 else 0,
+                    copy=False,
+                    track=True,
+                )
+                if tracker is not None:
+                    trackers.append(tracker)
+        except ZMQError as err:
+            if index == 0:
+                raise
+            self._incomplete_message = True
+            raise RuntimeError(
+                f"ZMQ Send failed after {index} of {len(frames)} frames of a "
+                f"multipart message: {err}"
+            ) from err
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.append(MessageTracker(*trackers))
+                while len(self._in_flight) > 0 and self._in_flight[0].done:
+                    self._in_flight.popleft()
+
+    def __call__(self, data: SerializedData) -> None:
         """
-        Sends a binary object through the ZMQ socket
+        Sends a serialized message through the ZMQ socket
+
+        The buffers are sent without being copied: ZMQ keeps a reference to each
+        buffer until it has been sent, and then releases it (a buffer taken from a
+        buffer pool by the data serializer goes back to the pool at that point). A
+        list of buffers is sent as the frames of a multipart message. A message
+        that cannot be sent is dropped, and the error is logged. If the sending
+        fails partway through a multipart message, however, the socket cannot be
+        used anymore, and a RuntimeError is raised
 
         Arguments:
 
-            data: A bytes object containing serialized event data
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
         """
         try:
-            self._socket.send(data)
+            self._send_frames(data if isinstance(data, list) else [data])
         except ZMQError as e:
             log.error("ZMQ Send failed: %s", e)
 
+    def interrupt(self) -> None:
+        """
+        Signals that the data handler is closing. Sending a message no longer
+        waits indefinitely for the consumers
+        """
+        self._closing.set()
+
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns the statistics of the socket
+
+        Returns:
+
+            statistics: The number of messages that ZMQ has not finished sending
+        """
+        return {"messages_in_flight": self.messages_in_flight}
+
+    @property
+    def messages_in_flight(self) -> int:
+        """
+        The number of messages that ZMQ has not finished sending yet
+        """
+        with self._in_flight_lock:
+            return sum(not tracker.done for tracker in self._in_flight)
+
     def close(self) -> None:
         """Explicitly close the socket and context with timeout"""
+        try:
+            # Give the messages still queued a chance to reach the network
+            with self._in_flight_lock:
+                in_flight: list[MessageTracker] = list(self._in_flight)
+            tracker: MessageTracker
+            for tracker in in_flight:
+                tracker.wait(timeout=_CLOSE_TIMEOUT)
+        except NotDone:
+            pass
         try:
             self._socket.close(linger=0)
             self._context.term()
@@ -108,3 +316,358 @@ class BinaryStreamingPushDataHandlerZmq:
     def __del__(self) -> None:
         """Cleanup on deletion"""
         self.close()
+
+
+@dataclass
+class _Consumer:
+    # Credits and statistics of a consumer connected to a ROUTER socket
+
+    index: int
+    join_time: float
+    credits: int = 0
+    items: int = 0
+    bytes: int = 0
+    send_times: deque[float] = field(default_factory=deque)
+    acknowledged_items: int = 0
+    acknowledgement_time: float = 0.0
+
+
+class BinaryStreamingRouterDataHandlerZmq(BinaryStreamingPushDataHandlerZmq):
+    """
+    See documentation of the `__init__` function
+    """
+
+    # Type of the ZMQ socket
+    _socket_type: int = ROUTER
+
+    def __init__(
+        self, data_handler_parameters: BinaryDataStreamingDataHandlerParameters
+    ) -> None:
+        """
+        Initializes a ZMQ binary data streaming socket with credit-based load
+        balancing
+
+        Each consumer connects a DEALER socket, and grants credits to the data
+        handler by sending single-frame messages storing a number of credits as a
+        decimal integer (for example, `b"4"`). A consumer first grants as many
+        credits as the number of messages it can accept at the same time, and then
+        grants one credit each time it is done with a message. Each message uses
+        one credit, and is sent to the consumer with the most unused credits. When
+        no consumer has unused credits, sending waits until one grants new
+        credits. Slow consumers therefore receive fewer messages, instead of
+        stalling the data handler when their queue is full
+
+        Arguments:
+
+            data_handler_parameters: The configuration parameters for the streaming
+                data_handler
+        """
+        super().__init__(data_handler_parameters)
+        # Report consumers that have disconnected instead of dropping their messages
+        self._socket.setsockopt(ROUTER_MANDATORY, 1)
+        self._consumers: dict[bytes, _Consumer] = {}
+
+    def _wait_for_credits(self) -> bool:
+        # Waits until a consumer grants credits, logging a warning periodically.
+        # Once the data handler is closing, waits at most `_CLOSE_TIMEOUT` seconds.
+        # Returns False if no credits have been granted
+
+        start_time: float = perf_counter()
+        warning_time: float = start_time + _CREDIT_WARNING_INTERVAL
+        closing_deadline: float | None = None
+        while not self._receive_credits(timeout=_CREDIT_POLL_INTERVAL):
+            now: float = perf_counter()
+            if self._closing.is_set():
+                if closing_deadline is None:
+                    closing_deadline = now + _CLOSE_TIMEOUT
+                elif now >= closing_deadline:
+                    return False
+            if now >= warning_time:
+                log.warning(
+                    "Waiting for consumer credits for "
+                    f"{round(now - start_time)} seconds "
+                    f"({len(self._consumers)} consumers connected)"
+                )
+                warning_time = now + _CREDIT_WARNING_INTERVAL
+        return True
+
+    def _receive_credits(self, timeout: int) -> bool:
+        # Receives the credits granted by the consumers, waiting at most `timeout`
+        # milliseconds for the first grant. Returns True if any message from a
+        # consumer has been received
+
+        received: bool = False
+        while self._socket.poll(timeout, POLLIN) != 0:
+            received = True
+            timeout = 0
+            frames: list[bytes] = self._socket.recv_multipart()
+            try:
+                credits: int = int(frames[-1])
+            except ValueError:
+                log.warning("Ignoring an invalid credit message from a consumer")
+                continue
+            now: float = perf_counter()
+            consumer: _Consumer = self._consumers.setdefault(
+                frames[0], _Consumer(index=len(self._consumers), join_time=now)
+            )
+            consumer.credits += credits
+            # Each credit granted after the initial ones acknowledges a message
+            while credits > 0 and len(consumer.send_times) > 0:
+                consumer.acknowledgement_time += now - consumer.send_times.popleft()
+                consumer.acknowledged_items += 1
+                credits -= 1
+        return received
+
+    def __call__(self, data: SerializedData) -> None:
+        """
+        Sends a serialized message to the consumer with the most unused credits
+
+        The buffers are sent without being copied, as the frames of a multipart
+        message
+
+        Arguments:
+
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
+        """
+        frames: list[Buffer] = data if isinstance(data, list) else [data]
+        self._receive_credits(timeout=0)
+        while True:
+            available: list[tuple[bytes, _Consumer]] = [
+                (identity, consumer)
+                for identity, consumer in self._consumers.items()
+                if consumer.credits > 0
+            ]
+            if len(available) == 0:
+                if not self._wait_for_credits():
+                    log.error(
+                        "Dropping a message: no consumer granted credits before "
+                        "the data handler was closed"
+                    )
+                    return
+                continue
+            identity: bytes
+            consumer: _Consumer
+            identity, consumer = max(
+                available,
+                key=lambda item: (item[1].credits, -len(item[1].send_times)),
+            )
+            try:
+                self._send_frames([identity, *frames])
+            except ZMQError as e:
+                if e.errno != EHOSTUNREACH:
+                    log.error("ZMQ Send failed: %s", e)
+                    return
+                # The consumer has disconnected: its credits are void
+                consumer.credits = 0
+                consumer.send_times.clear()
+                continue
+            consumer.credits -= 1
+            consumer.items += 1
+            consumer.bytes += data_size(data)
+            consumer.send_times.append(perf_counter())
+            return
+
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns the statistics of each consumer
+
+        Returns:
+
+            statistics: For each consumer (numbered in order of connection), the
+                number of messages and MB per second sent to it since it connected,
+                its lag (the number of messages sent to it that it has not
+                acknowledged yet), and the average time it took to acknowledge a
+                message, in milliseconds
+        """
+        statistics: dict[str, int | float] = super().statistics()
+        now: float = perf_counter()
+        consumer: _Consumer
+        for consumer in list(self._consumers.values()):
+            elapsed: float = max(now - consumer.join_time, 1e-9)
+            prefix: str = f"consumer_{consumer.index}"
+            statistics[f"{prefix}_items_per_s"] = round(consumer.items / elapsed, 3)
+            statistics[f"{prefix}_MB_per_s"] = round(consumer.bytes / elapsed / 1e6, 3)
+            statistics[f"{prefix}_lag"] = len(consumer.send_times)
+            statistics[f"{prefix}_ack_ms"] = round(
+                consumer.acknowledgement_time
+                / max(consumer.acknowledged_items, 1)
+                * 1e3,
+                3,
+            )
+        return statistics
+
+
+class BinaryStreamingDataHandlerNng:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self, data_handler_parameters: BinaryDataStreamingDataHandlerParameters
+    ) -> None:
+        """
+        Initializes an NNG binary data streaming socket
+
+        Messages are sent asynchronously: a background thread runs an event loop
+        that performs the sends, so that a message can travel to the network while
+        the next one is being serialized. A limited number of sends can be pending
+        at the same time: when the limit is reached, sending a new message waits for
+        the oldest pending send to complete
+
+        Arguments:
+
+            data_handler_parameters: The configuration parameters for the streaming
+                data_handler
+        """
+        self.data_handler_parameters = data_handler_parameters
+        self._socket: NngSocket = _NNG_SOCKETS[data_handler_parameters.socket_type](
+            send_buffer_size=data_handler_parameters.send_high_water_mark
+        )
+        url: str
+        for url in data_handler_parameters.urls:
+            try:
+                if data_handler_parameters.role == "server":
+                    self._socket.listen(url)
+                else:
+                    # Do not wait for the remote socket: NNG keeps trying to connect
+                    # in the background
+                    self._socket.dial(url, block=False)
+                    # Add delay to allow the connection to fully establish
+                    time.sleep(1.0)
+            except NNGException as err:
+                log.error(
+                    f"Unable to connect to the URL {url} due to the following "
+                    f"error: {err}"
+                )
+                sys.exit(1)
+
+        self._loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self._loop_thread: Thread = Thread(
+            target=self._loop.run_forever, name="nng_send", daemon=True
+        )
+        self._loop_thread.start()
+        self._pending_sends: deque[Future[None]] = deque()
+        # Set when the data handler starts closing, together with the time after
+        # which the sends that have not completed are cancelled
+        self._closing: Event = Event()
+        self._closing_deadline: float = 0.0
+        self._closed: bool = False
+
+    def _complete_send(self, send: Future[None]) -> None:
+        # Waits for an asynchronous send to complete, and reports its errors. The
+        # send completes only when a receiver accepts the message: a warning is
+        # logged periodically while waiting. Once the data handler is closing, the
+        # send is cancelled if it has not completed `_CLOSE_TIMEOUT` seconds after
+        # closing started
+
+        start_time: float = perf_counter()
+        warning_time: float = start_time + _NNG_SEND_WARNING_INTERVAL
+        while True:
+            try:
+                send.result(timeout=_NNG_SEND_POLL_INTERVAL)
+                return
+            except FutureTimeoutError:
+                pass
+            except CancelledError:
+                return
+            except NNGException as e:
+                log.error("NNG Send failed: %s", e)
+                return
+            now: float = perf_counter()
+            if self._closing.is_set() and now >= self._closing_deadline:
+                send.cancel()
+                log.error(
+                    "Dropping a message: no receiver accepted it before the data "
+                    "handler was closed"
+                )
+                return
+            if now >= warning_time:
+                log.warning(
+                    "Waiting for a receiver to accept a message for "
+                    f"{round(now - start_time)} seconds"
+                )
+                warning_time = now + _NNG_SEND_WARNING_INTERVAL
+
+    async def _finish_sends(self) -> None:
+        # Runs on the event loop: waits until all the sends, including the cancelled
+        # ones, have released their NNG operations
+
+        current: asyncio.Task[Any] | None = asyncio.current_task()
+        await asyncio.gather(
+            *(task for task in asyncio.all_tasks() if task is not current),
+            return_exceptions=True,
+        )
+
+    def __call__(self, data: SerializedData) -> None:
+        """
+        Sends a serialized message through the NNG socket
+
+        The message cannot be sent without copying it: the NNG bindings only
+        accept bytes objects, so any other buffer is copied into one, and the NNG
+        library copies each message again before sending it. NNG has no multipart
+        messages: the parts of a multipart message are joined and sent as a single
+        message (sending them as separate messages would let different receivers
+        get the parts of the same message)
+
+        Arguments:
+
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
+        """
+        message: bytes = (
+            data if isinstance(data, bytes) else b"".join(message_buffers(data))
+        )
+        while len(self._pending_sends) >= _MAX_PENDING_NNG_SENDS:
+            self._complete_send(self._pending_sends.popleft())
+        self._pending_sends.append(
+            asyncio.run_coroutine_threadsafe(self._socket.asend(message), self._loop)
+        )
+
+    def interrupt(self) -> None:
+        """
+        Signals that the data handler is closing. The messages that no receiver
+        has accepted `_CLOSE_TIMEOUT` seconds later are dropped
+        """
+        if not self._closing.is_set():
+            self._closing_deadline = perf_counter() + _CLOSE_TIMEOUT
+            self._closing.set()
+
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns the statistics of the socket
+
+        Returns:
+
+            statistics: The number of asynchronous sends that have not completed
+        """
+        return {"pending_sends": len(self._pending_sends)}
+
+    def close(self) -> None:
+        """
+        Waits, for a limited time, for the pending sends, cancels the ones that
+        have not completed, then stops the event loop and closes the socket
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.interrupt()
+        while len(self._pending_sends) > 0:
+            self._complete_send(self._pending_sends.popleft())
+        if self._loop.is_running():
+            # The cancelled sends must release their NNG operations on the event
+            # loop before it stops
+            try:
+                asyncio.run_coroutine_threadsafe(
+                    self._finish_sends(), self._loop
+                ).result(timeout=_CLOSE_TIMEOUT)
+            except FutureTimeoutError:
+                log.warning("Some NNG sends did not finish before closing")
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            self._loop.close()
+        self._socket.close()
+
+    def __del__(self) -> None:
+        """Cleanup on deletion"""
+        self.close()
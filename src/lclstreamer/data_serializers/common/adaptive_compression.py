@@ -0,0 +1,123 @@
+# Weight of the most recent batch in the moving averages of the measurements
+_SMOOTHING: float = 0.3
+
+# Fraction of the time spent waiting for the downstream components above which the
+# data serializer is considered blocked by backpressure
+_BACKPRESSURE_FRACTION: float = 0.5
+
+# Fraction of the time spent serializing above which the data serializer is
+# considered the bottleneck of the data workflow
+_CPU_BOUND_FRACTION: float = 0.8
+
+# Number of consecutive batches that must point in the same direction before the
+# compression level is changed
+_CHANGE_BATCHES: int = 3
+
+
+class AdaptiveCompressionLevel:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(self, initial_level: int, min_level: int, max_level: int) -> None:
+        """
+        Initializes an adaptive compression level controller
+
+        After each batch, the controller receives the time the data serializer
+        spent waiting for the batch to arrive from upstream, the time it spent
+        serializing the batch, and the time the downstream components took to
+        accept the serialized batch (sending it when the data workflow runs
+        sequentially, or the time spent blocked by a full queue when it runs in
+        threaded mode). When most of the time is spent waiting for the downstream
+        components, the network link or the consumer is the bottleneck, and spare
+        CPU time can be traded for bandwidth: the compression level is raised.
+        When most of the time is spent serializing, the CPU is the bottleneck: the
+        compression level is lowered. The level only changes after several
+        consecutive batches agree, and by one step at a time
+
+        Arguments:
+
+            initial_level: The compression level used before any measurement
+
+            min_level: The minimum compression level
+
+            max_level: The maximum compression level
+        """
+        self._min_level: int = min_level
+        self._max_level: int = max_level
+        self._level: int = min(max(initial_level, min_level), max_level)
+        self._downstream_fraction: float | None = None
+        self._serialization_fraction: float | None = None
+        self._pending_change: int = 0
+        self._pending_batches: int = 0
+
+    @property
+    def level(self) -> int:
+        """
+        The current compression level
+        """
+        return self._level
+
+    def _average(self, average: float | None, value: float) -> float:
+        # Updates an exponential moving average with a new value
+
+        if average is None:
+            return value
+        return (1.0 - _SMOOTHING) * average + _SMOOTHING * value
+
+    def update(
+        self, upstream_time: float, serialization_time: float, downstream_time: float
+    ) -> bool:
+        """
+        Updates the compression level with the measurements of the latest batch
+
+        Arguments:
+
+            upstream_time: The time, in seconds, spent waiting for the batch to
+                arrive from upstream
+
+            serialization_time: The time, in seconds, spent serializing the batch
+
+            downstream_time: The time, in seconds, that the downstream components
+                took to accept the serialized batch
+
+        Returns:
+
+            changed: Whether the compression level has changed
+        """
+        total_time: float = upstream_time + serialization_time + downstream_time
+        if total_time <= 0.0:
+            return False
+        self._downstream_fraction = self._average(
+            self._downstream_fraction, downstream_time / total_time
+        )
+        self._serialization_fraction = self._average(
+            self._serialization_fraction, serialization_time / total_time
+        )
+
+        change: int = 0
+        if self._downstream_fraction > _BACKPRESSURE_FRACTION:
+            change = 1
+        elif self._serialization_fraction > _CPU_BOUND_FRACTION:
+            change = -1
+        if change == 0 or not (
+            self._min_level <= self._level + change <= self._max_level
+        ):
+            self._pending_change = 0
+            self._pending_batches = 0
+            return False
+
+        if change != self._pending_change:
+            self._pending_change = change
+            self._pending_batches = 0
+        self._pending_batches += 1
+        if self._pending_batches < _CHANGE_BATCHES:
+            return False
+
+        self._level += change
+        self._pending_change = 0
+        self._pending_batches = 0
+        # The measurements made at the previous level do not apply to the new one
+        self._downstream_fraction = None
+        self._serialization_fraction = None
+        return True
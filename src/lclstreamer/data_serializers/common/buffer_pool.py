@@ -0,0 +1,94 @@
+import weakref
+from threading import Lock
+from typing import Any
+
+import numpy
+from numpy.typing import NDArray
+
+# Maximum ratio between the size of a pooled buffer and the requested size for the
+# pooled buffer to be reused
+_MAX_SIZE_RATIO: int = 2
+
+
+class BufferPool:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(self, max_free_buffers: int = 8) -> None:
+        """
+        Initializes a pool of output buffers
+
+        The pool hands out uninitialized byte arrays. When all the arrays that use
+        the memory of a buffer (the array handed out and all its views, including
+        the ones held by a network library until the data has been sent) have been
+        garbage collected, the memory goes back to the pool, and is reused for a
+        later request of a similar size. This keeps the memory used by the output
+        of a data serializer flat, instead of allocating a new buffer for each
+        message. The pool can be used from several threads
+
+        Arguments:
+
+            max_free_buffers: The maximum number of unused buffers kept in the pool.
+                Buffers released when the pool is full are freed
+        """
+        self._max_free_buffers: int = max_free_buffers
+        self._free_buffers: list[NDArray[numpy.uint8]] = []
+        self._lock: Lock = Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # A copy of the pool sent to another process starts empty, with its own lock
+
+        return {"_max_free_buffers": self._max_free_buffers}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # Rebuilds a pool sent from another process
+
+        self.__init__(max_free_buffers=state["_max_free_buffers"])
+
+    def _release(self, buffer: NDArray[numpy.uint8]) -> None:
+        # Puts a buffer back in the pool. Called when all the arrays that use the
+        # buffer have been garbage collected
+
+        with self._lock:
+            if len(self._free_buffers) < self._max_free_buffers:
+                self._free_buffers.append(buffer)
+
+    def _take(self, size: int) -> NDArray[numpy.uint8]:
+        # Takes from the pool the smallest free buffer that can store the requested
+        # number of bytes without wasting too much memory, or allocates a new,
+        # uninitialized, one
+
+        with self._lock:
+            candidates: list[int] = [
+                index
+                for index, buffer in enumerate(self._free_buffers)
+                if size <= len(buffer) <= max(size, 1) * _MAX_SIZE_RATIO
+            ]
+            if len(candidates) > 0:
+                return self._free_buffers.pop(
+                    min(candidates, key=lambda index: len(self._free_buffers[index]))
+                )
+        return numpy.empty(size, dtype=numpy.uint8)
+
+    def acquire(self, size: int) -> NDArray[numpy.uint8]:
+        """
+        Takes a buffer from the pool
+
+        Arguments:
+
+            size: The size of the buffer, in bytes
+
+        Returns:
+
+            buffer: An uninitialized one-dimensional array of bytes of the
+                requested size
+        """
+        buffer: NDArray[numpy.uint8] = self._take(size)
+        # The array handed out is built on a memoryview of the buffer, so that all
+        # the arrays derived from it keep it (and not the buffer) as their base
+        root: NDArray[numpy.uint8] = numpy.frombuffer(
+            memoryview(buffer), dtype=numpy.uint8
+        )
+        weakref.finalize(root, self._release, buffer)
+        return root[:size]
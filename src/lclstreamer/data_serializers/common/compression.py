@@ -0,0 +1,111 @@
+import struct
+import zlib
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+import numpy
+from bitshuffle import (  # pyright: ignore[reportMissingTypeStubs]
+    compress_lz4,  # pyright: ignore[reportUnknownVariableType]
+    compress_zstd,  # pyright: ignore[reportUnknownVariableType]
+)
+from numpy.typing import NDArray
+
+# Size of the blocks on which bitshuffle operates, in bytes. This matches the
+# default block size of the bitshuffle HDF5 filter
+_BITSHUFFLE_BLOCK_BYTES: int = 8192
+
+ChunkCompressor = Callable[[NDArray[Any]], bytes]
+
+
+def _bitshuffle_block_size(itemsize: int) -> int:
+    # Returns the bitshuffle block size, in number of elements, for the given item
+    # size. Bitshuffle requires the block size to be a multiple of 8
+
+    return max(_BITSHUFFLE_BLOCK_BYTES // itemsize // 8 * 8, 8)
+
+
+def _compress_bitshuffle_lz4(chunk: NDArray[Any], level: int) -> bytes:
+    # Compresses a chunk in the format of the bitshuffle HDF5 filter, with LZ4.
+    # The chunk starts with a header storing the uncompressed size of the chunk (8
+    # bytes) and the block size in bytes (4 bytes), both big endian
+
+    block_size: int = _bitshuffle_block_size(chunk.itemsize)
+    compressed: NDArray[numpy.uint8] = compress_lz4(
+        numpy.ascontiguousarray(chunk), block_size
+    )
+    return (
+        struct.pack(">QI", chunk.nbytes, block_size * chunk.itemsize)
+        + compressed.tobytes()
+    )
+
+
+def _compress_bitshuffle_zstd(chunk: NDArray[Any], level: int) -> bytes:
+    # Compresses a chunk in the format of the bitshuffle HDF5 filter, with Zstd
+
+    block_size: int = _bitshuffle_block_size(chunk.itemsize)
+    compressed: NDArray[numpy.uint8] = compress_zstd(
+        numpy.ascontiguousarray(chunk), block_size, level
+    )
+    return (
+        struct.pack(">QI", chunk.nbytes, block_size * chunk.itemsize)
+        + compressed.tobytes()
+    )
+
+
+def _compress_gzip(chunk: NDArray[Any], level: int) -> bytes:
+    # Compresses a chunk in the format of the HDF5 deflate filter
+
+    return zlib.compress(numpy.ascontiguousarray(chunk), level)
+
+
+def _compress_gzip_with_shuffle(chunk: NDArray[Any], level: int) -> bytes:
+    # Compresses a chunk in the format of the HDF5 shuffle filter followed by the
+    # HDF5 deflate filter. The shuffle filter groups together the n-th bytes of all
+    # items
+
+    shuffled: NDArray[numpy.uint8] = numpy.ascontiguousarray(
+        numpy.ascontiguousarray(chunk)
+        .reshape(-1)
+        .view(numpy.uint8)
+        .reshape(-1, chunk.itemsize)
+        .T
+    )
+    return zlib.compress(shuffled, level)
+
+
+_CHUNK_COMPRESSORS: dict[str, Callable[[NDArray[Any], int], bytes]] = {
+    "gzip": _compress_gzip,
+    "gzip_with_shuffle": _compress_gzip_with_shuffle,
+    "bitshuffle_with_lz4": _compress_bitshuffle_lz4,
+    "bitshuffle_with_zstd": _compress_bitshuffle_zstd,
+}
+
+
+def chunk_compressor(compression: str | None, level: int) -> ChunkCompressor | None:
+    """
+    Returns a function that compresses HDF5 chunks outside of the HDF5 library
+
+    The compressed chunks have exactly the format produced by the corresponding
+    HDF5 filters, so they can be written to a dataset created with those filters
+    using direct chunk writes, and read back through the filters (for example,
+    with hdf5plugin). The compression libraries release the GIL, so chunks can be
+    compressed in parallel by several threads
+
+    Arguments:
+
+        compression: The compression algorithm, with the same names used by the
+            HDF5 Data Serializer
+
+        level: The compression level
+
+    Returns:
+
+        compressor: A function that takes a chunk (a numpy array) and returns the
+            compressed chunk, or None if the algorithm is not supported outside of
+            the HDF5 library
+    """
+    if compression not in _CHUNK_COMPRESSORS:
+        return None
+    # A partial function, unlike a closure, can be sent to worker processes
+    return partial(_CHUNK_COMPRESSORS[compression], level=level)
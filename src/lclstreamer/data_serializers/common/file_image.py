@@ -0,0 +1,200 @@
+import numpy
+from numpy.typing import NDArray
+from typing_extensions import Buffer
+
+from .buffer_pool import BufferPool
+
+# Factor by which the buffer of a file image grows when it is full
+_GROWTH_FACTOR: float = 1.5
+
+
+class FileImage:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self, initial_size: int, buffer_pool: BufferPool | None = None
+    ) -> None:
+        """
+        Initializes an in-memory file image
+
+        A file image is a minimal file-like object (it can be read, written, seeked
+        and truncated) that stores its content in a preallocated buffer. When
+        the size of the content is known in advance, the buffer never needs to
+        grow, and the content can be retrieved, when complete, as a view of the
+        buffer, without copying it. When a buffer pool is provided, the buffer is
+        taken from the pool, and goes back to it when the content is not used
+        anymore
+
+        Arguments:
+
+            initial_size: The initial size of the buffer, in bytes
+
+            buffer_pool: An optional pool from which the buffer is taken
+        """
+        self._buffer_pool: BufferPool | None = buffer_pool
+        self._buffer: NDArray[numpy.uint8] = self._allocate(max(initial_size, 1))
+        self._size: int = 0
+        self._position: int = 0
+
+    def _allocate(self, size: int) -> NDArray[numpy.uint8]:
+        # Allocates an uninitialized buffer, from the pool if there is one
+
+        if self._buffer_pool is not None:
+            return self._buffer_pool.acquire(size)
+        return numpy.empty(size, dtype=numpy.uint8)
+
+    def _reserve(self, size: int) -> None:
+        # Grows the buffer so that it can store at least `size` bytes
+
+        if size > len(self._buffer):
+            new_size: int = max(size, int(len(self._buffer) * _GROWTH_FACTOR))
+            buffer: NDArray[numpy.uint8] = self._allocate(new_size)
+            buffer[: self._size] = self._buffer[: self._size]
+            self._buffer = buffer
+
+    def _fill_gap(self, end: int) -> None:
+        # Zeroes the bytes between the end of the content and `end`, which the
+        # buffer, not being initialized, might not store as zeros
+
+        if end > self._size:
+            self._buffer[self._size : end] = 0
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """
+        Moves the position in the file image
+
+        Arguments:
+
+            offset: The offset of the new position, in bytes
+
+            whence: What the offset refers to: the start of the file image (0), the
+                current position (1), or the end of the file image (2)
+
+        Returns:
+
+            position: The new position
+        """
+        if whence == 0:
+            self._position = offset
+        elif whence == 1:
+            self._position += offset
+        else:
+            self._position = self._size + offset
+        return self._position
+
+    def tell(self) -> int:
+        """
+        Returns the current position in the file image
+
+        Returns:
+
+            position: The current position
+        """
+        return self._position
+
+    def write(self, data: Buffer) -> int:
+        """
+        Writes data at the current position in the file image
+
+        Arguments:
+
+            data: The data to write
+
+        Returns:
+
+            size: The number of bytes written
+        """
+        view: memoryview = memoryview(data).cast("B")
+        end: int = self._position + len(view)
+        self._reserve(end)
+        self._fill_gap(self._position)
+        self._buffer[self._position : end] = numpy.frombuffer(view, dtype=numpy.uint8)
+        self._position = end
+        self._size = max(self._size, end)
+        return len(view)
+
+    def readinto(self, data: Buffer) -> int:
+        """
+        Reads data from the current position in the file image into a buffer
+
+        Arguments:
+
+            data: The buffer that receives the data
+
+        Returns:
+
+            size: The number of bytes read
+        """
+        view: memoryview = memoryview(data).cast("B")
+        size: int = max(min(len(view), self._size - self._position), 0)
+        view[:size] = self._buffer[self._position : self._position + size]
+        self._position += size
+        return size
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Reads data from the current position in the file image
+
+        Arguments:
+
+            size: The maximum number of bytes to read. If negative, all the data up
+                to the end of the file image is read
+
+        Returns:
+
+            data: The data read
+        """
+        end: int = self._size if size < 0 else min(self._position + size, self._size)
+        data: bytes = self._buffer[self._position : end].tobytes()
+        self._position = max(end, self._position)
+        return data
+
+    def truncate(self, size: int | None = None) -> int:
+        """
+        Resizes the file image
+
+        Arguments:
+
+            size: The new size of the file image, in bytes. If None, the current
+                position is used
+
+        Returns:
+
+            size: The new size of the file image
+        """
+        if size is None:
+            size = self._position
+        self._reserve(size)
+        self._fill_gap(size)
+        self._size = size
+        return size
+
+    def flush(self) -> None:
+        """
+        Does nothing: the content of a file image is always up to date
+        """
+        pass
+
+    def __len__(self) -> int:
+        """
+        Returns the size of the content of the file image
+
+        Returns:
+
+            size: The size of the content, in bytes
+        """
+        return self._size
+
+    def getbuffer(self) -> memoryview:
+        """
+        Returns the content of the file image, without copying it
+
+        After calling this function, the file image must not be written anymore
+
+        Returns:
+
+            content: A read-only view of the content of the file image
+        """
+        return memoryview(self._buffer[: self._size]).toreadonly()
@@ -0,0 +1,313 @@
+import atexit
+import multiprocessing
+import os
+import pickle
+from collections.abc import Iterable, Iterator
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from multiprocessing.queues import Queue
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any
+
+import numpy
+
+from ...utils.typing import StrFloatIntNDArray
+
+# Arrays are placed in shared memory at offsets that are multiples of this value
+_ALIGNMENT: int = 64
+
+# Layout of an array in a shared memory block: name, dtype, shape, offset
+_ArrayLayout = tuple[str, str, tuple[int, ...], int]
+
+# Time, in seconds, between two checks that the worker processes are still running
+# while waiting for a result
+_POLL_INTERVAL: float = 1.0
+
+
+class _WorkerFailure:
+    # Carries an exception raised in a worker process over to the parent process
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception: BaseException = exception
+
+
+def _aligned(size: int) -> int:
+    # Rounds a size up to the next multiple of the shared memory alignment
+
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def _pickled_result(sequence_number: int, result: Any) -> bytes:
+    # Pickles the result of a task. A result, or an exception, that cannot be
+    # pickled is replaced by an exception describing the problem, so that the parent
+    # process always receives an answer
+
+    try:
+        return pickle.dumps((sequence_number, result), protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as exception:
+        return pickle.dumps(
+            (
+                sequence_number,
+                _WorkerFailure(
+                    RuntimeError(
+                        "The result of a worker process cannot be sent to the parent "
+                        f"process: {exception!r} (result: {result!r:.200})"
+                    )
+                ),
+            )
+        )
+
+
+def _worker_loop(
+    instance: Any,
+    method_name: str,
+    tasks: "Queue[Any]",
+    results: Connection,
+) -> None:
+    # Runs in a worker process: rebuilds the arrays of each task from shared memory,
+    # calls the requested method of the serializer, and sends the result back
+
+    attached: dict[int, SharedMemory] = {}
+    method: Any = getattr(instance, method_name)
+
+    while (task := tasks.get()) is not None:
+        sequence_number: int
+        slot: int
+        block_name: str
+        layout: list[_ArrayLayout]
+        other_values: dict[str, Any]
+        extra_arguments: tuple[Any, ...]
+        (
+            sequence_number,
+            slot,
+            block_name,
+            layout,
+            other_values,
+            extra_arguments,
+        ) = task
+        try:
+            if slot not in attached or attached[slot].name != block_name:
+                if slot in attached:
+                    attached[slot].close()
+                attached[slot] = SharedMemory(name=block_name)
+            buffer: memoryview = attached[slot].buf
+            data: dict[str, Any] = dict(other_values)
+            name: str
+            dtype: str
+            shape: tuple[int, ...]
+            offset: int
+            for name, dtype, shape, offset in layout:
+                data[name] = numpy.ndarray(
+                    shape, dtype=numpy.dtype(dtype), buffer=buffer, offset=offset
+                )
+            result: Any = method(data, *extra_arguments)
+            del data
+        except BaseException as exception:
+            result = _WorkerFailure(exception)
+        results.send_bytes(_pickled_result(sequence_number, result))
+        del result
+
+    block_to_close: SharedMemory
+    for block_to_close in attached.values():
+        block_to_close.close()
+
+
+class SharedMemoryProcessPool:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(self, instance: Any, method_name: str, num_workers: int) -> None:
+        """
+        Initializes a pool of worker processes that serialize data in parallel
+
+        The worker processes are started as new processes (they are not forked,
+        because forking a process that has initialized MPI is not supported by
+        several MPI implementations) when the pool is created, and each receives a
+        pickled copy of the instance passed to this function. The worker processes
+        do not initialize MPI. The pool maps one of the methods of the instance over
+        a stream of data dictionaries. The numpy arrays in each dictionary are transferred to the
+        worker processes through shared memory blocks, which are reused from one
+        call to the next, instead of being pickled. If a worker process dies, waiting
+        for a result raises an error instead of blocking forever
+
+        Arguments:
+
+            instance: The object whose method is called in the worker processes
+
+            method_name: The name of the method to call. The method must accept a
+                dictionary of numpy arrays as first argument
+
+            num_workers: The number of worker processes
+        """
+        # The worker processes must share the resource tracker of this process.
+        # Otherwise, each of them would start its own tracker, which would unlink the
+        # shared memory blocks as soon as the worker process exits
+        resource_tracker.ensure_running()
+        context: Any = multiprocessing.get_context("spawn")
+        self._tasks: Queue[Any] = context.Queue()
+        self._max_in_flight: int = 2 * num_workers
+        self._blocks: list[SharedMemory | None] = [None] * self._max_in_flight
+        self._workers: list[BaseProcess] = []
+        self._results: list[Connection] = []
+        # Importing mpi4py in the worker processes must not initialize MPI
+        previous_setting: str | None = os.environ.get("MPI4PY_RC_INITIALIZE")
+        os.environ["MPI4PY_RC_INITIALIZE"] = "false"
+        try:
+            for _ in range(num_workers):
+                receiver: Connection
+                sender: Connection
+                receiver, sender = context.Pipe(duplex=False)
+                worker: BaseProcess = context.Process(
+                    target=_worker_loop,
+                    args=(instance, method_name, self._tasks, sender),
+                    daemon=True,
+                )
+                worker.start()
+                sender.close()
+                self._workers.append(worker)
+                self._results.append(receiver)
+        finally:
+            if previous_setting is None:
+                del os.environ["MPI4PY_RC_INITIALIZE"]
+            else:
+                os.environ["MPI4PY_RC_INITIALIZE"] = previous_setting
+        self._closed: bool = False
+        atexit.register(self.close)
+
+    def _block_for(self, slot: int, size: int) -> SharedMemory:
+        # Returns the shared memory block for a slot, replacing it if it is too small
+
+        block: SharedMemory | None = self._blocks[slot]
+        if block is None or block.size < size:
+            if block is not None:
+                block.close()
+                block.unlink()
+            block = SharedMemory(create=True, size=max(_aligned(size * 5 // 4), 1))
+            self._blocks[slot] = block
+        return block
+
+    def _submit(
+        self,
+        sequence_number: int,
+        data: dict[str, StrFloatIntNDArray | None],
+        extra_arguments: tuple[Any, ...],
+    ) -> None:
+        # Copies the arrays in a data dictionary to shared memory and queues a task
+
+        layout: list[_ArrayLayout] = []
+        other_values: dict[str, Any] = {}
+        size: int = 0
+        name: str
+        value: StrFloatIntNDArray | None
+        for name, value in data.items():
+            if isinstance(value, numpy.ndarray) and not value.dtype.hasobject:
+                layout.append((name, value.dtype.str, value.shape, size))
+                size = _aligned(size + value.nbytes)
+            else:
+                other_values[name] = value
+
+        slot: int = sequence_number % self._max_in_flight
+        block: SharedMemory = self._block_for(slot, size)
+        dtype: str
+        shape: tuple[int, ...]
+        offset: int
+        for name, dtype, shape, offset in layout:
+            numpy.ndarray(
+                shape, dtype=numpy.dtype(dtype), buffer=block.buf, offset=offset
+            )[...] = data[name]
+
+        self._tasks.put(
+            (sequence_number, slot, block.name, layout, other_values, extra_arguments)
+        )
+
+    def map(self, items: Iterable[tuple[Any, ...]]) -> Iterator[Any]:
+        """
+        Calls the pool method on each item in parallel, returning results in order
+
+        Arguments:
+
+            items: An iterable of tuples. The first element of each tuple is a data
+                dictionary, the rest are extra arguments passed to the method
+
+        Yields:
+
+            result: The return values of the method, in the order of the items
+        """
+        next_to_submit: int = 0
+        next_to_yield: int = 0
+        completed: dict[int, Any] = {}
+
+        item: tuple[Any, ...]
+        for item in items:
+            if next_to_submit - next_to_yield >= self._max_in_flight:
+                yield self._collect(next_to_yield, completed)
+                next_to_yield += 1
+            self._submit(next_to_submit, item[0], tuple(item[1:]))
+            next_to_submit += 1
+
+        while next_to_yield < next_to_submit:
+            yield self._collect(next_to_yield, completed)
+            next_to_yield += 1
+
+    def _check_workers(self) -> None:
+        # Raises an error if a worker process has stopped
+
+        worker: BaseProcess
+        for worker in self._workers:
+            if not worker.is_alive():
+                raise RuntimeError(
+                    f"A serialization worker process (pid {worker.pid}) stopped "
+                    f"unexpectedly, with exit code {worker.exitcode}"
+                )
+
+    def _collect(self, sequence_number: int, completed: dict[int, Any]) -> Any:
+        # Waits for the result of a specific task, storing the results of other
+        # tasks that complete in the meantime. Checks regularly that the worker
+        # processes are still running
+
+        while sequence_number not in completed:
+            ready: list[Any] = wait(self._results, timeout=_POLL_INTERVAL)
+            if len(ready) == 0:
+                self._check_workers()
+            connection: Connection
+            for connection in ready:
+                try:
+                    message: bytes = connection.recv_bytes()
+                except EOFError:
+                    self._check_workers()
+                    raise RuntimeError(
+                        "A serialization worker process closed its connection"
+                    ) from None
+                received_number: int
+                result: Any
+                received_number, result = pickle.loads(message)
+                completed[received_number] = result
+        result = completed.pop(sequence_number)
+        if isinstance(result, _WorkerFailure):
+            raise result.exception
+        return result
+
+    def close(self) -> None:
+        """
+        Stops the worker processes and releases the shared memory blocks
+        """
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._tasks.put(None)
+        worker: BaseProcess
+        for worker in self._workers:
+            worker.join(timeout=5.0)
+            if worker.is_alive():
+                worker.terminate()
+        connection: Connection
+        for connection in self._results:
+            connection.close()
+        block: SharedMemory | None
+        for block in self._blocks:
+            if block is not None:
+                block.close()
+                block.unlink()
@@ -1,4 +1,8 @@
+import struct
+from collections import deque
 from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from time import time
 from typing import Any, cast
 
@@ -11,6 +15,7 @@ from cbor import (  # pyright: ignore[reportMissingTypeStubs]
 )
 from mpi4py import MPI
 from numpy.typing import NDArray
+from typing_extensions import Buffer
 
 from ...models.parameters import (
     SimplonBinarySerializerParameters,
@@ -18,6 +23,95 @@ from ...models.parameters import (
 from ...utils.logging import log_error_and_exit, log_info
 from ...utils.protocols import DataSerializerProtocol
 from ...utils.typing import StrFloatIntNDArray
+from ..common.buffer_pool import BufferPool
+from ..common.process_pool import SharedMemoryProcessPool
+
+# Number of frames that can be queued for compression, or compressed, for each
+# compression thread, ahead of the message being emitted
+_FRAMES_IN_FLIGHT_PER_THREAD: int = 2
+
+# CBOR major types used when encoding the image messages
+_CBOR_BYTE_STRING: int = 2
+_CBOR_MAP: int = 5
+
+
+def _cbor(value: Any) -> bytes:
+    # Encodes a value in CBOR format
+
+    return cast(bytes, dumps(value))
+
+
+# CBOR encoding of the keys of the image messages
+_IMAGE_KEYS: dict[str, bytes] = {
+    key: _cbor(key)
+    for key in (
+        "type",
+        "run",
+        "compressed_data",
+        "beam_direction",
+        "photon_energy",
+        "photon_wavelength",
+        "dtype",
+        "sum",
+        "message_id",
+        "timestamp",
+    )
+}
+
+
+def _cbor_head(major_type: int, length: int) -> bytes:
+    # Encodes the head of a CBOR data item: its major type and its length (or
+    # number of entries, for maps)
+
+    if length < 24:
+        return bytes((major_type << 5 | length,))
+    if length < 2**8:
+        return struct.pack(">BB", major_type << 5 | 24, length)
+    if length < 2**16:
+        return struct.pack(">BH", major_type << 5 | 25, length)
+    if length < 2**32:
+        return struct.pack(">BI", major_type << 5 | 26, length)
+    return struct.pack(">BQ", major_type << 5 | 27, length)
+
+
+@dataclass(frozen=True)
+class _ImageMessageTemplate:
+    """
+    Dataclass used to store the parts of the Simplon image messages that are the
+    same for all images
+
+    Attributes:
+
+        has_beam_data: Whether the image messages store beam data
+
+        head: The encoded message prefix, the head of the CBOR map, and the "type"
+            entry, followed by the encoded "run" key
+
+        compressed_data_key: The encoded "compressed_data" key
+    """
+
+    has_beam_data: bool
+    head: bytes
+    compressed_data_key: bytes
+
+
+def _image_message_template(has_beam_data: bool) -> _ImageMessageTemplate:
+    # Pre-encodes the parts of the Simplon image messages that are the same for
+    # all images
+
+    return _ImageMessageTemplate(
+        has_beam_data=has_beam_data,
+        head=b"".join(
+            (
+                b"m",
+                _cbor_head(_CBOR_MAP, 10 if has_beam_data else 7),
+                _IMAGE_KEYS["type"],
+                _cbor("image"),
+                _IMAGE_KEYS["run"],
+            )
+        ),
+        compressed_data_key=_IMAGE_KEYS["compressed_data"],
+    )
 
 
 class SimplonBinarySerializer(DataSerializerProtocol):
@@ -49,149 +143,364 @@ class SimplonBinarySerializer(DataSerializerProtocol):
         self._data_rate: str = parameters.data_collection_rate
         self._detector_name: str = parameters.detector_name
         self._detector_type: str = parameters.detector_type
+        self._compression_block_size: int = parameters.compression_block_size
         self._node_rank: int = MPI.COMM_WORLD.Get_rank()
         self._node_pool_size: int = MPI.COMM_WORLD.Get_size()
         self._rank_message_count: int = 1
+        self._run_number: int = 0
+        # Image message templates, with and without beam data. Each batch selects
+        # its own, and passes it along with the frames that it serializes
+        self._image_templates: dict[bool, _ImageMessageTemplate] = {
+            has_beam_data: _image_message_template(has_beam_data=has_beam_data)
+            for has_beam_data in (False, True)
+        }
+        # Image messages are built in buffers that are reused once the data
+        # handlers have released them
+        self._buffer_pool: BufferPool = BufferPool()
 
-    def __call__(
-        self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
-    ) -> Iterator[bytes]:
-        """
-        Serializes data to a binary blob with an internal Simplon message structure
-
-        Arguments:
-
-            source: A dictionary storing event data
+        self._compression_executor: ThreadPoolExecutor | None = None
+        self._max_frames_in_flight: int = 0
+        if (
+            parameters.number_of_compression_threads > 0
+            and parameters.number_of_worker_processes == 0
+        ):
+            self._compression_executor = ThreadPoolExecutor(
+                max_workers=parameters.number_of_compression_threads,
+                thread_name_prefix="simplon_compression",
+            )
+            self._max_frames_in_flight = (
+                parameters.number_of_compression_threads * _FRAMES_IN_FLIGHT_PER_THREAD
+            )
 
-        Yields:
+        # The worker processes are started here, and receive a copy of this object
+        self._process_pool: SharedMemoryProcessPool | None = None
+        if parameters.number_of_worker_processes > 0:
+            self._process_pool = SharedMemoryProcessPool(
+                instance=self,
+                method_name="_serialize",
+                num_workers=parameters.number_of_worker_processes,
+            )
 
-            byte_block: A bytes object
-        """
+    def _serialization_tasks(
+        self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
+    ) -> Iterator[tuple[dict[str, StrFloatIntNDArray | None], bool, int]]:
+        # Yields the arguments of the `_serialize` calls needed to serialize the
+        # data in a stream, keeping track of the state shared by consecutive messages.
+        # Each data dictionary is a batch, and each frame in the batch gets its own
+        # message number, counted per LCLStreamer worker
 
         must_send_first_message: bool = False
         if self._node_rank == self._node_pool_size - 1:
             must_send_first_message = True
-        run_number: int = 0
 
         data: dict[str, StrFloatIntNDArray | None]
         for data in stream:
-            try:
-                if (data_block := data[self._data_source_to_serialize]) is not None:
-                    array: StrFloatIntNDArray = data_block[-1]
-                else:
-                    continue
-            except KeyError:
-                log_error_and_exit(
-                    f"The {self._data_source_to_serialize} data source, that the "
-                    "SimplonBinarySerializer is supposed to serialize, cannot be found in"
-                    "the data"
+            if (
+                self._data_source_to_serialize in data
+                and data[self._data_source_to_serialize] is None
+            ):
+                continue
+            self._run_number = cast(NDArray[numpy.str_], data["run_info"])[-1][2]
+            yield (
+                data,
+                must_send_first_message,
+                self._rank_message_count,
+            )
+            must_send_first_message = False
+            if (data_block := data.get(self._data_source_to_serialize)) is not None:
+                self._rank_message_count += len(data_block)
+
+    def _message_id(self, message_number: int) -> int:
+        # Computes the message id of the n-th message emitted by this LCLStreamer
+        # worker. The ids of the workers are interleaved, so that they are unique
+        # across all workers, however many messages each of them emits
+
+        return message_number * self._node_pool_size + self._node_rank
+
+    def _start_message(
+        self,
+        data: dict[str, StrFloatIntNDArray | None],
+        array: StrFloatIntNDArray,
+        message_id: int,
+    ) -> bytes:
+        # Serializes a Simplon start message, with the run and detector information
+        # of the first event in a batch
+
+        experiment_data: NDArray[numpy.str_] = cast(
+            NDArray[numpy.str_], data["run_info"]
+        )[0]
+        detector_geometry: NDArray[numpy.str_] = cast(
+            NDArray[numpy.str_], data["detector_geometry"]
+        )[0]
+
+        return b"".join(
+            (
+                b"c",
+                cast(
+                    bytes,
+                    dumps(
+                        {
+                            "type": "start",
+                            "run_number": experiment_data[2],
+                            "start_time": experiment_data[1],
+                            "duration": "N/A",
+                            "beamline": experiment_data[3][4:7].upper(),
+                            "experiment": experiment_data[0],
+                            "beam_type": "X-ray",
+                            "polarization": {
+                                "fraction": self._polarization.get(
+                                    "polarization_fraction", 0
+                                ),
+                                "axis": self._polarization.get(
+                                    "polarization_axis", [0.0, 0.0, 0.0]
+                                ),
+                            },
+                            "data_collection_rate": self._data_rate,
+                            "datatype": str(array.dtype),
+                            "shape": "x".join(map(str, array.shape)),
+                            "algorithm": "bitshuffle-lz4",
+                            "detector": {
+                                "name": self._detector_name,
+                                "id": detector_geometry[0],
+                                "type": self._detector_type,
+                                "geometry": detector_geometry[1],
+                                "pixel_coords": numpy.array(
+                                    detector_geometry[2]
+                                ).tobytes()
+                                if len(detector_geometry) > 2
+                                else "",
+                                "material": "???",
+                                "thickness": "???",
+                            },
+                            "message_id": message_id,
+                            "timestamp": time(),
+                        }
+                    ),
+                ),
+            ),
+        )
+
+    def _image_message(
+        self,
+        data: dict[str, StrFloatIntNDArray | None],
+        template: _ImageMessageTemplate,
+        index: int,
+        array: StrFloatIntNDArray,
+        message_id: int,
+    ) -> NDArray[numpy.uint8]:
+        # Serializes a Simplon image message for the event at the given index in a
+        # batch. The CBOR encoding is assembled from the pre-encoded template of the
+        # batch (with or without beam data): only the values that change from image
+        # to image are encoded, and the compressed data is copied once, straight into
+        # the output buffer
+
+        compressed_data: NDArray[numpy.uint8] = cast(
+            NDArray[numpy.uint8],
+            compress_lz4(array, block_size=self._compression_block_size),
+        )
+
+        head: bytes = b"".join(
+            (
+                template.head,
+                _cbor(cast(NDArray[numpy.str_], data["run_info"])[index][2]),
+                template.compressed_data_key,
+                _cbor_head(_CBOR_BYTE_STRING, compressed_data.nbytes),
+            )
+        )
+
+        tail_parts: list[bytes] = []
+        if template.has_beam_data:
+            beam_data: NDArray[numpy.floating[Any]] = cast(
+                NDArray[numpy.floating[Any]], data["beam_data"]
+            )[index]
+            tail_parts.extend(
+                (
+                    _IMAGE_KEYS["beam_direction"],
+                    _cbor(
+                        {
+                            "angle_x": beam_data[0],
+                            "angle_y": beam_data[1],
+                            "position_x": beam_data[2],
+                            "position_y": beam_data[3],
+                        }
+                    ),
+                    _IMAGE_KEYS["photon_energy"],
+                    _cbor(beam_data[4]),
+                    # data["photon_wavelength"][index]
+                    _IMAGE_KEYS["photon_wavelength"],
+                    _cbor(0),
                 )
+            )
+        tail_parts.extend(
+            (
+                _IMAGE_KEYS["dtype"],
+                _cbor(str(array.dtype)),
+                _IMAGE_KEYS["sum"],
+                _cbor(array.sum().item()),
+                _IMAGE_KEYS["message_id"],
+                _cbor(message_id),
+                _IMAGE_KEYS["timestamp"],
+                _cbor(cast(NDArray[numpy.str_], data["timestamp"])[index]),
+            )
+        )
+        tail: bytes = b"".join(tail_parts)
 
-            if not (
-                numpy.issubdtype(array.dtype, numpy.int_)
-                or numpy.issubdtype(array.dtype, numpy.float64)
-            ):
-                log_error_and_exit(
-                    f"The {self._data_source_to_serialize} data source is not of type int "
-                    "or float, as required by the SimplonBinarySerializer"
+        message: NDArray[numpy.uint8] = self._buffer_pool.acquire(
+            len(head) + compressed_data.nbytes + len(tail)
+        )
+        message[: len(head)] = numpy.frombuffer(head, dtype=numpy.uint8)
+        message[len(head) : len(head) + compressed_data.nbytes] = compressed_data
+        message[len(head) + compressed_data.nbytes :] = numpy.frombuffer(
+            tail, dtype=numpy.uint8
+        )
+        return message
+
+    def _data_block(
+        self, data: dict[str, StrFloatIntNDArray | None]
+    ) -> StrFloatIntNDArray | None:
+        # Returns the data block to serialize from a data dictionary, after checking
+        # that it can be serialized, or None if the data is missing
+
+        try:
+            if (data_block := data[self._data_source_to_serialize]) is None:
+                return None
+        except KeyError:
+            log_error_and_exit(
+                f"The {self._data_source_to_serialize} data source, that the "
+                "SimplonBinarySerializer is supposed to serialize, cannot be found in"
+                "the data"
+            )
+
+        if not (
+            numpy.issubdtype(data_block.dtype, numpy.int_)
+            or numpy.issubdtype(data_block.dtype, numpy.float64)
+        ):
+            log_error_and_exit(
+                f"The {self._data_source_to_serialize} data source is not of type int "
+                "or float, as required by the SimplonBinarySerializer"
+            )
+
+        if "beam_data" not in data:
+            log_info("Field: beam_data not found in data_sources. Skipping.")
+
+        return data_block
+
+    def _serialize(
+        self,
+        data: dict[str, StrFloatIntNDArray | None],
+        send_start_message: bool,
+        first_message_number: int,
+    ) -> list[Buffer]:
+        # Serializes a single data dictionary (a batch of events) to a list of
+        # binary blobs with an internal Simplon message structure: one image message
+        # per event, preceded by a start message if requested
+
+        messages: list[Buffer] = []
+        if (data_block := self._data_block(data)) is None:
+            return messages
+        template: _ImageMessageTemplate = self._image_templates["beam_data" in data]
+
+        if send_start_message and len(data_block) > 0:
+            messages.append(
+                self._start_message(
+                    data, data_block[0], self._message_id(first_message_number)
+                )
+            )
+
+        index: int
+        for index in range(len(data_block)):
+            messages.append(
+                self._image_message(
+                    data,
+                    template,
+                    index,
+                    data_block[index],
+                    self._message_id(first_message_number + index),
                 )
+            )
 
-            experiment_data: NDArray[numpy.str_] = cast(
-                NDArray[numpy.str_], data["run_info"]
-            )[-1]
-            run_number = experiment_data[2]
-
-            if self._node_rank == self._node_pool_size - 1:
-                if must_send_first_message:
-                    detector_geometry: NDArray[numpy.str_] = cast(
-                        NDArray[numpy.str_], data["detector_geometry"]
-                    )[-1]
-
-                    yield b"".join(
-                        (
-                            b"c",
-                            cast(
-                                bytes,
-                                dumps(
-                                    {
-                                        "type": "start",
-                                        "run_number": run_number,
-                                        "start_time": experiment_data[1],
-                                        "duration": "N/A",
-                                        "beamline": experiment_data[3][4:7].upper(),
-                                        "experiment": experiment_data[0],
-                                        "beam_type": "X-ray",
-                                        "polarization": {
-                                            "fraction": self._polarization.get(
-                                                "polarization_fraction", 0
-                                            ),
-                                            "axis": self._polarization.get(
-                                                "polarization_axis", [0.0, 0.0, 0.0]
-                                            ),
-                                        },
-                                        "data_collection_rate": self._data_rate,
-                                        "datatype": str(array.dtype),
-                                        "shape": "x".join(map(str, array.shape)),
-                                        "algorithm": "bitshuffle-lz4",
-                                        "detector": {
-                                            "name": self._detector_name,
-                                            "id": detector_geometry[0],
-                                            "type": self._detector_type,
-                                            "geometry": detector_geometry[1],
-                                            "pixel_coords": numpy.array(
-                                                detector_geometry[2]
-                                            ).tobytes()
-                                            if len(detector_geometry) > 2
-                                            else "",
-                                            "material": "???",
-                                            "thickness": "???",
-                                        },
-                                        "message_id": self._node_rank * 10000
-                                        + self._rank_message_count,
-                                        "timestamp": time(),
-                                    }
-                                ),
-                            ),
-                        ),
+        return messages
+
+    def _serialize_in_threads(
+        self,
+        tasks: Iterator[tuple[dict[str, StrFloatIntNDArray | None], bool, int]],
+    ) -> Iterator[Buffer]:
+        # Serializes the image messages of the frames in a stream with a pool of
+        # compression threads (bitshuffle releases the GIL), working on several
+        # frames ahead of the message being emitted. Messages are emitted in event
+        # order
+
+        assert self._compression_executor is not None
+        pending: deque[Future[Buffer]] = deque()
+
+        data: dict[str, StrFloatIntNDArray | None]
+        send_start_message: bool
+        first_message_number: int
+        for data, send_start_message, first_message_number in tasks:
+            if (data_block := self._data_block(data)) is None:
+                continue
+            template: _ImageMessageTemplate = self._image_templates["beam_data" in data]
+            if send_start_message and len(data_block) > 0:
+                start_message: Future[Buffer] = Future()
+                start_message.set_result(
+                    self._start_message(
+                        data, data_block[0], self._message_id(first_message_number)
                     )
+                )
+                pending.append(start_message)
+            index: int
+            for index in range(len(data_block)):
+                while len(pending) >= self._max_frames_in_flight:
+                    yield pending.popleft().result()
+                pending.append(
+                    self._compression_executor.submit(
+                        self._image_message,
+                        data,
+                        template,
+                        index,
+                        data_block[index],
+                        self._message_id(first_message_number + index),
+                    )
+                )
 
-            must_send_first_message = False
+        while len(pending) > 0:
+            yield pending.popleft().result()
+
+    def __call__(
+        self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
+    ) -> Iterator[Buffer]:
+        """
+        Serializes data to binary blobs with an internal Simplon message structure
 
-            array_sum: float | int = array.sum()
+        One image message is emitted for each event in each batch, in event order.
+        When worker processes are configured, the data is serialized in parallel by
+        the worker processes, and the messages are returned in the original order.
+        When compression threads are configured instead, the frames are compressed
+        in parallel by the threads, a few frames ahead of the message being
+        emitted, and the messages are also returned in the original order
 
-            compressed_data: NDArray[numpy.uint8] = cast(
-                NDArray[numpy.uint8], compress_lz4(array, block_size=2**12)
-            )
+        Arguments:
+
+            source: A dictionary storing event data
 
-            beam_data_dict: dict[str, Any] = {}
-            try:
-                beam_data: NDArray[numpy.floating[Any]] = cast(
-                    NDArray[numpy.floating[Any]], data["beam_data"]
-                )[-1]
-                beam_data_dict = {
-                    "beam_direction": {
-                        "angle_x": beam_data[0],
-                        "angle_y": beam_data[1],
-                        "position_x": beam_data[2],
-                        "position_y": beam_data[3],
-                    },
-                    "photon_energy": beam_data[4],
-                    "photon_wavelength": 0,  # data["photon_wavelength"][-1]
-                }
-            except KeyError as e:
-                log_info(f"Field: {e.args[0]} not found in data_sources. Skipping.")
-
-            message: dict[str, Any] = {
-                "type": "image",
-                "run": run_number,
-                "compressed_data": compressed_data.tobytes(),
-                **beam_data_dict,
-                "dtype": str(array.dtype),
-                "sum": array_sum,
-                "message_id": self._node_rank * 10000 + self._rank_message_count,
-                "timestamp": cast(NDArray[numpy.str_], data["timestamp"])[-1],
-            }
-            yield b"".join((b"m", cast(bytes, dumps(message))))
+        Yields:
+
+            message: A buffer storing a Simplon message (a bytes object, or an array
+                of bytes for the image messages)
+        """
+        tasks: Iterator[tuple[dict[str, StrFloatIntNDArray | None], bool, int]] = (
+            self._serialization_tasks(stream)
+        )
+        messages: list[Buffer]
+        if self._process_pool is not None:
+            for messages in self._process_pool.map(tasks):
+                yield from messages
+        elif self._compression_executor is not None:
+            yield from self._serialize_in_threads(tasks)
+        else:
+            task: tuple[dict[str, StrFloatIntNDArray | None], bool, int]
+            for task in tasks:
+                yield from self._serialize(*task)
 
         if self._node_rank == self._node_pool_size - 1:
             yield b"".join(
@@ -202,7 +511,7 @@ class SimplonBinarySerializer(DataSerializerProtocol):
                         dumps(
                             {
                                 "type": "stop",
-                                "run": run_number,
+                                "run": self._run_number,
                                 "timestamp": time(),
                             }
                         ),
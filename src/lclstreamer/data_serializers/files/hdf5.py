@@ -1,16 +1,107 @@
 from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from io import BytesIO
+from itertools import product
+from time import perf_counter
 from typing import Any
 
 import h5py
 import hdf5plugin  # pyright: ignore[reportMissingTypeStubs]
+import numpy
+from numpy.typing import NDArray
 
 from ...models.parameters import (
     HDF5BinarySerializerParameters,
+    HDF5FieldParameters,
 )
-from ...utils.logging import log_error_and_exit
+from ...utils.logging import log, log_error_and_exit
 from ...utils.protocols import DataSerializerProtocol
 from ...utils.typing import StrFloatIntNDArray
+from ..common.adaptive_compression import AdaptiveCompressionLevel
+from ..common.buffer_pool import BufferPool
+from ..common.compression import ChunkCompressor, chunk_compressor
+from ..common.file_image import FileImage
+from ..common.process_pool import SharedMemoryProcessPool
+
+# Extra space allocated in a file image on top of the size of the previous image
+_FILE_IMAGE_SLACK: float = 1.05
+
+
+def _compression_options(compression: str | None, level: int) -> dict[str, Any]:
+    # Returns the h5py dataset creation options for a compression algorithm
+
+    if compression == "gzip":
+        return {
+            "compression": "gzip",
+            "compression_opts": level,
+            "shuffle": False,
+        }
+    if compression == "gzip_with_shuffle":
+        return {
+            "compression": "gzip",
+            "compression_opts": level,
+            "shuffle": True,
+        }
+    if compression == "bitshuffle_with_lz4":
+        return {
+            "compression": hdf5plugin.Bitshuffle(  # pyright: ignore[reportPrivateImportUsage]
+                cname="lz4",
+                clevel=level,
+            )
+        }
+    if compression == "bitshuffle_with_zstd":
+        return {
+            "compression": hdf5plugin.Bitshuffle(  # pyright: ignore[reportPrivateImportUsage]
+                cname="zstd",
+                clevel=level,
+            )
+        }
+    if compression == "zfp":
+        return {
+            "compression": hdf5plugin.Zfp()  # pyright: ignore[reportPrivateImportUsage]
+        }
+    return {}
+
+
+@dataclass
+class _HDF5Field:
+    """
+    Dataclass used to store the storage policy of a field
+
+    Attributes:
+
+        path: The HDF5 dataset path under which the field is stored
+
+        compression_options: The h5py dataset creation options for the compression
+            of the field
+
+        chunk_compressor: A function that compresses the chunks of the field
+            outside of the HDF5 library, or None if not available
+
+        chunks: The shape of the HDF5 chunks, including the event axis, or None to
+            store one event per chunk
+
+        contiguous: Whether the field is stored without chunking and compression
+
+        dtype: The dtype to which the data is converted before being stored, or
+            None to keep the dtype of the data
+
+        compression: The compression algorithm of the field, or None if the field
+            is not compressed
+
+        adaptive: Whether the compression level of the field follows the adaptive
+            compression level of the serializer
+    """
+
+    path: str
+    compression_options: dict[str, Any]
+    chunk_compressor: ChunkCompressor | None
+    chunks: tuple[int, ...] | None = None
+    contiguous: bool = False
+    dtype: numpy.dtype[Any] | None = None
+    compression: str | None = None
+    adaptive: bool = False
 
 
 class HDF5BinarySerializer(DataSerializerProtocol):
@@ -34,96 +125,381 @@ class HDF5BinarySerializer(DataSerializerProtocol):
             log_error_and_exit(
                 "Data serializer parameters do not match the expected type"
             )
-        if parameters.compression == "gzip":
-            self._compression_options: dict[str, Any] = {
-                "compression": "gzip",
-                "compression_opts": parameters.compression_level,
-                "shuffle": False,
-            }
-        elif parameters.compression == "gzip_with_shuffle":
-            self._compression_options = {
-                "compression": "gzip",
-                "compression_opts": parameters.compression_level,
-                "shuffle": True,
-            }
-        elif parameters.compression == "bitshuffle_with_lz4":
-            self._compression_options = {
-                "compression": hdf5plugin.Bitshuffle(  # pyright: ignore[reportPrivateImportUsage]
-                    cname="lz4",
-                    clevel=parameters.compression_level,
+
+        self._hdf5_fields: dict[str, _HDF5Field] = {}
+        data_source_name: str
+        field: str | HDF5FieldParameters
+        for data_source_name, field in parameters.fields.items():
+            if isinstance(field, str):
+                field = HDF5FieldParameters(path=field)
+            compression: str | None = (
+                field.compression
+                if field.compression is not None
+                else parameters.compression
+            )
+            if compression == "none" or field.chunks == "contiguous":
+                compression = None
+            compression_level: int = (
+                field.compression_level
+                if field.compression_level is not None
+                else parameters.compression_level
+            )
+            self._hdf5_fields[data_source_name] = _HDF5Field(
+                path=field.path,
+                compression_options=_compression_options(
+                    compression, compression_level
+                ),
+                chunk_compressor=chunk_compressor(compression, compression_level),
+                chunks=(
+                    tuple(field.chunks) if isinstance(field.chunks, list) else None
+                ),
+                contiguous=field.chunks == "contiguous",
+                dtype=numpy.dtype(field.dtype) if field.dtype is not None else None,
+                compression=compression,
+                adaptive=(
+                    parameters.adaptive_compression
+                    and compression is not None
+                    and field.compression is None
+                    and field.compression_level is None
+                ),
+            )
+        self._zero_copy_output: bool = (
+            parameters.zero_copy_output and parameters.number_of_worker_processes == 0
+        )
+        self._file_image_size: int = 0
+        # File images are built in buffers that are reused once the data handlers
+        # have released them
+        self._buffer_pool: BufferPool = BufferPool()
+
+        self._number_of_compression_threads: int = 0
+        if any(
+            hdf5_field.chunk_compressor is not None
+            for hdf5_field in self._hdf5_fields.values()
+        ):
+            self._number_of_compression_threads = (
+                parameters.number_of_compression_threads
+            )
+        self._compression_executor: ThreadPoolExecutor | None = (
+            self._start_compression_threads()
+        )
+
+        self._min_compression_ratio: float = parameters.min_compression_ratio
+        if self._min_compression_ratio > 0.0:
+            hdf5_field: _HDF5Field
+            for data_source_name, hdf5_field in self._hdf5_fields.items():
+                if (
+                    hdf5_field.compression is not None
+                    and hdf5_field.chunk_compressor is None
+                ):
+                    log.warning(
+                        f"min_compression_ratio does not apply to {data_source_name}: "
+                        f"its data cannot be sampled with {hdf5_field.compression} "
+                        "compression, and is always compressed"
+                    )
+        self._incompressible_blocks: int = 0
+        self._adaptive_compression: AdaptiveCompressionLevel | None = None
+        if (
+            parameters.adaptive_compression
+            and parameters.number_of_worker_processes == 0
+        ):
+            self._adaptive_compression = AdaptiveCompressionLevel(
+                initial_level=parameters.compression_level,
+                min_level=parameters.min_compression_level,
+                max_level=parameters.max_compression_level,
+            )
+            self._set_compression_level(self._adaptive_compression.level)
+
+        # The worker processes are started here, and receive a copy of this object
+        self._process_pool: SharedMemoryProcessPool | None = None
+        if parameters.number_of_worker_processes > 0:
+            self._process_pool = SharedMemoryProcessPool(
+                instance=self,
+                method_name="_serialize",
+                num_workers=parameters.number_of_worker_processes,
+            )
+
+    def _start_compression_threads(self) -> ThreadPoolExecutor | None:
+        # Starts the threads that compress the chunks outside of the HDF5 library,
+        # if any
+
+        if self._number_of_compression_threads == 0:
+            return None
+        return ThreadPoolExecutor(
+            max_workers=self._number_of_compression_threads,
+            thread_name_prefix="hdf5_compression",
+        )
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Threads and processes cannot be sent to another process: the copy of the
+        # serializer received by a worker process starts its own compression threads
+
+        state: dict[str, Any] = dict(self.__dict__)
+        state["_compression_executor"] = None
+        state["_process_pool"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # Rebuilds a serializer sent from another process
+
+        self.__dict__.update(state)
+        self._compression_executor = self._start_compression_threads()
+
+    def _set_compression_level(self, level: int) -> None:
+        # Applies a new compression level to the fields that follow the adaptive
+        # compression level
+
+        hdf5_field: _HDF5Field
+        for hdf5_field in self._hdf5_fields.values():
+            if hdf5_field.adaptive:
+                hdf5_field.compression_options = _compression_options(
+                    hdf5_field.compression, level
+                )
+                hdf5_field.chunk_compressor = chunk_compressor(
+                    hdf5_field.compression, level
+                )
+
+    def _is_incompressible(
+        self, hdf5_field: _HDF5Field, data_block: StrFloatIntNDArray
+    ) -> bool:
+        # Compresses the first event of a data block as a sample, and checks whether
+        # the compression ratio of the sample is below the configured minimum
+
+        if (
+            self._min_compression_ratio <= 0.0
+            or hdf5_field.chunk_compressor is None
+            or data_block.ndim < 2
+            or data_block.dtype.kind not in "biuf"
+            or data_block.shape[0] == 0
+        ):
+            return False
+        sample: NDArray[Any] = data_block[:1]
+        compressed_size: int = len(hdf5_field.chunk_compressor(sample))
+        return sample.nbytes < self._min_compression_ratio * compressed_size
+
+    def _chunk_shape(
+        self, hdf5_field: _HDF5Field, data_block: StrFloatIntNDArray
+    ) -> tuple[int, ...] | None:
+        # Returns the HDF5 chunk shape of a data block, or None if the data block is
+        # stored contiguously
+
+        if hdf5_field.contiguous:
+            return None
+        if hdf5_field.chunks is None:
+            return (1,) + data_block[0].shape
+        if len(hdf5_field.chunks) != data_block.ndim:
+            log_error_and_exit(
+                f"The chunk shape of the field stored at {hdf5_field.path} does not "
+                "match the number of dimensions of the data"
+            )
+        return tuple(
+            min(chunk_size, data_size)
+            for chunk_size, data_size in zip(hdf5_field.chunks, data_block.shape)
+        )
+
+    def _write_precompressed_dataset(
+        self,
+        fh: h5py.File,
+        hdf5_field: _HDF5Field,
+        data_block: StrFloatIntNDArray,
+        chunks: tuple[int, ...],
+    ) -> None:
+        # Compresses the chunks of a data block in parallel, outside of the HDF5
+        # library, and writes them to a dataset as raw chunks. Chunks at the edges
+        # of the data block are padded to the full chunk shape, as HDF5 expects
+
+        assert self._compression_executor is not None
+        assert hdf5_field.chunk_compressor is not None
+        chunk_compressor: ChunkCompressor = hdf5_field.chunk_compressor
+        dataset: h5py.Dataset = fh.create_dataset(
+            name=hdf5_field.path,
+            shape=data_block.shape,
+            dtype=data_block.dtype,
+            chunks=chunks,
+            **hdf5_field.compression_options,
+        )
+
+        def _compress_chunk(offset: tuple[int, ...]) -> bytes:
+            chunk: NDArray[Any] = data_block[
+                tuple(slice(start, start + size) for start, size in zip(offset, chunks))
+            ]
+            if chunk.shape != chunks:
+                padded_chunk: NDArray[Any] = numpy.zeros(chunks, dtype=chunk.dtype)
+                padded_chunk[tuple(slice(0, size) for size in chunk.shape)] = chunk
+                chunk = padded_chunk
+            return chunk_compressor(chunk)
+
+        offsets: list[tuple[int, ...]] = list(
+            product(
+                *(
+                    range(0, data_size, chunk_size)
+                    for data_size, chunk_size in zip(data_block.shape, chunks)
                 )
-            }
-        elif parameters.compression == "bitshuffle_with_zstd":
-            self._compression_options = {
-                "compression": hdf5plugin.Bitshuffle(  # pyright: ignore[reportPrivateImportUsage]
-                    cname="zstd",
-                    clevel=parameters.compression_level,
+            )
+        )
+        offset: tuple[int, ...]
+        compressed_chunk: bytes
+        for offset, compressed_chunk in zip(
+            offsets, self._compression_executor.map(_compress_chunk, offsets)
+        ):
+            dataset.id.write_direct_chunk(offset, compressed_chunk)
+
+    def _write_datasets(
+        self, fh: h5py.File, data: dict[str, StrFloatIntNDArray | None]
+    ) -> None:
+        # Writes the data blocks in a data dictionary to an HDF5 file, following the
+        # storage policy of each field
+
+        data_block_name: str
+        for data_block_name in data:
+            if (
+                data_block_name in self._hdf5_fields
+                and (data_block := data[data_block_name]) is not None
+            ):
+                hdf5_field: _HDF5Field = self._hdf5_fields[data_block_name]
+                if hdf5_field.dtype is not None:
+                    data_block = data_block.astype(hdf5_field.dtype, copy=False)
+                chunks: tuple[int, ...] | None = self._chunk_shape(
+                    hdf5_field, data_block
                 )
-            }
-        elif parameters.compression == "zfp":
-            self._compression_options = {
-                "compression": hdf5plugin.Zfp()  # pyright: ignore[reportPrivateImportUsage]
-            }
-        else:
-            self._compression_options = {}
+                compression_options: dict[str, Any] = hdf5_field.compression_options
+                if chunks is not None and self._is_incompressible(
+                    hdf5_field, data_block
+                ):
+                    self._incompressible_blocks += 1
+                    compression_options = {}
+                elif (
+                    self._compression_executor is not None
+                    and hdf5_field.chunk_compressor is not None
+                    and chunks is not None
+                    and data_block.ndim >= 2
+                    and data_block.dtype.kind in "biuf"
+                ):
+                    self._write_precompressed_dataset(
+                        fh, hdf5_field, data_block, chunks
+                    )
+                    continue
+                fh.create_dataset(
+                    name=hdf5_field.path,
+                    shape=data_block.shape,
+                    dtype=data_block.dtype,
+                    chunks=chunks,
+                    data=data_block,
+                    **compression_options,
+                )
+
+    def _serialize(
+        self, data: dict[str, StrFloatIntNDArray | None]
+    ) -> bytes | memoryview:
+        # Serializes a single data dictionary to a binary blob with an internal HDF5
+        # structure. In zero-copy mode, the blob is a view of an in-memory file image
 
-        self._hdf5_fields: dict[str, str] = parameters.fields
+        depth_of_data_blocks: list[int] = [
+            value.shape[0]
+            for data_block in data
+            if (value := data[data_block]) is not None
+        ]
+
+        if len(set(depth_of_data_blocks)) != 1:
+            log_error_and_exit(
+                "The data blocks that should be written to the HDF5 file have"
+                "different depths"
+            )
+
+        mismatching_entries: set[str] = data.keys() - self._hdf5_fields.keys()
+
+        if len(mismatching_entries) != 0:
+            log_error_and_exit(
+                "The Hdf5BinarySerializer is asked to serialize the following data "
+                "entries but data for these entries is not available: "
+                f"{' '.join(list(mismatching_entries))}"
+            )
+
+        if self._zero_copy_output:
+            file_image: FileImage = FileImage(
+                initial_size=int(self._file_image_size * _FILE_IMAGE_SLACK),
+                buffer_pool=self._buffer_pool,
+            )
+            with h5py.File(
+                file_image,  # type: ignore[arg-type]  # pyright: ignore[reportArgumentType]
+                "w",
+            ) as fh:
+                self._write_datasets(fh, data)
+            self._file_image_size = len(file_image)
+            return file_image.getbuffer()
+
+        with BytesIO() as byte_block:
+            with h5py.File(
+                byte_block,  # type: ignore[arg-type]  # pyright: ignore[reportArgumentType]
+                "w",
+            ) as fh:
+                self._write_datasets(fh, data)
+
+            return byte_block.getvalue()
 
     def __call__(
         self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
-    ) -> Iterator[bytes]:
+    ) -> Iterator[bytes | memoryview]:
         """
         Serializes data to a binary blob with an internal HDF5 structure
 
+        When worker processes are configured, the data is serialized in parallel by
+        the worker processes, and the binary blobs are returned in the original order.
+        In zero-copy mode, each binary blob is a read-only view of the in-memory
+        file image where the HDF5 file was written. In adaptive compression mode,
+        the time spent waiting for each data dictionary, serializing it, and
+        waiting for the downstream components to accept the binary blob is used to
+        adjust the compression level
+
         Arguments:
 
             data: A dictionary storing numpy arrays
 
         Returns
 
-            byte_block: A binary blob (a bytes object)
+            byte_block: A binary blob (a bytes object, or a memoryview object in
+                zero-copy mode)
         """
-        data: dict[str, StrFloatIntNDArray | None]
-        for data in stream:
-            depth_of_data_blocks: list[int] = [
-                value.shape[0]
-                for data_block in data
-                if (value := data[data_block]) is not None
-            ]
+        if self._process_pool is not None:
+            yield from self._process_pool.map((data,) for data in stream)
+            return
 
-            if len(set(depth_of_data_blocks)) != 1:
-                log_error_and_exit(
-                    "The data blocks that should be written to the HDF5 file have"
-                    "different depths"
-                )
+        if self._adaptive_compression is None:
+            data: dict[str, StrFloatIntNDArray | None]
+            for data in stream:
+                yield self._serialize(data)
+            return
 
-            mismatching_entries: set[str] = data.keys() - self._hdf5_fields.keys()
+        iterator: Iterator[dict[str, StrFloatIntNDArray | None]] = iter(stream)
+        while True:
+            start: float = perf_counter()
+            try:
+                data = next(iterator)
+            except StopIteration:
+                return
+            received: float = perf_counter()
+            byte_block: bytes | memoryview = self._serialize(data)
+            serialized: float = perf_counter()
+            yield byte_block
+            if self._adaptive_compression.update(
+                upstream_time=received - start,
+                serialization_time=serialized - received,
+                downstream_time=perf_counter() - serialized,
+            ):
+                self._set_compression_level(self._adaptive_compression.level)
 
-            if len(mismatching_entries) != 0:
-                log_error_and_exit(
-                    "The Hdf5BinarySerializer is asked to serialize the following data "
-                    "entries but data for these entries is not available: "
-                    f"{' '.join(list(mismatching_entries))}"
-                )
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns the current compression level, in adaptive compression mode, and
+        the number of data blocks stored uncompressed because they were found to be
+        incompressible
 
-            with BytesIO() as byte_block:
-                with h5py.File(
-                    byte_block,  # type: ignore[arg-type]  # pyright: ignore[reportArgumentType]
-                    "w",
-                ) as fh:
-                    data_block_name: str
-                    for data_block_name in data:
-                        if (
-                            data_block_name in self._hdf5_fields
-                            and (data_block := data[data_block_name]) is not None
-                        ):
-                            fh.create_dataset(
-                                name=self._hdf5_fields[data_block_name],
-                                shape=data_block.shape,
-                                dtype=data_block.dtype,
-                                chunks=(1,) + data_block[0].shape,
-                                data=data_block,
-                                **self._compression_options,
-                            )
-
-                yield byte_block.getvalue()
+        Returns:
+
+            statistics: A dictionary with the statistics of the serializer
+        """
+        statistics: dict[str, int | float] = {}
+        if self._adaptive_compression is not None:
+            statistics["compression_level"] = self._adaptive_compression.level
+        if self._min_compression_ratio > 0.0 and self._process_pool is None:
+            statistics["incompressible_blocks"] = self._incompressible_blocks
+        return statistics
@@ -0,0 +1,243 @@
+from collections.abc import Iterator, Sequence
+from io import BytesIO
+from typing import Any, cast
+
+import numpy
+from bitshuffle import (  # pyright: ignore[reportMissingTypeStubs]
+    compress_lz4,  # pyright: ignore[reportUnknownVariableType]
+    compress_zstd,  # pyright: ignore[reportUnknownVariableType]
+    decompress_lz4,  # pyright: ignore[reportUnknownVariableType]
+    decompress_zstd,  # pyright: ignore[reportUnknownVariableType]
+)
+from cbor import (  # pyright: ignore[reportMissingTypeStubs]
+    dumps,  # pyright: ignore[reportUnknownVariableType]
+    load,  # pyright: ignore[reportUnknownVariableType]
+    loads,  # pyright: ignore[reportUnknownVariableType]
+)
+from mpi4py import MPI
+from numpy.typing import NDArray
+from typing_extensions import Buffer
+
+from ...models.parameters import NumpyMultipartSerializerParameters
+from ...utils.logging import log_error_and_exit
+from ...utils.protocols import DataSerializerProtocol
+from ...utils.typing import StrFloatIntNDArray
+
+# Identifier of the format, stored in the header of each message
+NUMPY_MULTIPART_FORMAT: str = "lclstreamer-numpy-multipart"
+
+# Version of the format, stored in the header of each message
+NUMPY_MULTIPART_VERSION: int = 1
+
+# Size of the first read attempted when looking for the end of the header of a
+# message stored in a single buffer
+_HEADER_READ_SIZE: int = 4096
+
+
+def _compress(array: NDArray[Any], compression: str, level: int) -> NDArray[Any]:
+    # Compresses a buffer with bitshuffle, letting bitshuffle choose the block size
+
+    if compression == "bitshuffle_with_lz4":
+        return cast(NDArray[numpy.uint8], compress_lz4(array))
+    return cast(NDArray[numpy.uint8], compress_zstd(array, 0, level))
+
+
+def _decompress(
+    buffer: Buffer, compression: str, shape: tuple[int, ...], dtype: numpy.dtype[Any]
+) -> NDArray[Any]:
+    # Decompresses a buffer compressed by `_compress`
+
+    compressed: NDArray[numpy.uint8] = numpy.frombuffer(buffer, dtype=numpy.uint8)
+    if compression == "bitshuffle_with_lz4":
+        return cast(NDArray[Any], decompress_lz4(compressed, shape, dtype))
+    return cast(NDArray[Any], decompress_zstd(compressed, shape, dtype))
+
+
+def _split_message(blob: Buffer) -> list[memoryview]:
+    # Splits a message stored in a single buffer (the parts of the message written
+    # one after the other, for example by the file writing data handler) into its
+    # parts. The header is self-delimiting CBOR, and it stores the size of the
+    # following parts
+
+    view: memoryview = memoryview(blob).cast("B")
+    read_size: int = _HEADER_READ_SIZE
+    while True:
+        header_stream: BytesIO = BytesIO(bytes(view[:read_size]))
+        try:
+            header: dict[str, Any] = cast(dict[str, Any], load(header_stream))
+            break
+        except ValueError:
+            if read_size >= view.nbytes:
+                raise
+            read_size *= 2
+
+    parts: list[memoryview] = []
+    offset: int = header_stream.tell()
+    parts.append(view[:offset])
+    field: dict[str, Any]
+    for field in header.get("fields", []):
+        parts.append(view[offset : offset + field["nbytes"]])
+        offset += field["nbytes"]
+    return parts
+
+
+def decode_numpy_multipart(
+    frames: Sequence[Buffer],
+) -> tuple[dict[str, Any], dict[str, NDArray[Any]]]:
+    """
+    Rebuilds the data dictionary serialized by the NumPy multipart serializer
+
+    Uncompressed arrays are views of the received frames: no data is copied
+
+    Arguments:
+
+        frames: The frames of a multipart message (for example, the frames
+            received by a ZMQ socket with `recv_multipart(copy=False)`), or a
+            single buffer storing all the parts of the message one after the
+            other (for example, the content of a file written by the file writing
+            data handler)
+
+    Returns:
+
+        metadata: The batch metadata stored in the header of the message (format,
+            version, rank of the sender, message id and number of events)
+
+        data: A dictionary mapping data source names to numpy arrays
+    """
+    if len(frames) == 1:
+        frames = _split_message(frames[0])
+    header: dict[str, Any] = cast(dict[str, Any], loads(bytes(frames[0])))
+    if header.get("format") != NUMPY_MULTIPART_FORMAT:
+        raise ValueError("The message is not a NumPy multipart message")
+    fields: list[dict[str, Any]] = header.pop("fields")
+    if len(fields) != len(frames) - 1:
+        raise ValueError(
+            f"The message has {len(frames) - 1} buffers, but its header describes "
+            f"{len(fields)} fields"
+        )
+
+    data: dict[str, NDArray[Any]] = {}
+    field: dict[str, Any]
+    frame: Buffer
+    for field, frame in zip(fields, frames[1:]):
+        dtype: numpy.dtype[Any] = numpy.dtype(field["dtype"])
+        shape: tuple[int, ...] = tuple(field["shape"])
+        if field["compression"] is None:
+            data[field["name"]] = numpy.frombuffer(frame, dtype=dtype).reshape(shape)
+        else:
+            data[field["name"]] = _decompress(frame, field["compression"], shape, dtype)
+
+    return header, data
+
+
+class NumpyMultipartSerializer(DataSerializerProtocol):
+    """
+    See documentation of the `__init__` function.
+    """
+
+    def __init__(self, parameters: NumpyMultipartSerializerParameters) -> None:
+        """
+        Initializes a NumPy multipart data serializer
+
+        This serializer turns a dictionary of numpy arrays into a multipart
+        message, for consumers that just want the arrays. The first part of the
+        message is a small CBOR header storing the name, dtype and shape of each
+        array, and the batch metadata. Each following part is the raw buffer of an
+        array. Uncompressed buffers are not copied: the parts of the message are
+        the arrays themselves. When compression is configured, each numeric buffer
+        is compressed separately. Messages can be decoded with the
+        `decode_numpy_multipart` function
+
+        Arguments:
+
+            parameters: The data serializer configuration parameters
+        """
+        if parameters.type != "NumpyMultipartSerializer":
+            log_error_and_exit(
+                "Data serializer parameters do not match the expected type"
+            )
+        self._fields: list[str] | None = parameters.fields
+        self._compression: str | None = parameters.compression
+        self._compression_level: int = parameters.compression_level
+        self._node_rank: int = MPI.COMM_WORLD.Get_rank()
+        self._message_id: int = 0
+
+    def _serialize(self, data: dict[str, StrFloatIntNDArray | None]) -> list[Buffer]:
+        # Serializes a single data dictionary to a list of buffers: the header,
+        # followed by the buffer of each array
+
+        names: list[str] = self._fields if self._fields is not None else list(data)
+        fields: list[dict[str, Any]] = []
+        buffers: list[Buffer] = []
+        events: int = 0
+
+        name: str
+        for name in names:
+            if name not in data:
+                log_error_and_exit(
+                    f"The {name} data source, that the NumpyMultipartSerializer is "
+                    "supposed to serialize, cannot be found in the data"
+                )
+            if (value := data[name]) is None:
+                continue
+            array: NDArray[Any] = numpy.ascontiguousarray(value)
+            if array.dtype.hasobject:
+                log_error_and_exit(
+                    f"The {name} data source cannot be serialized by the "
+                    "NumpyMultipartSerializer, because its data type is not fixed-size"
+                )
+            events = max(events, array.shape[0] if array.ndim > 0 else 1)
+
+            compression: str | None = (
+                self._compression if array.dtype.kind in "biuf" else None
+            )
+            buffer: NDArray[Any] = (
+                _compress(array, compression, self._compression_level)
+                if compression is not None
+                else array
+            )
+            fields.append(
+                {
+                    "name": name,
+                    "dtype": array.dtype.str,
+                    "shape": list(array.shape),
+                    "compression": compression,
+                    "nbytes": int(buffer.nbytes),
+                }
+            )
+            buffers.append(buffer)
+
+        header: bytes = cast(
+            bytes,
+            dumps(
+                {
+                    "format": NUMPY_MULTIPART_FORMAT,
+                    "version": NUMPY_MULTIPART_VERSION,
+                    "rank": self._node_rank,
+                    "message_id": self._message_id,
+                    "events": events,
+                    "fields": fields,
+                }
+            ),
+        )
+        self._message_id += 1
+
+        return [header, *buffers]
+
+    def __call__(
+        self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
+    ) -> Iterator[list[Buffer]]:
+        """
+        Serializes data to multipart messages storing the raw array buffers
+
+        Arguments:
+
+            stream: An iterator of event data dictionaries
+
+        Yields:
+
+            message: A list of buffers, one per part of the message
+        """
+        data: dict[str, StrFloatIntNDArray | None]
+        for data in stream:
+            yield self._serialize(data)
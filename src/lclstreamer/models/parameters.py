@@ -109,10 +109,77 @@ class BatchProcessingPipelineParameters(_CustomBaseModel):
         type: Discriminator field, must be ``"BatchProcessingPipeline"``
 
         batch_size: Number of events to accumulate per batch
+
+        number_of_batch_buffers: Number of preallocated batch buffers that are
+            reused in turn. A buffer is reused only after the downstream components
+            are done with the batch stored in it. If not set, it is computed from
+            the execution parameters (see ``ExecutionParameters``) and from the
+            messages that the data handlers keep without copying. Defaults to
+            ``None``
+
+        max_batch_latency_ms: Maximum time, in milliseconds, between the arrival of
+            the first event of a batch and the moment the batch is passed
+            downstream, even if it is not full. Set to ``0`` to disable.
+            Defaults to ``0``
+
+        max_batch_bytes: Maximum size of a batch, in bytes. A batch is passed
+            downstream as soon as its size reaches this value, even if it holds
+            fewer than ``batch_size`` events. Set to ``0`` to disable. Defaults to
+            ``0``
+
+        adaptive_batch_size: When ``True``, the number of events per batch is
+            adjusted after each batch, between ``min_batch_size`` and
+            ``max_batch_size``, to hit ``target_batch_bytes`` and/or
+            ``target_batch_latency_ms``. ``batch_size`` is then the initial number
+            of events per batch. Defaults to ``False``
+
+        min_batch_size: Minimum number of events per batch in adaptive mode.
+            Defaults to ``1``
+
+        max_batch_size: Maximum number of events per batch in adaptive mode. If
+            not set, ``batch_size`` is used. Defaults to ``None``
+
+        target_batch_bytes: Target size of a batch, in bytes, in adaptive mode.
+            Set to ``0`` to disable. Defaults to ``0``
+
+        target_batch_latency_ms: Target time, in milliseconds, that the downstream
+            components take to accept a batch, in adaptive mode. Set to ``0`` to
+            disable. Defaults to ``0``
     """
 
     type: Literal["BatchProcessingPipeline"]
     batch_size: int
+    number_of_batch_buffers: int | None = Field(default=None, ge=2)
+    max_batch_latency_ms: float = Field(default=0.0, ge=0.0)
+    max_batch_bytes: int = Field(default=0, ge=0)
+    adaptive_batch_size: bool = False
+    min_batch_size: int = Field(default=1, ge=1)
+    max_batch_size: int | None = Field(default=None, ge=1)
+    target_batch_bytes: int = Field(default=0, ge=0)
+    target_batch_latency_ms: float = Field(default=0.0, ge=0.0)
+
+    @model_validator(mode="after")
+    def _check_model(self) -> Self:
+        # Validates the bounds and targets of the adaptive batch size
+
+        if self.adaptive_batch_size:
+            max_batch_size: int = (
+                self.max_batch_size
+                if self.max_batch_size is not None
+                else self.batch_size
+            )
+            if not self.min_batch_size <= self.batch_size <= max_batch_size:
+                raise ValueError(
+                    "batch_size must be between min_batch_size and max_batch_size "
+                    "when adaptive_batch_size is enabled."
+                )
+            if self.target_batch_bytes == 0 and self.target_batch_latency_ms == 0:
+                raise ValueError(
+                    "target_batch_bytes or target_batch_latency_ms must be set when "
+                    "adaptive_batch_size is enabled."
+                )
+
+        return self
 
 
 class PeaknetPreprocessingPipelineParameters(_CustomBaseModel):
@@ -143,6 +210,13 @@ class PeaknetPreprocessingPipelineParameters(_CustomBaseModel):
 
         num_channels: Number of channels to produce when ``add_channel_dim``
             is ``True``. Defaults to ``1``
+
+        number_of_batch_buffers: Number of preallocated batch buffers that are
+            reused in turn. A buffer is reused only after the downstream components
+            are done with the batch stored in it. If not set, it is computed from
+            the execution parameters (see ``ExecutionParameters``) and from the
+            messages that the data handlers keep without copying. Defaults to
+            ``None``
     """
 
     type: Literal["PeaknetPreprocessingPipeline"]
@@ -152,6 +226,7 @@ class PeaknetPreprocessingPipelineParameters(_CustomBaseModel):
     pad_style: Literal["center", "bottom-right"] = "center"
     add_channel_dim: bool = True
     num_channels: int = 1
+    number_of_batch_buffers: int | None = Field(default=None, ge=2)
 
 
 ProcessingPipelineParameters = Annotated[
@@ -189,6 +264,22 @@ class SimplonBinarySerializerParameters(_CustomBaseModel):
         detector_name: Human-readable name of the detector
 
         detector_type: Model or type string identifying the detector hardware
+
+        number_of_worker_processes: Number of worker processes that compress and
+            encode the data in parallel. The data is transferred to the worker
+            processes through shared memory. When set to ``0``, the data is
+            serialized in the main process. Defaults to ``0``
+
+        compression_block_size: Size, in number of elements, of the blocks on which
+            the bitshuffle + LZ4 compression of the image data operates. Must be a
+            multiple of 8. Consumers must decompress the data with the same block
+            size. Defaults to ``4096``
+
+        number_of_compression_threads: Number of threads that compress the frames
+            in parallel, a few frames ahead of the message being emitted. Messages
+            are still emitted in event order. Only used when
+            ``number_of_worker_processes`` is ``0``. When set to ``0``, each frame
+            is compressed when its message is emitted. Defaults to ``0``
     """
 
     type: Literal["SimplonBinarySerializer"]
@@ -198,6 +289,69 @@ class SimplonBinarySerializerParameters(_CustomBaseModel):
     data_collection_rate: str
     detector_name: str
     detector_type: str
+    number_of_worker_processes: int = Field(default=0, ge=0)
+    compression_block_size: int = Field(default=4096, ge=8, multiple_of=8)
+    number_of_compression_threads: int = Field(default=0, ge=0)
+
+
+class HDF5FieldParameters(_CustomBaseModel):
+    """
+    Storage policy for a single field of the HDF5 binary serializer
+
+    Attributes:
+
+        path: HDF5 dataset path under which the data source's data will be stored
+
+        compression: Compression algorithm to use for this field. Supported values
+            are the ones supported by the serializer, plus ``"none"`` to store the
+            field uncompressed. When not set, the compression algorithm of the
+            serializer is used. Defaults to ``None``
+
+        compression_level: Compression level to use for this field. When not set,
+            the compression level of the serializer is used. Defaults to ``None``
+
+        chunks: Shape of the HDF5 chunks, including the event axis (for example,
+            ``[1, 256, 256]`` to split each detector frame in tiles), or
+            ``"contiguous"`` to store the field without chunking and without
+            compression. When not set, each chunk stores one event. Defaults to
+            ``None``
+
+        dtype: Numpy dtype to which the data is converted before being stored (for
+            example, ``"float32"``). When not set, the dtype of the data is kept.
+            Defaults to ``None``
+    """
+
+    path: str
+    compression: (
+        Literal[
+            "gzip",
+            "gzip_with_shuffle",
+            "bitshuffle_with_lz4",
+            "bitshuffle_with_zstd",
+            "zfp",
+            "none",
+        ]
+        | None
+    ) = None
+    compression_level: int | None = None
+    chunks: List[int] | Literal["contiguous"] | None = None
+    dtype: str | None = None
+
+    @model_validator(mode="after")
+    def _check_model(self) -> Self:
+        # Validates that contiguous fields are not compressed
+
+        if self.chunks == "contiguous" and self.compression not in (None, "none"):
+            raise ValueError(
+                f"The field stored at {self.path} cannot be both contiguous and "
+                "compressed."
+            )
+        if isinstance(self.chunks, list) and any(size < 1 for size in self.chunks):
+            raise ValueError(
+                f"The chunk shape of the field stored at {self.path} must be positive."
+            )
+
+        return self
 
 
 class HDF5BinarySerializerParameters(_CustomBaseModel):
@@ -220,7 +374,50 @@ class HDF5BinarySerializerParameters(_CustomBaseModel):
             disable compression. Defaults to ``None``
 
         fields: Dictionary storing the mapping from data source name to the
-            HDF5 dataset path under which that source's data will be stored
+            HDF5 dataset path under which that source's data will be stored, or to
+            a storage policy for that source (see `HDF5FieldParameters`)
+
+        number_of_worker_processes: Number of worker processes that serialize the
+            data in parallel. The data is transferred to the worker processes
+            through shared memory. When set to ``0``, the data is serialized in the
+            main process. Defaults to ``0``
+
+        zero_copy_output: When ``True``, each HDF5 file is written into an
+            in-memory file image sized after the previous one, and is passed to the
+            data handlers as a view of the image, without copying it. Only used
+            when ``number_of_worker_processes`` is ``0``. Defaults to ``False``
+
+        number_of_compression_threads: Number of threads that compress the frames
+            of multi-dimensional data blocks in parallel, outside of the HDF5
+            library. The compressed frames are written to the HDF5 file as raw
+            chunks. Supported for all compression algorithms except ``"zfp"``.
+            When set to ``0``, the HDF5 library compresses the data. Defaults to
+            ``0``
+
+        adaptive_compression: When ``True``, the compression level is adjusted at
+            runtime between ``min_compression_level`` and ``max_compression_level``:
+            it is raised when the serializer spends most of its time waiting for
+            the data handlers (backpressure from the network or the consumer), and
+            lowered when it spends most of its time compressing. Only applies to
+            the fields that use the compression settings of the serializer, and
+            requires a compression algorithm with compression levels (``"gzip"``,
+            ``"gzip_with_shuffle"`` or ``"bitshuffle_with_zstd"``). Only used when
+            ``number_of_worker_processes`` is ``0``. Defaults to ``False``
+
+        min_compression_level: The lowest compression level used in adaptive mode.
+            Defaults to ``1``
+
+        max_compression_level: The highest compression level used in adaptive mode.
+            Defaults to ``9``
+
+        min_compression_ratio: Before compressing a multi-dimensional data block,
+            its first event is compressed as a sample. If the compression ratio of
+            the sample is lower than this value, the data block is considered
+            incompressible and is stored uncompressed. Only applies to the fields
+            compressed with ``"gzip"``, ``"gzip_with_shuffle"``,
+            ``"bitshuffle_with_lz4"`` or ``"bitshuffle_with_zstd"``, at least one
+            of which is required. Set to ``0`` to always compress. Defaults to
+            ``0``
     """
 
     type: Literal["HDF5BinarySerializer"]
@@ -235,11 +432,101 @@ class HDF5BinarySerializerParameters(_CustomBaseModel):
         ]
         | None
     ) = None
-    fields: Dict[str, str]
+    fields: Dict[str, Union[str, HDF5FieldParameters]]
+    number_of_worker_processes: int = Field(default=0, ge=0)
+    zero_copy_output: bool = False
+    number_of_compression_threads: int = Field(default=0, ge=0)
+    adaptive_compression: bool = False
+    min_compression_level: int = Field(default=1, ge=0)
+    max_compression_level: int = Field(default=9, ge=0)
+    min_compression_ratio: float = Field(default=0.0, ge=0)
+
+    @model_validator(mode="after")
+    def _check_model(self) -> Self:
+        # Validates the adaptive compression settings, and checks that the minimum
+        # compression ratio applies to at least one field
+
+        if self.min_compression_ratio > 0.0:
+            field_compressions: list[str | None] = [
+                self.compression
+                if isinstance(field, str) or field.compression is None
+                else field.compression
+                for field in self.fields.values()
+                if isinstance(field, str) or field.chunks != "contiguous"
+            ]
+            if not any(
+                compression
+                in (
+                    "gzip",
+                    "gzip_with_shuffle",
+                    "bitshuffle_with_lz4",
+                    "bitshuffle_with_zstd",
+                )
+                for compression in field_compressions
+            ):
+                raise ValueError(
+                    "min_compression_ratio requires at least one field compressed "
+                    "with gzip, gzip_with_shuffle, bitshuffle_with_lz4 or "
+                    "bitshuffle_with_zstd (it has no effect with zfp or without "
+                    "compression)."
+                )
+
+        if not self.adaptive_compression:
+            return self
+        if self.compression not in (
+            "gzip",
+            "gzip_with_shuffle",
+            "bitshuffle_with_zstd",
+        ):
+            raise ValueError(
+                "Adaptive compression requires a compression algorithm with "
+                "compression levels (gzip, gzip_with_shuffle or bitshuffle_with_zstd)."
+            )
+        if self.min_compression_level > self.max_compression_level:
+            raise ValueError(
+                "The minimum compression level cannot be larger than the maximum "
+                "compression level."
+            )
+
+        return self
+
+
+class NumpyMultipartSerializerParameters(_CustomBaseModel):
+    """
+    Configuration parameters for the NumPy multipart serializer
+
+    This serializer encodes a batch of event data arrays into a multipart
+    message: a small CBOR header describing the arrays, followed by the raw
+    buffer of each array
+
+    Attributes:
+
+        type: Discriminator field, must be ``"NumpyMultipartSerializer"``
+
+        fields: Names of the data sources to serialize. When not set, all the data
+            sources are serialized. Defaults to ``None``
+
+        compression: Compression algorithm applied to each numeric buffer
+            separately. Supported values are ``"bitshuffle_with_lz4"`` and
+            ``"bitshuffle_with_zstd"``. Set to ``None`` to send the buffers
+            uncompressed, without copying them. Defaults to ``None``
+
+        compression_level: Compression level used with ``"bitshuffle_with_zstd"``.
+            Defaults to ``3``
+    """
+
+    type: Literal["NumpyMultipartSerializer"]
+    fields: List[str] | None = None
+    compression: Literal["bitshuffle_with_lz4", "bitshuffle_with_zstd"] | None = None
+    compression_level: int = 3
 
 
 DataSerializerParameters = Annotated[
-    Union[HDF5BinarySerializerParameters, SimplonBinarySerializerParameters],
+    Union[
+        HDF5BinarySerializerParameters,
+        SimplonBinarySerializerParameters,
+        NumpyMultipartSerializerParameters,
+    ],
     Field(discriminator="type"),
 ]
 
@@ -252,7 +539,7 @@ class BinaryDataStreamingDataHandlerParameters(_CustomBaseModel):
     Configuration parameters for the Binary Data Streaming Data Handler
 
     This data handler forwards serialized byte objects to one or more remote
-    endpoints over a ZMQ PUSH socket
+    endpoints over a ZMQ PUSH socket, or over an NNG socket
 
     Attributes:
 
@@ -264,18 +551,93 @@ class BinaryDataStreamingDataHandlerParameters(_CustomBaseModel):
         role: Whether this node acts as the ZMQ ``"server"`` (binds) or
             ``"client"`` (connects). Defaults to ``"server"``
 
-        library: Underlying transport library to use. Currently only ``"zmq"``
-            is supported. Defaults to ``"zmq"``
-
-        socket_type: Socket pattern to use. Currently only ``"push"`` is
-            supported. Defaults to ``"push"``
+        library: Underlying transport library to use: ``"zmq"`` or ``"nng"``.
+            Only ZMQ sends messages without copying them: with NNG, every message
+            that is not a ``bytes`` object is copied into one (the parts of a
+            multipart message are joined), and is copied again by the library.
+            Defaults to ``"zmq"``
+
+        socket_type: Socket pattern to use: ``"push"``, ``"pub"``, ``"pair"`` or
+            ``"router"``. The ZMQ library supports ``"push"`` and ``"router"``
+            (credit-based load balancing among consumers), the NNG library
+            ``"push"``, ``"pub"`` and ``"pair"``. Defaults to ``"push"``
+
+        send_high_water_mark: Maximum number of messages queued by the socket
+            when no receiver can accept them (ZMQ ``SNDHWM``, NNG send buffer).
+            When the queue is full, sending blocks. With ZMQ, 0 means no limit.
+            With NNG, 0 means no queue, and the maximum is 8192. Defaults to 5
+
+        send_buffer_size: Size, in bytes, of the kernel send buffer of the
+            underlying network connections (ZMQ ``SNDBUF``). If None, the
+            operating system default is used. Only used with ZMQ. Defaults to
+            None
+
+        immediate: Whether messages are only queued for connections that have
+            completed their handshake (ZMQ ``IMMEDIATE``). When False, messages
+            can be queued for a peer that is not reachable yet. Only used with
+            ZMQ. Defaults to False
+
+        io_threads: Number of ZMQ background threads that move the data to the
+            network. Only used with ZMQ. Defaults to 1
+
+        background_sending: Whether messages are sent by a background thread,
+            from a bounded in-memory queue, so that a stalled consumer does not
+            block the data workflow. Defaults to False
+
+        send_queue_size: Maximum number of messages kept in the in-memory queue
+            of the background thread. Defaults to 16
+
+        spill_directory: Directory where the messages that do not fit in the
+            in-memory queue are written, to be sent once the queue has been
+            drained. If None, adding a message to a full queue waits. Requires
+            ``background_sending``. Defaults to None
+
+        max_spill_bytes: Maximum total size, in bytes, of the messages written to
+            the spill directory. When reached, adding a message waits. 0 means no
+            limit. Defaults to 0
     """
 
     type: Literal["BinaryDataStreamingDataHandler"]
     urls: List[str]
     role: Literal["server", "client"] = "server"
-    library: Literal["zmq"] = "zmq"
-    socket_type: Literal["push"] = "push"
+    library: Literal["zmq", "nng"] = "zmq"
+    socket_type: Literal["push", "pub", "pair", "router"] = "push"
+    send_high_water_mark: int = Field(default=5, ge=0)
+    send_buffer_size: int | None = Field(default=None, gt=0)
+    immediate: bool = False
+    io_threads: int = Field(default=1, ge=1)
+    background_sending: bool = False
+    send_queue_size: int = Field(default=16, ge=1)
+    spill_directory: Path | None = None
+    max_spill_bytes: int = Field(default=0, ge=0)
+
+    @model_validator(mode="after")
+    def _check_model(self) -> Self:
+        # Validates the socket settings supported by each library, and the
+        # background sending settings
+
+        if self.library == "zmq" and self.socket_type not in ("push", "router"):
+            raise ValueError(
+                "The ZMQ library only supports the push and router socket types."
+            )
+        if self.library == "nng":
+            if self.socket_type == "router":
+                raise ValueError(
+                    "The NNG library does not support the router socket type."
+                )
+            if self.send_high_water_mark > 8192:
+                raise ValueError(
+                    "The send high water mark cannot be larger than 8192 with the "
+                    "NNG library."
+                )
+            if self.socket_type == "pair" and len(self.urls) > 1:
+                raise ValueError(
+                    "A pair socket can only be bound or connected to a single URL."
+                )
+        if self.spill_directory is not None and not self.background_sending:
+            raise ValueError("Spilling messages requires background sending.")
+
+        return self
 
 
 class BinaryFileWritingDataHandlerParameters(_CustomBaseModel):
@@ -299,12 +661,26 @@ class BinaryFileWritingDataHandlerParameters(_CustomBaseModel):
         write_directory: Directory in which output files are created. The
             directory is created (including parents) if it does not already
             exist. Defaults to the current working directory
+
+        container_files: Whether the serialized byte objects are appended to
+            large container files, one per rank at a time, instead of being
+            written to separate files. Defaults to False
+
+        max_container_file_size: Size, in bytes, above which a container file is
+            closed and a new one is started. Defaults to 4 GB
+
+        max_container_file_duration: Time, in seconds, after which a container
+            file is closed and a new one is started, when the next byte object
+            arrives. 0 means no time limit. Defaults to 0
     """
 
     type: Literal["BinaryFileWritingDataHandler"]
     file_prefix: str = ""
     file_suffix: str = "h5"
     write_directory: Path = Path.cwd()
+    container_files: bool = False
+    max_container_file_size: int = Field(default=4_000_000_000, gt=0)
+    max_container_file_duration: float = Field(default=0.0, ge=0.0)
 
 
 DataHandlerParameters = Annotated[
@@ -315,6 +691,115 @@ DataHandlerParameters = Annotated[
 ]
 
 
+######### Execution #################
+
+
+class ExecutionParameters(_CustomBaseModel):
+    """
+    Configuration parameters for the execution of the data workflow
+
+    In ``"sequential"`` mode, the event source, the processing pipeline, the data
+    serializer and the data handlers run one after the other in the same thread. In
+    ``"threaded"`` mode, each of these stages runs in its own thread, and consecutive
+    stages exchange data through bounded queues, so that the work of different stages
+    on different events can overlap
+
+    Attributes:
+
+        mode: How the stages of the data workflow are executed. Either
+            ``"sequential"`` or ``"threaded"``. Defaults to ``"sequential"``
+
+        event_source_queue_depth: Maximum number of events queued between the
+            event source and the processing pipeline in threaded mode. Defaults to
+            ``4``
+
+        processing_pipeline_queue_depth: Maximum number of processed data items
+            queued between the processing pipeline and the data serializer in
+            threaded mode. Defaults to ``2``
+
+        data_serializer_queue_depth: Maximum number of serialized byte objects
+            queued between the data serializer and the data handlers in threaded
+            mode. Defaults to ``2``
+
+        concurrent_data_handlers: When ``True``, each serialized byte object is
+            handed to all the data handlers at the same time, each data handler
+            running in its own thread. When ``False``, the data handlers process
+            each byte object one after the other. Defaults to ``False``
+
+        data_handler_max_in_flight: Maximum number of byte objects that each data
+            handler can have queued or in progress when the data handlers run
+            concurrently. Defaults to ``2``
+    """
+
+    mode: Literal["sequential", "threaded"] = "sequential"
+    event_source_queue_depth: int = Field(default=4, ge=1)
+    processing_pipeline_queue_depth: int = Field(default=2, ge=1)
+    data_serializer_queue_depth: int = Field(default=2, ge=1)
+    concurrent_data_handlers: bool = False
+    data_handler_max_in_flight: int = Field(default=2, ge=1)
+
+    def number_of_batch_buffers(self, messages_held_by_data_handlers: int = 0) -> int:
+        """
+        Returns the number of batch buffers needed by the processing pipeline
+
+        Arguments:
+
+            messages_held_by_data_handlers: The number of serialized messages that
+                the data handlers can keep, without copying them, after they are
+                done with them (for example, messages queued by a ZMQ socket until
+                they are sent). Defaults to ``0``
+
+        Returns:
+
+            number_of_batch_buffers: The number of batches that can be held by the
+                workflow at the same time: one being filled, one being serialized
+                and one being handled, plus, in threaded mode, the batches and byte
+                objects queued between the stages, plus the messages held by the
+                data handlers
+        """
+        if self.mode == "threaded":
+            return (
+                3
+                + self.processing_pipeline_queue_depth
+                + self.data_serializer_queue_depth
+                + messages_held_by_data_handlers
+            )
+        return 3 + messages_held_by_data_handlers
+
+
+######### Reporting #################
+
+
+class ReportingParameters(_CustomBaseModel):
+    """
+    Configuration parameters for the periodic reporting of the workflow statistics
+
+    Each worker aggregates its statistics in place, and reports them periodically
+    (event and data rates, message latencies, and per-stage utilization)
+
+    Attributes:
+
+        interval_seconds: Time between reports, in seconds. Set to ``0`` to disable
+            time-based reports. Defaults to ``10.0``
+
+        interval_messages: Number of serialized messages between reports. Set to
+            ``0`` to disable message-based reports. Defaults to ``0``
+
+        latency_window: Maximum number of message latencies kept in each report
+            interval to compute the latency percentiles. Defaults to ``1000``
+
+        aggregation_interval_seconds: Time between the job-wide reports printed by
+            the worker with rank 0, in seconds. Every worker sends its event and
+            data counters to rank 0 at this interval. Set to ``0`` to disable
+            job-wide reports. Defaults to ``0.0`` (disabled)
+    """
+
+    interval_seconds: float = Field(default=10.0, ge=0.0)
+    interval_messages: int = Field(default=0, ge=0)
+    latency_window: int = Field(default=1000, ge=1)
+    aggregation_interval_seconds: float = Field(default=0.0, ge=0.0)
+
+
 class Parameters(_CustomBaseModel):
     """
     Top-level configuration parameters for an lclstreamer run
@@ -342,6 +827,12 @@ class Parameters(_CustomBaseModel):
 
         data_handlers: Ordered list of data handler configurations; each
             handler receives the serialized byte object in turn
+
+        execution: Configuration for the execution of the data workflow. Defaults
+            to sequential execution
+
+        reporting: Configuration for the periodic reporting of the workflow
+            statistics
     """
 
     source_identifier: str
@@ -352,10 +843,18 @@ class Parameters(_CustomBaseModel):
     processing_pipeline: ProcessingPipelineParameters
     data_serializer: DataSerializerParameters
     data_handlers: List[DataHandlerParameters]
+    execution: ExecutionParameters = Field(default_factory=ExecutionParameters)
+    reporting: ReportingParameters = Field(default_factory=ReportingParameters)
 
     @model_validator(mode="after")
     def _check_model(self) -> Self:
-        # Validates cross-field constraints after model initialization
+        # Validates cross-field constraints after model initialization, and sizes
+        # the batch buffer ring of the processing pipeline if it is not set
+
+        if self.processing_pipeline.number_of_batch_buffers is None:
+            self.processing_pipeline.number_of_batch_buffers = self.execution.number_of_batch_buffers(
+                messages_held_by_data_handlers=self._messages_held_by_data_handlers()
+            )
 
         if self.data_serializer.type == "SimplonBinarySerializer":
             required_sources = [
@@ -375,3 +874,33 @@ class Parameters(_CustomBaseModel):
                 )
 
         return self
+
+    def _messages_held_by_data_handlers(self) -> int:
+        # Computes how many serialized messages that are views of the batch buffers
+        # the data handlers can keep after they are done with them. Only the NumPy
+        # multipart serializer without compression emits such messages, and only
+        # the ZMQ streaming data handlers send them without copying, keeping up to
+        # SNDHWM of them queued in the socket (plus the in-memory queue of the
+        # background sending thread). A buffer is released when all the data
+        # handlers have released it, so the largest count is the one that matters.
+        # An unlimited ZMQ queue (SNDHWM 0) is left to the growth of the ring
+
+        if (
+            self.data_serializer.type != "NumpyMultipartSerializer"
+            or self.data_serializer.compression is not None
+        ):
+            return 0
+        return max(
+            (
+                data_handler.send_high_water_mark
+                + (
+                    data_handler.send_queue_size
+                    if data_handler.background_sending
+                    else 0
+                )
+                for data_handler in self.data_handlers
+                if data_handler.type == "BinaryDataStreamingDataHandler"
+                and data_handler.library == "zmq"
+            ),
+            default=0,
+        )
@@ -0,0 +1,133 @@
+# Weight of the most recent batch in the moving averages of the measurements
+_SMOOTHING: float = 0.3
+
+# Maximum factor by which the batch size can grow or shrink after each batch
+_MAX_STEP: float = 2.0
+
+# Number of consecutive batches with the same size after which the batch size is
+# considered converged
+_CONVERGENCE_BATCHES: int = 10
+
+
+class AdaptiveBatchSize:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self,
+        initial_batch_size: int,
+        min_batch_size: int,
+        max_batch_size: int,
+        target_batch_bytes: int,
+        target_batch_latency: float,
+    ) -> None:
+        """
+        Initializes an adaptive batch size controller
+
+        After each batch, the controller receives the number of events in the batch,
+        the size of the batch, and the time the downstream components took to
+        accept it (serialization and sending when the workflow runs sequentially,
+        or the time spent blocked by a full queue when it runs in threaded mode).
+        From moving averages of the size and downstream time per event, it
+        computes the batch size that would hit the targets, and moves the current
+        batch size towards it, within the configured bounds. When both targets are
+        set, the smaller of the two batch sizes is used
+
+        Arguments:
+
+            initial_batch_size: The batch size used before any measurement
+
+            min_batch_size: The minimum batch size
+
+            max_batch_size: The maximum batch size
+
+            target_batch_bytes: The target size of a batch, in bytes. Zero
+                disables this target
+
+            target_batch_latency: The target downstream time per batch, in seconds.
+                Zero disables this target
+        """
+        self._min_batch_size: int = min_batch_size
+        self._max_batch_size: int = max_batch_size
+        self._target_batch_bytes: int = target_batch_bytes
+        self._target_batch_latency: float = target_batch_latency
+
+        self._batch_size: int = min(
+            max(initial_batch_size, min_batch_size), max_batch_size
+        )
+        self._bytes_per_event: float | None = None
+        self._time_per_event: float | None = None
+        self._unchanged_batches: int = 0
+        self._reported_batch_size: int | None = None
+
+    @property
+    def batch_size(self) -> int:
+        """
+        The current batch size
+        """
+        return self._batch_size
+
+    def _average(self, average: float | None, value: float) -> float:
+        # Updates an exponential moving average with a new value
+
+        if average is None:
+            return value
+        return (1.0 - _SMOOTHING) * average + _SMOOTHING * value
+
+    def update(self, events: int, batch_bytes: int, downstream_time: float) -> None:
+        """
+        Updates the batch size with the measurements of the latest batch
+
+        Arguments:
+
+            events: The number of events in the batch
+
+            batch_bytes: The size of the batch, in bytes
+
+            downstream_time: The time, in seconds, that the downstream components
+                took to accept the batch
+        """
+        if events <= 0:
+            return
+        self._bytes_per_event = self._average(
+            self._bytes_per_event, batch_bytes / events
+        )
+        self._time_per_event = self._average(
+            self._time_per_event, downstream_time / events
+        )
+
+        candidates: list[float] = []
+        if self._target_batch_bytes > 0 and self._bytes_per_event > 0:
+            candidates.append(self._target_batch_bytes / self._bytes_per_event)
+        if self._target_batch_latency > 0 and self._time_per_event > 0:
+            candidates.append(self._target_batch_latency / self._time_per_event)
+        if len(candidates) == 0:
+            return
+
+        target: float = min(
+            max(min(candidates), self._batch_size / _MAX_STEP),
+            self._batch_size * _MAX_STEP,
+        )
+        new_batch_size: int = min(
+            max(int(round(target)), self._min_batch_size), self._max_batch_size
+        )
+
+        if new_batch_size != self._batch_size:
+            self._batch_size = new_batch_size
+            self._unchanged_batches = 0
+            return
+
+        self._unchanged_batches += 1
+        if (
+            self._unchanged_batches >= _CONVERGENCE_BATCHES
+            and self._reported_batch_size != self._batch_size
+        ):
+            self._reported_batch_size = self._batch_size
+            print(
+                f"Adaptive batch size converged to {self._batch_size} events "
+                f"({self._batch_size * self._bytes_per_event / 1e6:.3f} MB, "
+                f"{self._batch_size * self._time_per_event * 1e3:.3f} ms downstream "
+                "per batch)",
+                flush=True,
+            )
@@ -1,10 +1,12 @@
-from dataclasses import dataclass, field
+import weakref
+from dataclasses import dataclass
+from threading import Condition
 from typing import Any
 
 import numpy
-from numpy.typing import DTypeLike
+from numpy.typing import DTypeLike, NDArray
 
-from ...utils.logging import log_error_and_exit
+from ...utils.logging import log, log_error_and_exit
 from ...utils.typing import StrFloatIntNDArray
 
 
@@ -15,33 +17,93 @@ class DataContainer:
 
     Attributes:
 
-        data: A list of numpy arrays accumulated so far for this data source
+        data: A preallocated numpy array storing the data accumulated so far for this
+            data source. The first axis indexes the stored entries
 
         dtype: The numpy dtype of the arrays, inferred from the first array added
 
         shape: The shape of each individual array, inferred from the first array added
     """
 
-    data: list[StrFloatIntNDArray] = field(default_factory=list)
+    data: StrFloatIntNDArray | None = None
     dtype: DTypeLike | None = None
     shape: tuple[int, ...] | None = None
 
 
+def _fill_value(dtype: DTypeLike) -> Any:
+    # Returns the null value used to fill missing data of the given dtype
+
+    if numpy.issubdtype(dtype, numpy.floating):
+        return numpy.float64("nan")
+    if numpy.issubdtype(dtype, numpy.signedinteger):
+        return -999
+    if numpy.issubdtype(dtype, numpy.str_):
+        return "None"
+    return 0
+
+
+def _buffer_dtype(dtype: DTypeLike) -> DTypeLike:
+    # Returns the dtype of the buffer that stores data of the given dtype. String
+    # buffers are wide enough to store the null value used for missing data
+
+    if numpy.issubdtype(dtype, numpy.str_):
+        return numpy.promote_types(dtype, numpy.dtype("U4"))
+    return dtype
+
+
+# Time to wait for a buffer to be released before allocating an extra one (or,
+# once the ring has reached its maximum size, before warning again), in seconds
+_RELEASE_TIMEOUT: float = 10.0
+
+# Maximum size of the ring, as a multiple of the initial number of buffers
+_MAX_RING_GROWTH: int = 2
+
+# Alignment of the data of each label within a buffer, in bytes
+_ALIGNMENT: int = 64
+
+
 class DataStorage:
     """
     See documentation of the `__init__` function
     """
 
-    def __init__(self) -> None:
+    def __init__(self, capacity: int, number_of_buffers: int = 2) -> None:
         """
         Initializes a Data Storage object
 
         Data Storage objects are containers that can store numpy arrays and allow
-        bulk retrieval of the stored data
+        bulk retrieval of the stored data. Once the labels, dtypes and shapes of the
+        data are known (from the first added entry), a buffer that can hold
+        `capacity` entries for all labels is taken from a ring of preallocated
+        buffers, and each added entry is written directly into the next row of the
+        buffer
+
+        Retrieved data is handed off to the caller without copying. A buffer goes
+        back to the ring only when all the arrays retrieved from it have been
+        released, so the memory used by the Data Storage object does not grow with
+        the rate at which data is retrieved. If no buffer is released in a
+        reasonable time, a warning is logged and an extra buffer is added to the
+        ring, up to twice the initial number of buffers. Beyond that, the Data
+        Storage object keeps waiting for a buffer, and logs a warning periodically
+
+        Arguments:
+
+            capacity: The maximum number of entries that can be stored before the
+                Data Storage object must be reset
+
+            number_of_buffers: The initial number of buffers in the ring
         """
 
+        self._capacity: int = capacity
+        self._number_of_buffers: int = number_of_buffers
         self._data_containers: dict[str, DataContainer] = {}
         self._count: int = 0
+        self._handed_off: bool = False
+
+        self._layout: dict[str, tuple[int, int]] = {}
+        self._buffers: list[bytearray] = []
+        self._free_buffers: list[int] = []
+        self._condition: Condition = Condition()
 
     def __len__(self) -> int:
         """
@@ -54,23 +116,123 @@ class DataStorage:
         """
         return self._count
 
+    def _compute_layout(self) -> None:
+        # Computes the offset and size of the data of each label within a buffer
+
+        offset: int = 0
+        data_source_name: str
+        data_container: DataContainer
+        for data_source_name, data_container in self._data_containers.items():
+            assert data_container.shape is not None
+            size: int = (
+                self._capacity
+                * int(numpy.prod(data_container.shape))
+                * numpy.dtype(_buffer_dtype(data_container.dtype)).itemsize
+            )
+            self._layout[data_source_name] = (offset, size)
+            offset += -(-size // _ALIGNMENT) * _ALIGNMENT
+
+    def _release_buffer(self, buffer_index: int) -> None:
+        # Puts a buffer back in the ring. Called when all the arrays that use the
+        # buffer have been garbage collected
+
+        with self._condition:
+            self._free_buffers.append(buffer_index)
+            self._condition.notify()
+
+    def _acquire_buffer(self) -> int:
+        # Takes a buffer from the ring, waiting for one to be released if none is
+        # available. The ring grows, up to its maximum size, when no buffer is
+        # released in time
+
+        with self._condition:
+            if len(self._free_buffers) == 0 and (
+                len(self._buffers) < self._number_of_buffers
+            ):
+                self._add_buffer()
+            while not self._condition.wait_for(
+                lambda: len(self._free_buffers) > 0, timeout=_RELEASE_TIMEOUT
+            ):
+                if len(self._buffers) < self._number_of_buffers * _MAX_RING_GROWTH:
+                    log.warning(
+                        f"No batch buffer was released in {_RELEASE_TIMEOUT} "
+                        "seconds, adding a buffer to the ring "
+                        f"({len(self._buffers) + 1} buffers). Consider increasing "
+                        "number_of_batch_buffers"
+                    )
+                    self._add_buffer()
+                else:
+                    log.warning(
+                        f"No batch buffer was released in {_RELEASE_TIMEOUT} "
+                        "seconds, and the ring has reached its maximum size "
+                        f"({len(self._buffers)} buffers). Waiting for the "
+                        "downstream components to release a batch"
+                    )
+            return self._free_buffers.pop()
+
+    def _add_buffer(self) -> None:
+        # Adds a free buffer to the ring. Must be called while holding the lock
+
+        self._free_buffers.append(len(self._buffers))
+        self._buffers.append(bytearray(self._buffer_size()))
+
+    def _buffer_size(self) -> int:
+        # Returns the size of each buffer in the ring, in bytes
+
+        return max(
+            [_ALIGNMENT] + [offset + size for offset, size in self._layout.values()]
+        )
+
+    def _allocate_buffers(self) -> None:
+        # Takes a buffer from the ring and maps the data of each data container onto
+        # it
+
+        data_source_name: str
+        data_container: DataContainer
+        for data_container in self._data_containers.values():
+            data_container.data = None
+
+        buffer_index: int = self._acquire_buffer()
+        root: NDArray[numpy.uint8] = numpy.frombuffer(
+            self._buffers[buffer_index], dtype=numpy.uint8
+        )
+        weakref.finalize(root, self._release_buffer, buffer_index)
+
+        for data_source_name, data_container in self._data_containers.items():
+            assert data_container.shape is not None
+            offset: int
+            size: int
+            offset, size = self._layout[data_source_name]
+            data_container.data = (
+                root[offset : offset + size]
+                .view(_buffer_dtype(data_container.dtype))
+                .reshape((self._capacity, *data_container.shape))
+            )
+        self._handed_off = False
+
     def add_data(self, data: dict[str, StrFloatIntNDArray | None]) -> None:
         """
         Adds data to the Data Storage object
 
         The function takes a dictionary storing numpy arrays, each identified
         by a dictionary key label. When called for the first time, it uses
-        the incoming data to determine labels and dtypes of the numpy arrays to
-        accumulate. All subsequent calls of the function will only accept data arrays
-        with the same labels and dtypes as the initial call, or data whose value is
-        None. If the data value is None, this function will the fill the missing data
-        with appropriate null values (numpy.NaN for float data, the number -999 for int
-        data, and the string "None" for str data)
+        the incoming data to determine labels, dtypes and shapes of the numpy arrays
+        to accumulate. All subsequent calls of the function will only accept data
+        arrays with the same labels, dtypes and shapes as the initial call, or data
+        whose value is None. If the data value is None, this function will the fill
+        the missing data with appropriate null values (numpy.NaN for float data, the
+        number -999 for int data, the string "None" for str data, and zero for any
+        other type of data)
 
         Arguments:
 
             data: a dictionary storing numpy arrays
         """
+        if self._count >= self._capacity:
+            log_error_and_exit(
+                f"The Data Storage container is full ({self._capacity} entries). It "
+                "must be reset before adding more data"
+            )
         if len(self._data_containers) == 0:
             data_source_name: str
             for data_source_name in data:
@@ -81,12 +243,12 @@ class DataStorage:
                         "event. Impossible to determine data size"
                     )
                 else:
-                    data_container = DataContainer(
-                        data=[data_value],
+                    self._data_containers[data_source_name] = DataContainer(
                         dtype=data_value.dtype,
                         shape=data_value.shape,
                     )
-                    self._data_containers[data_source_name] = data_container
+            self._compute_layout()
+            self._allocate_buffers()
         else:
             if sorted(data.keys()) != sorted(self._data_containers.keys()):
                 log_error_and_exit(
@@ -95,48 +257,31 @@ class DataStorage:
                 )
             for data_source_name in data:
                 data_value = data[data_source_name]
-                data_container = self._data_containers[data_source_name]
+                data_container: DataContainer = self._data_containers[data_source_name]
                 if data_value is None:
-                    if data_container.shape is not None:
-                        if numpy.issubdtype(
-                            data_container.dtype, numpy.signedinteger[Any]
-                        ):
-                            data_container.data.append(
-                                numpy.full(data_container.shape, "-999")
-                            )
-                            continue
-                        elif numpy.issubdtype(
-                            data_container.dtype, numpy.floating[Any]
-                        ):
-                            data_container.data.append(
-                                numpy.full(
-                                    data_container.shape,
-                                    numpy.float64("nan"),
-                                    dtype=data_container.dtype,
-                                )
-                            )
-                            continue
-                        else:
-                            data_container.data.append(
-                                numpy.full(
-                                    data_container.shape, "None", dtype=numpy.str_
-                                )
-                            )
-                            continue
-                else:
-                    if data_value.dtype != data_container.dtype:
-                        log_error_and_exit(
-                            f"The dtype of the data entry {data_source_name} in the "
-                            "current event does not match the dtype of the data "
-                            "with which this label was originally initialized"
-                        )
-                    if data_value.shape != data_container.shape:
-                        log_error_and_exit(
-                            f"The shape of the data entry {data_source_name} in the "
-                            "current event does not match the shape of the data "
-                            "with which this label was originally initialized"
-                        )
-                    data_container.data.append(data_value)
+                    continue
+                if data_value.dtype != data_container.dtype:
+                    log_error_and_exit(
+                        f"The dtype of the data entry {data_source_name} in the "
+                        "current event does not match the dtype of the data "
+                        "with which this label was originally initialized"
+                    )
+                if data_value.shape != data_container.shape:
+                    log_error_and_exit(
+                        f"The shape of the data entry {data_source_name} in the "
+                        "current event does not match the shape of the data "
+                        "with which this label was originally initialized"
+                    )
+
+        for data_source_name in data:
+            data_value = data[data_source_name]
+            data_container = self._data_containers[data_source_name]
+            assert data_container.data is not None
+            data_container.data[self._count] = (
+                data_value
+                if data_value is not None
+                else _fill_value(data_container.dtype)
+            )
         self._count += 1
 
     def retrieve_stored_data(self) -> dict[str, StrFloatIntNDArray | None]:
@@ -149,6 +294,11 @@ class DataStorage:
         representing each subsequent data item added, and the rest of the axes
         representing the accumulated data
 
+        The returned arrays are views of the internal buffer, and are not copied.
+        The buffer is handed off to the caller: after the next reset, new data is
+        written into another buffer from the ring. The retrieved buffer goes back to
+        the ring once all the returned arrays (and any view of them) are released
+
         Returns:
 
             stored_data: A dictionary containing the data accumulated by the
@@ -159,22 +309,25 @@ class DataStorage:
 
         data_source_name: str
         for data_source_name in self._data_containers:
-            stored_data[data_source_name] = numpy.stack(
-                self._data_containers[data_source_name].data,
-            )
+            data: StrFloatIntNDArray | None = self._data_containers[
+                data_source_name
+            ].data
+            assert data is not None
+            stored_data[data_source_name] = data[: self._count]
 
+        self._handed_off = True
         return stored_data
 
     def reset_data_storage(self) -> None:
         """
         Resets the Data Storage container
 
-        Clears all accumulated arrays from every data container and resets the
-        internal event counter to zero. The container labels and dtypes inferred
-        from the first event are preserved so that the storage can be reused for
-        a new batch without re-initialization
+        Resets the internal event counter to zero. The container labels, dtypes and
+        shapes inferred from the first event are preserved so that the storage can
+        be reused for a new batch without re-initialization. If the stored data was
+        retrieved, another buffer is taken from the ring, so that the retrieved
+        arrays are never overwritten
         """
-        data_source_name: str
-        for data_source_name in self._data_containers:
-            self._data_containers[data_source_name].data = []
+        if self._handed_off:
+            self._allocate_buffers()
         self._count = 0
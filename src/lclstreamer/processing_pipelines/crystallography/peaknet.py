@@ -5,6 +5,7 @@ import numpy
 from numpy.typing import NDArray
 
 from ...models.parameters import (
+    ExecutionParameters,
     PeaknetPreprocessingPipelineParameters,
 )
 from ...utils.logging import log_error_and_exit
@@ -175,6 +176,11 @@ class PeaknetPreprocessingPipeline(ProcessingPipelineProtocol):
             )
 
         self._batch_size: int = parameters.batch_size
+        self._number_of_batch_buffers: int = (
+            parameters.number_of_batch_buffers
+            if parameters.number_of_batch_buffers is not None
+            else ExecutionParameters().number_of_batch_buffers()
+        )
 
         # Initialize padding utility
         self._padder: _NumpyPad = _NumpyPad(
@@ -205,7 +211,10 @@ class PeaknetPreprocessingPipeline(ProcessingPipelineProtocol):
 
             batch: A dictionary of processed and batched events
         """
-        data_storage: DataStorage = DataStorage()
+        data_storage: DataStorage = DataStorage(
+            capacity=self._batch_size,
+            number_of_buffers=self._number_of_batch_buffers,
+        )
 
         data: dict[str, StrFloatIntNDArray | None]
         for data in stream:
@@ -1,11 +1,16 @@
 from collections.abc import Iterator
+from time import perf_counter
 
 from ...models.parameters import (
     BatchProcessingPipelineParameters,
+    ExecutionParameters,
 )
 from ...utils.logging import log_error_and_exit
 from ...utils.protocols import ProcessingPipelineProtocol
+from ...utils.statistics import data_size
+from ...utils.stream import poll_items
 from ...utils.typing import StrFloatIntNDArray
+from ..common.adaptive_batch_size import AdaptiveBatchSize
 from ..common.data_storage import DataStorage
 
 
@@ -18,7 +23,12 @@ class BatchProcessingPipeline(ProcessingPipelineProtocol):
         """
         Initializes a batching pipeline
 
-        This pipeline accumulates data into batches
+        This pipeline accumulates data into batches. A batch is flushed when it
+        reaches the configured number of events, the configured size in bytes, or
+        the configured age (the time since its first event was added), whichever
+        comes first. In adaptive mode, the number of events per batch is adjusted
+        after each batch, based on the size of the batch and on the time the
+        downstream components take to accept it
 
         Arguments:
 
@@ -30,6 +40,26 @@ class BatchProcessingPipeline(ProcessingPipelineProtocol):
             )
 
         self.batch_size: int = parameters.batch_size
+        self._number_of_batch_buffers: int = (
+            parameters.number_of_batch_buffers
+            if parameters.number_of_batch_buffers is not None
+            else ExecutionParameters().number_of_batch_buffers()
+        )
+        self._max_batch_latency: float = parameters.max_batch_latency_ms / 1000.0
+        self._max_batch_bytes: int = parameters.max_batch_bytes
+
+        self._max_batch_size: int = parameters.batch_size
+        self._adaptive_batch_size: AdaptiveBatchSize | None = None
+        if parameters.adaptive_batch_size:
+            if parameters.max_batch_size is not None:
+                self._max_batch_size = parameters.max_batch_size
+            self._adaptive_batch_size = AdaptiveBatchSize(
+                initial_batch_size=parameters.batch_size,
+                min_batch_size=parameters.min_batch_size,
+                max_batch_size=self._max_batch_size,
+                target_batch_bytes=parameters.target_batch_bytes,
+                target_batch_latency=parameters.target_batch_latency_ms / 1000.0,
+            )
 
     def __call__(
         self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
@@ -37,9 +67,11 @@ class BatchProcessingPipeline(ProcessingPipelineProtocol):
         """
         Applies the batching pipeline to incoming event data
 
-        Accumulates individual events into batches. Once a full batch has been
-        collected it is returned. Any remaining events that do not fill a
-        complete batch at the end of the stream  are yielded as a partial batch
+        Accumulates individual events into batches. Once a batch is full (in number
+        of events or in size), or once its maximum latency has expired, it is
+        returned. The latency of a batch is checked even when no events are
+        arriving. Any remaining events that do not fill a complete batch at the end
+        of the stream  are yielded as a partial batch
 
         Arguments:
 
@@ -49,15 +81,56 @@ class BatchProcessingPipeline(ProcessingPipelineProtocol):
 
             batch: A dictionary of processed and batched events
         """
-        data_storage: DataStorage = DataStorage()
-
-        data: dict[str, StrFloatIntNDArray | None]
-        for data in stream:
-            data_storage.add_data(data=data)
-
-            if len(data_storage) >= self.batch_size:
+        data_storage: DataStorage = DataStorage(
+            capacity=self._max_batch_size,
+            number_of_buffers=self._number_of_batch_buffers,
+        )
+        batch_bytes: int = 0
+        batch_start_time: float | None = None
+
+        def _time_to_flush() -> float | None:
+            # Returns the time left before the current batch must be flushed
+            if batch_start_time is None:
+                return None
+            return batch_start_time + self._max_batch_latency - perf_counter()
+
+        events: Iterator[dict[str, StrFloatIntNDArray | None] | None] = (
+            poll_items(stream, timeout=_time_to_flush, name="batch_latency")
+            if self._max_batch_latency > 0
+            else stream
+        )
+
+        batch_size: int = self.batch_size
+
+        data: dict[str, StrFloatIntNDArray | None] | None
+        for data in events:
+            if data is not None:
+                if batch_start_time is None:
+                    batch_start_time = perf_counter()
+                data_storage.add_data(data=data)
+                batch_bytes += data_size(data)
+
+            if (
+                len(data_storage) >= batch_size
+                or (self._max_batch_bytes > 0 and batch_bytes >= self._max_batch_bytes)
+                or (
+                    self._max_batch_latency > 0
+                    and len(data_storage) > 0
+                    and perf_counter() - batch_start_time >= self._max_batch_latency
+                )
+            ):
+                yield_time: float = perf_counter()
                 yield data_storage.retrieve_stored_data()
+                if self._adaptive_batch_size is not None:
+                    self._adaptive_batch_size.update(
+                        events=len(data_storage),
+                        batch_bytes=batch_bytes,
+                        downstream_time=perf_counter() - yield_time,
+                    )
+                    batch_size = self._adaptive_batch_size.batch_size
                 data_storage.reset_data_storage()
+                batch_bytes = 0
+                batch_start_time = None
 
         if len(data_storage) > 0:
             yield data_storage.retrieve_stored_data()
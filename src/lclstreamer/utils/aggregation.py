@@ -0,0 +1,274 @@
+from collections.abc import Callable
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
+from typing import Any
+
+import numpy
+from mpi4py import MPI
+from numpy.typing import NDArray
+
+from .statistics import StageStatistics
+
+# Layout of the statistics snapshot sent by each worker to rank 0
+_EVENTS: int = 0
+_BYTES: int = 1
+_ELAPSED: int = 2
+_FINAL: int = 3
+_SNAPSHOT_SIZE: int = 4
+
+_STATISTICS_TAG: int = 1
+
+
+class MpiStatisticsAggregator:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self,
+        events: StageStatistics,
+        messages: StageStatistics,
+        interval_seconds: float,
+        report: Callable[[dict[str, int | float]], None] | None = None,
+    ) -> None:
+        """
+        Initializes an aggregator of the statistics of all the MPI workers
+
+        Every `interval_seconds` seconds, each worker sends a snapshot of its event
+        and byte counters to the worker with rank 0, using non-blocking
+        point-to-point messages on a dedicated communicator. Point-to-point
+        messages are used instead of collective operations because the workers
+        reach their reporting points at different times and a different number of
+        times. Rank 0 collects the latest snapshot of each worker and reports the
+        job-wide event and data rates, together with the minimum, median and
+        maximum rates across workers. Workers that have not sent any snapshot yet
+        are left out of the rates across workers.
+
+        When a report function is provided, and MPI supports calls from several
+        threads, the snapshots are exchanged by a background thread, at regular
+        intervals, so that rank 0 reports even when it processes no events (as with
+        psana2, where rank 0 only reads and distributes the data). Otherwise, the
+        `update` function must be called regularly by each worker
+
+        This function must be called by all the MPI workers, since it duplicates
+        the world communicator
+
+        Arguments:
+
+            events: The statistics of the stage that counts the events
+
+            messages: The statistics of the stage that counts the serialized
+                messages and their size
+
+            interval_seconds: The time interval between snapshots, in seconds
+
+            report: A function called on rank 0 with each job-wide report. If None,
+                the reports are returned by the `update` function
+        """
+        self._communicator: Any = MPI.COMM_WORLD.Dup()
+        self._rank: int = self._communicator.Get_rank()
+        self._size: int = self._communicator.Get_size()
+        self._events: StageStatistics = events
+        self._messages: StageStatistics = messages
+        self._interval_seconds: float = interval_seconds
+
+        self._start_time: float = perf_counter()
+        self._last_snapshot_time: float = self._start_time
+        self._pending_sends: list[tuple[Any, NDArray[numpy.float64]]] = []
+
+        # Latest and previous snapshot of each worker, and whether the worker has
+        # sent a snapshot (only used on rank 0)
+        self._latest: NDArray[numpy.float64] = numpy.zeros(
+            (self._size, _SNAPSHOT_SIZE), dtype=numpy.float64
+        )
+        self._previous: NDArray[numpy.float64] = numpy.zeros(
+            (self._size, _SNAPSHOT_SIZE), dtype=numpy.float64
+        )
+        self._reported: NDArray[numpy.bool_] = numpy.zeros(self._size, dtype=bool)
+
+        self._lock: Lock = Lock()
+        self._stop: Event = Event()
+        self._thread: Thread | None = None
+        if report is not None and MPI.Query_thread() == MPI.THREAD_MULTIPLE:
+            self._thread = Thread(
+                target=self._run, args=(report,), name="statistics", daemon=True
+            )
+            self._thread.start()
+
+    def _snapshot(self, final: bool) -> NDArray[numpy.float64]:
+        # Takes a snapshot of the statistics of the current worker
+
+        snapshot: NDArray[numpy.float64] = numpy.zeros(
+            _SNAPSHOT_SIZE, dtype=numpy.float64
+        )
+        snapshot[_EVENTS] = self._events.items
+        snapshot[_BYTES] = self._messages.bytes
+        snapshot[_ELAPSED] = perf_counter() - self._start_time
+        snapshot[_FINAL] = 1.0 if final else 0.0
+        return snapshot
+
+    def _store(self, rank: int, snapshot: NDArray[numpy.float64]) -> None:
+        # Stores the snapshot of a worker, keeping the previous one
+
+        self._previous[rank] = self._latest[rank]
+        self._latest[rank] = snapshot
+        self._reported[rank] = True
+
+    def _send(self, final: bool) -> None:
+        # Sends a snapshot of the current worker to rank 0 without blocking, or
+        # stores it directly on rank 0
+
+        snapshot: NDArray[numpy.float64] = self._snapshot(final)
+        if self._rank == 0:
+            self._store(0, snapshot)
+            return
+        self._pending_sends = [
+            (request, buffer)
+            for request, buffer in self._pending_sends
+            if not request.Test()
+        ]
+        self._pending_sends.append(
+            (
+                self._communicator.Isend(
+                    [snapshot, MPI.DOUBLE], dest=0, tag=_STATISTICS_TAG
+                ),
+                snapshot,
+            )
+        )
+
+    def _receive(self) -> None:
+        # Stores all the snapshots that have reached rank 0 so far
+
+        status: Any = MPI.Status()
+        while self._communicator.Iprobe(
+            source=MPI.ANY_SOURCE, tag=_STATISTICS_TAG, status=status
+        ):
+            snapshot: NDArray[numpy.float64] = numpy.zeros(
+                _SNAPSHOT_SIZE, dtype=numpy.float64
+            )
+            self._communicator.Recv(
+                [snapshot, MPI.DOUBLE], source=status.Get_source(), tag=_STATISTICS_TAG
+            )
+            self._store(status.Get_source(), snapshot)
+
+    def _report(self) -> dict[str, int | float]:
+        # Computes the job-wide statistics from the latest snapshots of the workers
+        # that have sent at least one
+
+        ranks: NDArray[numpy.intp] = numpy.flatnonzero(self._reported)
+        latest: NDArray[numpy.float64] = self._latest[ranks]
+        previous: NDArray[numpy.float64] = self._previous[ranks]
+        elapsed: NDArray[numpy.float64] = latest[:, _ELAPSED]
+        interval: NDArray[numpy.float64] = numpy.maximum(
+            elapsed - previous[:, _ELAPSED], 1e-9
+        )
+        event_rates: NDArray[numpy.float64] = (
+            latest[:, _EVENTS] - previous[:, _EVENTS]
+        ) / interval
+        byte_rates: NDArray[numpy.float64] = (
+            latest[:, _BYTES] - previous[:, _BYTES]
+        ) / interval
+        total_elapsed: float = max(float(elapsed.max()), 1e-9)
+
+        return {
+            "workers": self._size,
+            "reporting_workers": len(ranks),
+            "events": int(latest[:, _EVENTS].sum()),
+            "events/s": round(float(event_rates.sum()), 2),
+            "cumulative_events/s": round(
+                float(latest[:, _EVENTS].sum()) / total_elapsed, 2
+            ),
+            "MB/s": round(float(byte_rates.sum()) / 1e6, 3),
+            "cumulative_MB/s": round(
+                float(latest[:, _BYTES].sum()) / total_elapsed / 1e6, 3
+            ),
+            "min_worker_events/s": round(float(event_rates.min()), 2),
+            "median_worker_events/s": round(float(numpy.median(event_rates)), 2),
+            "max_worker_events/s": round(float(event_rates.max()), 2),
+            "slowest_worker": int(ranks[event_rates.argmin()]),
+        }
+
+    def _update(self) -> dict[str, int | float] | None:
+        # Exchanges the statistics snapshots if the snapshot interval has elapsed
+
+        with self._lock:
+            if self._rank == 0:
+                self._receive()
+            if perf_counter() - self._last_snapshot_time < self._interval_seconds:
+                return None
+            self._last_snapshot_time = perf_counter()
+            self._send(final=False)
+            if self._rank == 0:
+                return self._report()
+            return None
+
+    def _run(self, report: Callable[[dict[str, int | float]], None]) -> None:
+        # Runs in the background thread: exchanges the snapshots at regular
+        # intervals, and passes the job-wide reports to the report function
+
+        while not self._stop.wait(self._interval_seconds):
+            job_report: dict[str, int | float] | None = self._update()
+            if job_report is not None:
+                report(job_report)
+
+    def update(self) -> dict[str, int | float] | None:
+        """
+        Exchanges the statistics snapshots if the snapshot interval has elapsed
+
+        This function must be called regularly by every worker, unless the
+        snapshots are exchanged by the background thread, in which case it does
+        nothing. It never blocks
+
+        Returns:
+
+            report: On rank 0, when the snapshot interval has elapsed, a dictionary
+                with the job-wide statistics: the number of workers and of workers
+                that have sent a snapshot, the total number of events, the
+                instantaneous and cumulative job-wide event and data rates, the
+                minimum, median and maximum event rate across the workers that have
+                sent a snapshot, and the rank of the slowest of them. None otherwise
+        """
+        if self._thread is not None:
+            return None
+        return self._update()
+
+    def finalize(self, timeout: float = 60.0) -> dict[str, int | float] | None:
+        """
+        Sends the final statistics snapshot of each worker to rank 0
+
+        The background thread, if any, is stopped first. On rank 0, this function
+        waits until the final snapshots of all workers have been received, or until
+        the timeout expires
+
+        Arguments:
+
+            timeout: The maximum time to wait for the final snapshots, in seconds
+
+        Returns:
+
+            report: On rank 0, a dictionary with the final job-wide statistics (see
+                the `update` function). None otherwise
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+        self._send(final=True)
+        if self._rank != 0:
+            request: Any
+            for request, _ in self._pending_sends:
+                request.Wait()
+            self._pending_sends = []
+            return None
+
+        deadline: float = perf_counter() + timeout
+        while perf_counter() < deadline:
+            self._receive()
+            if self._latest[:, _FINAL].all():
+                break
+            sleep(0.01)
+
+        # The final rates are cumulative over the whole run of each worker
+        self._previous[:] = 0.0
+        return self._report()
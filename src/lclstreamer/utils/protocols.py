@@ -11,7 +11,7 @@ from ..models.parameters import (
     EventSourceParameters,
     ProcessingPipelineParameters,
 )
-from ..utils.typing import StrFloatIntNDArray
+from ..utils.typing import SerializedData, StrFloatIntNDArray
 
 
 class EventSourceProtocol(Protocol):
@@ -89,9 +89,15 @@ class DataSerializerProtocol(Protocol):
 
     def __call__(
         self, stream: Iterator[dict[str, StrFloatIntNDArray | None]]
-    ) -> Iterator[bytes]:
+    ) -> Iterator[SerializedData]:
         """
-        Serializes a stream of event data dictionaries into a stream of byte objects
+        Serializes a stream of event data dictionaries into a stream of serialized
+        messages
+
+        Each message is either a single object supporting the buffer protocol
+        (bytes, memoryview, numpy array, ...), or a list of such objects forming a
+        multipart message. Serializers should hand over views of their internal
+        buffers instead of concatenating or copying them
 
         Arguments:
 
@@ -100,10 +106,22 @@ class DataSerializerProtocol(Protocol):
 
         Returns:
 
-            bytes_stream: An iterator of serialized byte objects
+            bytes_stream: An iterator of serialized messages
         """
         ...
 
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns statistics specific to the data serializer (for example, the
+        compression settings chosen at runtime), reported together with the
+        statistics of the data serializer stage
+
+        Returns:
+
+            statistics: A dictionary of statistics, empty by default
+        """
+        return {}
+
 
 class DataHandlerProtocol(Protocol):
     """
@@ -114,11 +132,37 @@ class DataHandlerProtocol(Protocol):
         """Initializes the data handler"""
         ...
 
-    def __call__(self, data: bytes) -> None:
+    def __call__(self, data: SerializedData) -> None:
         """
-        Handles a serialized byte object, forwarding it to an external destination
+        Handles a serialized message, forwarding it to an external destination
+
+        The buffers of the message must be forwarded without being joined or
+        copied, when possible (for example, with scatter-gather writes or
+        zero-copy sends)
 
         Arguments:
 
-            data: A bytes object containing serialized event data
+            data: A serialized message: a buffer, or a list of buffers forming a
+                multipart message
+        """
+        ...
+
+    def statistics(self) -> dict[str, int | float]:
+        """
+        Returns statistics specific to the data handler (for example, the state of
+        the consumers it sends data to), reported together with the statistics of
+        the data handlers stage
+
+        Returns:
+
+            statistics: A dictionary of statistics, empty by default
+        """
+        return {}
+
+    def close(self) -> None:
+        """
+        Finishes handling the serialized messages (for example, sending the
+        messages still queued) and releases the resources of the data handler.
+        Called once, after the last message. Does nothing by default
         """
+        pass
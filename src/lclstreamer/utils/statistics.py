@@ -0,0 +1,377 @@
+from collections import deque
+from collections.abc import Callable
+from threading import RLock
+from time import perf_counter
+from typing import Any
+
+import numpy
+from numpy.typing import NDArray
+
+
+def data_size(data: Any) -> int:
+    """
+    Computes the size of a data item flowing through the data workflow
+
+    Arguments:
+
+        data: A data item: an object supporting the buffer protocol (a byte
+            object, a numpy array, ...), or a dictionary, list or tuple of those
+
+    Returns:
+
+        size: The size of the data item in bytes
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, memoryview):
+        return data.nbytes
+    if isinstance(data, numpy.ndarray):
+        return int(data.nbytes)  # pyright: ignore[reportUnknownArgumentType, reportUnknownMemberType]
+    if isinstance(data, dict):
+        return sum(
+            data_size(value)
+            for value in data.values()  # pyright: ignore[reportUnknownVariableType]
+        )
+    if isinstance(data, (list, tuple)):
+        return sum(
+            data_size(value)
+            for value in data  # pyright: ignore[reportUnknownVariableType]
+        )
+    try:
+        return memoryview(data).nbytes
+    except TypeError:
+        return 0
+
+
+class StageStatistics:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self,
+        name: str,
+        details: Callable[[], dict[str, int | float]] | None = None,
+    ) -> None:
+        """
+        Initializes the statistics of a stage of the data workflow
+
+        The statistics record how many items (and bytes) the stage produced, and
+        how the time of the stage was spent: working on the data (busy), waiting
+        for data from the upstream stages, or waiting for the downstream stages to
+        accept the data produced by the stage
+
+        The statistics can be updated from the thread that runs the stage while
+        they are read from another one: updates and summaries go through a lock,
+        so a summary never mixes values from before and after an update
+
+        Arguments:
+
+            name: The name of the stage
+
+            details: A function returning additional statistics specific to the
+                stage, included in the summary of the stage
+        """
+        self.name: str = name
+        self.details: Callable[[], dict[str, int | float]] | None = details
+        self.items: int = 0
+        self.bytes: int = 0
+        self.start_time: float | None = None
+        self.stop_time: float | None = None
+        self.next_time: float = 0.0
+        self.upstream_wait_time: float = 0.0
+        self.downstream_wait_time: float = 0.0
+        self._lock: RLock = RLock()
+
+    def record_start(self) -> None:
+        """
+        Records that the stage started operating
+        """
+        with self._lock:
+            self.start_time = perf_counter()
+
+    def record_upstream_wait(self, wait_time: float) -> None:
+        """
+        Records the time the stage spent waiting for an item from upstream
+
+        Arguments:
+
+            wait_time: The waiting time in seconds
+        """
+        with self._lock:
+            self.upstream_wait_time += wait_time
+
+    def record_item(self, next_time: float, size: int) -> None:
+        """
+        Records an item produced by the stage
+
+        Arguments:
+
+            next_time: The time (in seconds) needed to produce the item, including
+                the time spent waiting for input
+
+            size: The size of the item in bytes
+        """
+        with self._lock:
+            self.next_time += next_time
+            self.items += 1
+            self.bytes += size
+
+    def record_downstream_wait(self, wait_time: float) -> None:
+        """
+        Records the time the stage spent waiting for the downstream stages to
+        accept an item
+
+        Arguments:
+
+            wait_time: The waiting time in seconds
+        """
+        with self._lock:
+            self.downstream_wait_time += wait_time
+
+    def record_stop(self, next_time: float) -> None:
+        """
+        Records that the stage stopped operating
+
+        Arguments:
+
+            next_time: The time (in seconds) spent before the stage found out that
+                it had no more items to produce
+        """
+        with self._lock:
+            self.stop_time = perf_counter()
+            self.next_time += next_time
+
+    @property
+    def busy_time(self) -> float:
+        """
+        The time (in seconds) that the stage spent working on the data
+        """
+        with self._lock:
+            return max(self.next_time - self.upstream_wait_time, 0.0)
+
+    def elapsed_time(self) -> float:
+        """
+        Returns the time elapsed since the stage started operating, or the total
+        operating time of the stage if it has already stopped
+
+        Returns:
+
+            elapsed: The elapsed time in seconds
+        """
+        with self._lock:
+            return self._elapsed_time()
+
+    def _elapsed_time(self) -> float:
+        # Computes the elapsed time, with the lock already held
+        if self.start_time is None:
+            return 0.0
+        if self.stop_time is None:
+            return perf_counter() - self.start_time
+        return self.stop_time - self.start_time
+
+    def utilization(self) -> float:
+        """
+        Returns the fraction of the elapsed time that the stage spent working
+
+        Returns:
+
+            utilization: A number between 0 and 1
+        """
+        with self._lock:
+            elapsed: float = self._elapsed_time()
+            if elapsed <= 0.0:
+                return 0.0
+            return min(self.busy_time / elapsed, 1.0)
+
+    def summary(self) -> dict[str, int | float]:
+        """
+        Summarizes the statistics of the stage
+
+        Returns:
+
+            summary: A dictionary with the item count, the size of the produced data
+                in MB, the busy, upstream wait and downstream wait times in seconds,
+                the utilization of the stage, and the additional statistics of the
+                stage
+        """
+        summary: dict[str, int | float]
+        with self._lock:
+            summary = {
+                "items": self.items,
+                "MB": round(self.bytes / 1e6, 3),
+                "busy_s": round(self.busy_time, 3),
+                "upstream_wait_s": round(self.upstream_wait_time, 3),
+                "downstream_wait_s": round(self.downstream_wait_time, 3),
+                "utilization": round(self.utilization(), 3),
+            }
+        return {**summary, **(self.details() if self.details is not None else {})}
+
+
+def stage_statistics_report(stages: list[StageStatistics]) -> str:
+    """
+    Formats the statistics of the stages of the data workflow in a single line
+
+    The stage with the highest utilization, which is most likely the bottleneck of
+    the data workflow, is identified in the report
+
+    Arguments:
+
+        stages: The statistics of each stage, in the order of the data workflow
+
+    Returns:
+
+        report: The formatted statistics
+    """
+    if len(stages) == 0:
+        return ""
+    bottleneck: StageStatistics = max(stages, key=lambda stage: stage.utilization())
+    return (
+        " | ".join(f"{stage.name}: {stage.summary()}" for stage in stages)
+        + f" | bottleneck: {bottleneck.name}"
+    )
+
+
+class RateReporter:
+    """
+    See documentation of the `__init__` function
+    """
+
+    def __init__(
+        self,
+        events: StageStatistics,
+        messages: StageStatistics,
+        interval_seconds: float,
+        interval_messages: int,
+        latency_window: int,
+    ) -> None:
+        """
+        Initializes a rate reporter
+
+        The rate reporter aggregates in place the number of processed events, the
+        number and size of the serialized messages, and the latency of each
+        message (the time between the moment the data serializer emits the message
+        and the moment all data handlers are done with it). A report is due every
+        `interval_seconds` seconds or every `interval_messages` messages, whichever
+        comes first
+
+        Arguments:
+
+            events: The statistics of the stage that counts the events (usually the
+                event source)
+
+            messages: The statistics of the stage that counts the serialized
+                messages and their size (usually the data serializer)
+
+            interval_seconds: The time interval between reports, in seconds. If
+                zero or negative, reports are not triggered by time
+
+            interval_messages: The number of messages between reports. If zero or
+                negative, reports are not triggered by the number of messages
+
+            latency_window: The maximum number of message latencies, from the
+                current report interval, kept to compute the latency percentiles
+        """
+        self._events: StageStatistics = events
+        self._messages: StageStatistics = messages
+        self._interval_seconds: float = interval_seconds
+        self._interval_messages: int = interval_messages
+
+        self._emission_times: deque[float] = deque()
+        self._latencies: NDArray[numpy.float64] = numpy.zeros(
+            latency_window, dtype=numpy.float64
+        )
+        self._latency_count: int = 0
+
+        self._start_time: float = perf_counter()
+        self._last_report_time: float = self._start_time
+        self._last_report_events: int = 0
+        self._last_report_bytes: int = 0
+        self._last_report_messages: int = 0
+        self._handled_messages: int = 0
+
+    def message_emitted(self) -> None:
+        """
+        Records that the data serializer has emitted a message
+        """
+        self._emission_times.append(perf_counter())
+
+    def message_handled(self) -> None:
+        """
+        Records that all the data handlers are done with the oldest emitted message
+        """
+        self._handled_messages += 1
+        if len(self._emission_times) == 0:
+            return
+        self._latencies[self._latency_count % len(self._latencies)] = (
+            perf_counter() - self._emission_times.popleft()
+        )
+        self._latency_count += 1
+
+    def report_due(self) -> bool:
+        """
+        Checks whether a report is due
+
+        Returns:
+
+            due: Whether the report interval (in time or number of messages) has
+                elapsed since the last report
+        """
+        if (
+            self._interval_messages > 0
+            and self._handled_messages - self._last_report_messages
+            >= self._interval_messages
+        ):
+            return True
+        return (
+            self._interval_seconds > 0
+            and perf_counter() - self._last_report_time >= self._interval_seconds
+        )
+
+    def report(self) -> dict[str, int | float]:
+        """
+        Computes the rates for the interval since the last report, and the
+        cumulative ones since the start of the data workflow, then starts a new
+        report interval
+
+        Returns:
+
+            report: A dictionary with the number of events and messages, the
+                instantaneous and cumulative event rates (events/s) and data rates
+                (MB/s), and the median, 90th and 99th percentiles of the message
+                latency (in milliseconds) over the report interval
+        """
+        now: float = perf_counter()
+        events: int = self._events.items
+        data_bytes: int = self._messages.bytes
+        interval: float = max(now - self._last_report_time, 1e-9)
+        elapsed: float = max(now - self._start_time, 1e-9)
+
+        latencies: NDArray[numpy.float64] = self._latencies[
+            : min(self._latency_count, len(self._latencies))
+        ]
+        percentiles: list[float] = (
+            [float(value) * 1e3 for value in numpy.percentile(latencies, (50, 90, 99))]
+            if len(latencies) > 0
+            else [0.0, 0.0, 0.0]
+        )
+
+        report: dict[str, int | float] = {
+            "events": events,
+            "messages": self._handled_messages,
+            "events/s": round((events - self._last_report_events) / interval, 2),
+            "cumulative_events/s": round(events / elapsed, 2),
+            "MB/s": round((data_bytes - self._last_report_bytes) / interval / 1e6, 3),
+            "cumulative_MB/s": round(data_bytes / elapsed / 1e6, 3),
+            "latency_p50_ms": round(percentiles[0], 3),
+            "latency_p90_ms": round(percentiles[1], 3),
+            "latency_p99_ms": round(percentiles[2], 3),
+        }
+
+        self._last_report_time = now
+        self._last_report_events = events
+        self._last_report_bytes = data_bytes
+        self._last_report_messages = self._handled_messages
+        self._latency_count = 0
+
+        return report
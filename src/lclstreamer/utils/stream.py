@@ -1,12 +1,30 @@
-from time import time
+from collections.abc import Callable, Iterator
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import perf_counter, time
 from typing import Any, Dict, Union
 
-from stream.core import Stream
+from stream.core import Stream, stream
 from stream.ops import fold
 
+from .statistics import RateReporter, StageStatistics, data_size
+
 Clock = Dict[str, Union[int, float]]
 
 
+class _EndOfStream:
+    # Marks the end of the items handed over by a threaded stage
+
+    pass
+
+
+class _StageFailure:
+    # Carries an exception raised in a threaded stage over to the consuming thread
+
+    def __init__(self, exception: BaseException) -> None:
+        self.exception: BaseException = exception
+
+
 def _clock_init() -> Clock:
     # Returns the initial state of a rate clock
 
@@ -43,3 +61,254 @@ def clock() -> Stream[Any, Any]:
         clock: A Stream objet
     """
     return fold(_rate_clock, _clock_init())
+
+
+def _put_unless_stopped(queue: "Queue[Any]", item: Any, stop: Event) -> bool:
+    # Puts an item in a bounded queue, giving up if the consumer has stopped
+    # Returns True if the item was queued
+
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            continue
+    return False
+
+
+def _start_producer(
+    items: Iterator[Any], queue_depth: int, name: str
+) -> tuple["Queue[Any]", Event, Thread]:
+    # Starts a background thread that pulls items from an iterator and puts them
+    # in a bounded queue, followed by an end-of-stream marker or by the exception
+    # raised by the iterator. Returns the queue, the event used to stop the thread,
+    # and the thread
+
+    queue: Queue[Any] = Queue(maxsize=queue_depth)
+    stop: Event = Event()
+
+    def _produce() -> None:
+        try:
+            item: Any
+            for item in items:
+                if not _put_unless_stopped(queue, item, stop):
+                    return
+            _put_unless_stopped(queue, _EndOfStream(), stop)
+        except BaseException as exception:
+            _put_unless_stopped(queue, _StageFailure(exception), stop)
+
+    thread: Thread = Thread(target=_produce, name=name, daemon=True)
+    thread.start()
+    return queue, stop, thread
+
+
+@stream
+def threaded_stage(
+    items: Iterator[Any], queue_depth: int = 1, name: str = "stage"
+) -> Iterator[Any]:
+    """
+    Runs the upstream part of a stream in its own thread
+
+    A background thread pulls items from upstream and hands them over to the
+    downstream part of the stream through a bounded queue. When the queue is full,
+    the background thread blocks until downstream catches up. Exceptions raised
+    upstream (including `SystemExit`) are re-raised in the consuming thread
+
+    Arguments:
+
+        items: An iterator over the upstream items
+
+        queue_depth: The maximum number of items that can be queued between the
+            upstream and the downstream part of the stream
+
+        name: A name for the background thread
+
+    Yields:
+
+        item: The upstream items, in their original order
+    """
+    queue: Queue[Any]
+    stop: Event
+    thread: Thread
+    queue, stop, thread = _start_producer(items, queue_depth, name)
+
+    try:
+        while True:
+            try:
+                item: Any = queue.get(timeout=1.0)
+            except Empty:
+                if not thread.is_alive() and queue.empty():
+                    break
+                continue
+            if isinstance(item, _EndOfStream):
+                break
+            if isinstance(item, _StageFailure):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+
+    thread.join()
+
+
+def poll_items(
+    items: Iterator[Any], timeout: Callable[[], float | None], name: str = "poll"
+) -> Iterator[Any | None]:
+    """
+    Iterates over items, giving up waiting for the next item after a timeout
+
+    A background thread pulls items from upstream, so that the consumer is not
+    blocked when no item is available. Exceptions raised upstream (including
+    `SystemExit`) are re-raised in the consuming thread
+
+    Arguments:
+
+        items: An iterator over the upstream items
+
+        timeout: A function, called before waiting for each item, that returns the
+            maximum time to wait for the item, in seconds, or None to wait
+            indefinitely
+
+        name: A name for the background thread
+
+    Yields:
+
+        item: The upstream items, in their original order, or None when no item
+            arrived before the timeout expired
+    """
+    queue: Queue[Any]
+    stop: Event
+    thread: Thread
+    queue, stop, thread = _start_producer(items, 1, name)
+
+    try:
+        while True:
+            wait: float | None = timeout()
+            try:
+                item: Any = queue.get(
+                    timeout=max(wait, 0.0) if wait is not None else 1.0
+                )
+            except Empty:
+                if not thread.is_alive() and queue.empty():
+                    break
+                if wait is not None:
+                    yield None
+                continue
+            if isinstance(item, _EndOfStream):
+                break
+            if isinstance(item, _StageFailure):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+
+    thread.join()
+
+
+@stream
+def stage_input(items: Iterator[Any], statistics: StageStatistics) -> Iterator[Any]:
+    """
+    Measures the time a stage of the data workflow spends waiting for its input
+
+    This function must be placed right before the stage in the stream. It records
+    the time spent waiting for each item from upstream
+
+    Arguments:
+
+        items: An iterator over the input items of the stage
+
+        statistics: The statistics of the stage
+
+    Yields:
+
+        item: The input items, unchanged
+    """
+    iterator: Iterator[Any] = iter(items)
+    while True:
+        start: float = perf_counter()
+        try:
+            item: Any = next(iterator)
+        except StopIteration:
+            statistics.record_upstream_wait(perf_counter() - start)
+            return
+        statistics.record_upstream_wait(perf_counter() - start)
+        yield item
+
+
+@stream
+def stage_output(items: Iterator[Any], statistics: StageStatistics) -> Iterator[Any]:
+    """
+    Measures the time a stage of the data workflow spends producing its output
+
+    This function must be placed right after the stage in the stream. It records
+    the time needed by the stage to produce each item (which, together with the
+    input wait time recorded by `stage_input`, determines the busy time of the
+    stage), the time spent waiting for downstream stages to accept each item, and
+    the number and size of the produced items
+
+    Arguments:
+
+        items: An iterator over the output items of the stage
+
+        statistics: The statistics of the stage
+
+    Yields:
+
+        item: The output items, unchanged
+    """
+    iterator: Iterator[Any] = iter(items)
+    statistics.record_start()
+    while True:
+        start: float = perf_counter()
+        try:
+            item: Any = next(iterator)
+        except StopIteration:
+            statistics.record_stop(perf_counter() - start)
+            return
+        produced: float = perf_counter()
+        statistics.record_item(produced - start, data_size(item))
+        yield item
+        statistics.record_downstream_wait(perf_counter() - produced)
+
+
+@stream
+def message_emission(items: Iterator[Any], reporter: RateReporter) -> Iterator[Any]:
+    """
+    Records the time at which the data serializer emits each serialized message
+
+    Arguments:
+
+        items: An iterator over the serialized messages
+
+        reporter: The rate reporter that records the message latencies
+
+    Yields:
+
+        item: The serialized messages, unchanged
+    """
+    item: Any
+    for item in items:
+        reporter.message_emitted()
+        yield item
+
+
+@stream
+def message_completion(items: Iterator[Any], reporter: RateReporter) -> Iterator[Any]:
+    """
+    Records the time at which the data handlers are done with each serialized
+    message
+
+    Arguments:
+
+        items: An iterator over the serialized messages
+
+        reporter: The rate reporter that records the message latencies
+
+    Yields:
+
+        item: The serialized messages, unchanged
+    """
+    item: Any
+    for item in items:
+        reporter.message_handled()
+        yield item
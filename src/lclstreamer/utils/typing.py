@@ -1,7 +1,12 @@
 import numpy
 from numpy.typing import NDArray
-from typing_extensions import Any, TypeAlias
+from typing_extensions import Any, Buffer, TypeAlias
 
 StrFloatIntNDArray: TypeAlias = NDArray[
     numpy.str_ | numpy.floating[Any] | numpy.signedinteger[Any]
 ]
+
+# A serialized message: a single buffer, or a list of buffers forming a multipart
+# message. Buffers are any objects supporting the buffer protocol (bytes,
+# memoryview, numpy arrays, ...)
+SerializedData: TypeAlias = Buffer | list[Buffer]
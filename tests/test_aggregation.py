@@ -0,0 +1,50 @@
+from time import perf_counter, sleep
+
+from lclstreamer.utils.aggregation import MpiStatisticsAggregator
+from lclstreamer.utils.statistics import StageStatistics
+
+
+def test_mpi_statistics_aggregator() -> None:
+    events: StageStatistics = StageStatistics("event_source")
+    messages: StageStatistics = StageStatistics("data_serializer")
+    aggregator: MpiStatisticsAggregator = MpiStatisticsAggregator(
+        events=events, messages=messages, interval_seconds=0.0
+    )
+
+    events.items = 100
+    messages.bytes = 2_000_000
+    report = aggregator.update()
+    assert report is not None
+    assert report["workers"] == 1
+    assert report["events"] == 100
+    assert report["slowest_worker"] == 0
+    assert report["min_worker_events/s"] == report["max_worker_events/s"]
+
+    events.items = 150
+    final_report = aggregator.finalize(timeout=1.0)
+    assert final_report is not None
+    assert final_report["events"] == 150
+    assert final_report["cumulative_events/s"] > 0
+
+
+def test_mpi_statistics_aggregator_background_thread() -> None:
+    events: StageStatistics = StageStatistics("event_source")
+    messages: StageStatistics = StageStatistics("data_serializer")
+    reports: list[dict[str, int | float]] = []
+    aggregator: MpiStatisticsAggregator = MpiStatisticsAggregator(
+        events=events,
+        messages=messages,
+        interval_seconds=0.01,
+        report=reports.append,
+    )
+
+    # Reports are emitted without any call to `update`
+    events.items = 10
+    deadline: float = perf_counter() + 5.0
+    while len(reports) == 0 and perf_counter() < deadline:
+        sleep(0.01)
+    final_report = aggregator.finalize(timeout=1.0)
+    assert len(reports) > 0
+    assert reports[0]["reporting_workers"] == 1
+    assert final_report is not None
+    assert final_report["events"] == 10
@@ -0,0 +1,48 @@
+from pathlib import Path
+from threading import Event
+
+import numpy
+
+from lclstreamer.data_handlers.common.background_sender import BackgroundSender
+from lclstreamer.utils.typing import SerializedData
+
+
+def test_background_sender_spills_and_replays_in_order(tmp_path: Path) -> None:
+    consumer_ready: Event = Event()
+    sent: list[list[bytes]] = []
+
+    def send(data: SerializedData) -> None:
+        consumer_ready.wait()
+        parts: list[SerializedData] = data if isinstance(data, list) else [data]
+        sent.append([bytes(part) for part in parts])
+
+    sender: BackgroundSender = BackgroundSender(
+        send, queue_size=2, spill_directory=tmp_path / "spill"
+    )
+    messages: list[SerializedData] = [
+        b"first",
+        [b"header", numpy.arange(3, dtype=numpy.uint8)],
+        b"third",
+        [b"header", b""],
+        b"fifth",
+        b"sixth",
+    ]
+    message: SerializedData
+    for message in messages:
+        # Queueing does not wait for the stalled consumer
+        sender(message)
+    assert sender.statistics()["spilled"] >= 3
+    assert len(list((tmp_path / "spill").iterdir())) >= 3
+
+    consumer_ready.set()
+    sender.close()
+    assert sent == [
+        [b"first"],
+        [b"header", b"\x00\x01\x02"],
+        [b"third"],
+        [b"header", b""],
+        [b"fifth"],
+        [b"sixth"],
+    ]
+    assert sender.statistics()["spilled"] == 0
+    assert list((tmp_path / "spill").iterdir()) == []
@@ -0,0 +1,75 @@
+import time
+from collections.abc import Iterator
+
+import numpy
+
+from lclstreamer.models.parameters import BatchProcessingPipelineParameters
+from lclstreamer.processing_pipelines.common.adaptive_batch_size import (
+    AdaptiveBatchSize,
+)
+from lclstreamer.processing_pipelines.generic.generic import BatchProcessingPipeline
+from lclstreamer.utils.typing import StrFloatIntNDArray
+
+
+def _events(
+    number_of_events: int, pause_after: int = -1, pause: float = 0.0
+) -> Iterator[dict[str, StrFloatIntNDArray | None]]:
+    event_index: int
+    for event_index in range(number_of_events):
+        yield {"data": numpy.full((10,), event_index, dtype=numpy.float32)}
+        if event_index == pause_after:
+            time.sleep(pause)
+
+
+def test_batch_size_trigger() -> None:
+    pipeline: BatchProcessingPipeline = BatchProcessingPipeline(
+        BatchProcessingPipelineParameters(type="BatchProcessingPipeline", batch_size=4)
+    )
+    sizes: list[int] = [len(batch["data"]) for batch in pipeline(_events(10))]  # type: ignore[arg-type]
+    assert sizes == [4, 4, 2]
+
+
+def test_batch_bytes_trigger() -> None:
+    pipeline: BatchProcessingPipeline = BatchProcessingPipeline(
+        BatchProcessingPipelineParameters(
+            type="BatchProcessingPipeline", batch_size=4, max_batch_bytes=80
+        )
+    )
+    sizes: list[int] = [len(batch["data"]) for batch in pipeline(_events(5))]  # type: ignore[arg-type]
+    assert sizes == [2, 2, 1]
+
+
+def test_batch_latency_trigger() -> None:
+    pipeline: BatchProcessingPipeline = BatchProcessingPipeline(
+        BatchProcessingPipelineParameters(
+            type="BatchProcessingPipeline", batch_size=10, max_batch_latency_ms=100
+        )
+    )
+    start: float = time.perf_counter()
+    first_batch = next(pipeline(_events(5, pause_after=1, pause=2.0)))
+    assert first_batch["data"] is not None and len(first_batch["data"]) == 2
+    assert time.perf_counter() - start < 1.0
+
+
+def test_adaptive_batch_size() -> None:
+    adaptive_batch_size: AdaptiveBatchSize = AdaptiveBatchSize(
+        initial_batch_size=4,
+        min_batch_size=1,
+        max_batch_size=64,
+        target_batch_bytes=1000,
+        target_batch_latency=0.0,
+    )
+    for _ in range(20):
+        batch_size: int = adaptive_batch_size.batch_size
+        adaptive_batch_size.update(
+            events=batch_size, batch_bytes=batch_size * 40, downstream_time=0.001
+        )
+    assert adaptive_batch_size.batch_size == 25
+
+    # The batch size never leaves the configured bounds
+    for _ in range(20):
+        batch_size = adaptive_batch_size.batch_size
+        adaptive_batch_size.update(
+            events=batch_size, batch_bytes=batch_size * 1, downstream_time=0.001
+        )
+    assert adaptive_batch_size.batch_size == 64
@@ -0,0 +1,120 @@
+from time import perf_counter
+
+import numpy
+import pynng  # pyright: ignore[reportMissingTypeStubs]
+import pytest
+import zmq
+from pydantic import ValidationError
+
+from lclstreamer.data_handlers.streaming.binary import BinaryDataStreamingDataHandler
+from lclstreamer.models.parameters import BinaryDataStreamingDataHandlerParameters
+
+
+def test_nng_push_handler() -> None:
+    url: str = "tcp://127.0.0.1:16001"
+    handler: BinaryDataStreamingDataHandler = BinaryDataStreamingDataHandler(
+        BinaryDataStreamingDataHandlerParameters(
+            type="BinaryDataStreamingDataHandler",
+            urls=[url],
+            library="nng",
+        )
+    )
+    with pynng.Pull0(dial=url, recv_timeout=5000) as receiver:
+        handler(b"single buffer")
+        handler([b"header", numpy.arange(4, dtype=numpy.uint8)])
+        assert receiver.recv() == b"single buffer"
+        # The parts of a multipart message are joined into a single NNG message
+        assert receiver.recv() == b"header\x00\x01\x02\x03"
+
+
+def test_zmq_handler_only_supports_push() -> None:
+    with pytest.raises(ValidationError):
+        BinaryDataStreamingDataHandlerParameters(
+            type="BinaryDataStreamingDataHandler",
+            urls=["tcp://127.0.0.1:16002"],
+            socket_type="pub",
+        )
+
+
+def test_zmq_router_handler_credits() -> None:
+    url: str = "tcp://127.0.0.1:16003"
+    handler: BinaryDataStreamingDataHandler = BinaryDataStreamingDataHandler(
+        BinaryDataStreamingDataHandlerParameters(
+            type="BinaryDataStreamingDataHandler",
+            urls=[url],
+            socket_type="router",
+        )
+    )
+    context: zmq.Context[zmq.Socket[bytes]] = zmq.Context()
+    fast: zmq.Socket[bytes] = context.socket(zmq.DEALER)
+    slow: zmq.Socket[bytes] = context.socket(zmq.DEALER)
+    fast.connect(url)
+    slow.connect(url)
+    fast.send(b"1")
+    # The slow consumer accepts three messages, and never acknowledges them
+    slow.send(b"3")
+
+    fast_messages: list[list[bytes]] = []
+    index: int
+    for index in range(10):
+        handler([b"header", str(index).encode()])
+        if fast.poll(100) != 0:
+            fast_messages.append(fast.recv_multipart())
+            fast.send(b"1")
+    slow_messages: list[list[bytes]] = []
+    while slow.poll(100) != 0:
+        slow_messages.append(slow.recv_multipart())
+
+    assert 1 <= len(slow_messages) <= 3
+    assert len(fast_messages) + len(slow_messages) == 10
+    assert fast_messages[0][0] == b"header"
+
+    statistics: dict[str, int | float] = handler.statistics()
+    # The acknowledgement of the last message received by the fast consumer might
+    # not have reached the data handler yet
+    assert statistics["consumer_0_lag"] + statistics["consumer_1_lag"] in (
+        len(slow_messages),
+        len(slow_messages) + 1,
+    )
+    assert statistics["consumer_0_items_per_s"] > 0
+
+    fast.close(linger=0)
+    slow.close(linger=0)
+    context.term()
+
+
+def test_zmq_router_handler_close_interrupts_credit_wait() -> None:
+    handler: BinaryDataStreamingDataHandler = BinaryDataStreamingDataHandler(
+        BinaryDataStreamingDataHandlerParameters(
+            type="BinaryDataStreamingDataHandler",
+            urls=["tcp://127.0.0.1:16004"],
+            socket_type="router",
+            background_sending=True,
+        )
+    )
+    # No consumer ever grants credits: the background sender waits for them until
+    # the data handler is closed
+    handler(b"never sent")
+    start_time: float = perf_counter()
+    handler.close()
+    assert perf_counter() - start_time < 5.0
+
+
+def test_nng_handler_close_without_receiver() -> None:
+    handler: BinaryDataStreamingDataHandler = BinaryDataStreamingDataHandler(
+        BinaryDataStreamingDataHandlerParameters(
+            type="BinaryDataStreamingDataHandler",
+            urls=["tcp://127.0.0.1:16005"],
+            library="nng",
+            send_high_water_mark=0,
+            background_sending=True,
+        )
+    )
+    # No receiver ever connects: the sends never complete, until the data handler
+    # is closed and they are cancelled
+    index: int
+    for index in range(4):
+        handler(str(index).encode())
+    start_time: float = perf_counter()
+    handler.close()
+    assert perf_counter() - start_time < 10.0
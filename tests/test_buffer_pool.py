@@ -0,0 +1,45 @@
+import gc
+
+import numpy
+from numpy.typing import NDArray
+
+from lclstreamer.data_serializers.common.buffer_pool import BufferPool
+from lclstreamer.data_serializers.common.file_image import FileImage
+
+
+def test_buffer_pool_reuses_released_buffers() -> None:
+    pool: BufferPool = BufferPool()
+    buffer: NDArray[numpy.uint8] = pool.acquire(1000)
+    assert buffer.nbytes == 1000
+    address: int = buffer.ctypes.data
+
+    # A buffer still in use, also through a view, is not handed out again
+    view: memoryview = memoryview(buffer[:10])
+    del buffer
+    gc.collect()
+    other: NDArray[numpy.uint8] = pool.acquire(1000)
+    assert other.ctypes.data != address
+
+    del view
+    gc.collect()
+    reused: NDArray[numpy.uint8] = pool.acquire(900)
+    assert reused.ctypes.data == address
+    assert reused.nbytes == 900
+
+    # A buffer much larger than the request is not reused
+    del reused
+    gc.collect()
+    assert pool.acquire(100).ctypes.data != address
+
+
+def test_file_image_with_buffer_pool() -> None:
+    pool: BufferPool = BufferPool()
+    file_image: FileImage = FileImage(initial_size=4, buffer_pool=pool)
+    file_image.write(b"abc")
+    file_image.seek(6)
+    file_image.write(b"def")
+    file_image.truncate(12)
+    assert len(file_image) == 12
+    assert file_image.getbuffer().tobytes() == b"abc\0\0\0def\0\0\0"
+    file_image.seek(0)
+    assert file_image.read(3) == b"abc"
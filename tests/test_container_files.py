@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import numpy
+
+from lclstreamer.data_handlers.files.binary import BinaryFileWritingDataHandler
+from lclstreamer.data_handlers.files.container import (
+    ContainerFileReader,
+    ContainerFileWriter,
+)
+from lclstreamer.models.parameters import BinaryFileWritingDataHandlerParameters
+
+
+def test_container_files_roll_over_by_size(tmp_path: Path) -> None:
+    handler: BinaryFileWritingDataHandler = BinaryFileWritingDataHandler(
+        BinaryFileWritingDataHandlerParameters(
+            type="BinaryFileWritingDataHandler",
+            write_directory=tmp_path,
+            container_files=True,
+            max_container_file_size=200,
+        )
+    )
+    blobs: list[bytes] = [bytes([index]) * 100 for index in range(5)]
+    blob: bytes
+    for blob in blobs:
+        # The parts of a multipart message are stored as a single blob
+        handler([blob[:10], numpy.frombuffer(blob[10:], dtype=numpy.uint8)])
+    handler.close()
+
+    filenames: list[Path] = sorted(tmp_path.iterdir())
+    assert [filename.name for filename in filenames] == [
+        "r0_0.h5.container",
+        "r0_1.h5.container",
+        "r0_2.h5.container",
+    ]
+    read_blobs: list[bytes] = []
+    filename: Path
+    for filename in filenames:
+        with ContainerFileReader(filename) as reader:
+            read_blobs.extend(reader)
+    assert read_blobs == blobs
+
+    with ContainerFileReader(filenames[0]) as reader:
+        assert len(reader) == 2
+        assert reader[1] == blobs[1]
+        assert reader[-1] == blobs[1]
+
+
+def test_container_file_without_index(tmp_path: Path) -> None:
+    writer: ContainerFileWriter = ContainerFileWriter(tmp_path / "unclosed.container")
+    writer.write([memoryview(b"first")])
+    writer.write([memoryview(b"second"), memoryview(b"")])
+    # The writer is not closed: the index is rebuilt by scanning the file
+    with ContainerFileReader(tmp_path / "unclosed.container") as reader:
+        assert list(reader) == [b"first", b"second"]
+        assert reader[1] == b"second"
+    writer.close()
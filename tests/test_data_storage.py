@@ -0,0 +1,89 @@
+from threading import Thread
+from typing import Any
+
+import numpy
+import pytest
+
+from lclstreamer.processing_pipelines.common import data_storage as data_storage_module
+from lclstreamer.processing_pipelines.common.data_storage import DataStorage
+
+
+def test_data_storage() -> None:
+    data_storage: DataStorage = DataStorage(capacity=3)
+    data_storage.add_data(
+        {
+            "image": numpy.ones((4, 5), dtype=numpy.float32),
+            "count": numpy.array(3),
+            "label": numpy.array("ab"),
+        }
+    )
+    data_storage.add_data({"image": None, "count": None, "label": None})
+    assert len(data_storage) == 2
+
+    batch = data_storage.retrieve_stored_data()
+    assert batch["image"] is not None and batch["image"].shape == (2, 4, 5)
+    assert batch["image"].dtype == numpy.float32
+    assert numpy.isnan(batch["image"][1]).all()
+    assert list(batch["count"]) == [3, -999]  # type: ignore[arg-type]
+    assert list(batch["label"]) == ["ab", "None"]  # type: ignore[arg-type]
+
+    # Data added after a reset must not overwrite the retrieved batch
+    data_storage.reset_data_storage()
+    data_storage.add_data(
+        {
+            "image": numpy.zeros((4, 5), dtype=numpy.float32),
+            "count": numpy.array(5),
+            "label": numpy.array("cd"),
+        }
+    )
+    assert len(data_storage) == 1
+    assert (batch["image"][0] == 1).all()
+    next_batch = data_storage.retrieve_stored_data()
+    assert next_batch["count"] is not None and list(next_batch["count"]) == [5]
+
+
+def test_data_storage_buffer_ring() -> None:
+    data_storage: DataStorage = DataStorage(capacity=2, number_of_buffers=2)
+    event = {"image": numpy.ones((4, 5), dtype=numpy.float32)}
+
+    data_storage.add_data(event)
+    first_batch = data_storage.retrieve_stored_data()
+    data_storage.reset_data_storage()
+    data_storage.add_data(event)
+    second_batch = data_storage.retrieve_stored_data()
+    assert first_batch["image"] is not None and second_batch["image"] is not None
+    assert not numpy.shares_memory(first_batch["image"], second_batch["image"])
+
+    # Once the first batch is released, its buffer is reused
+    first_pointer: int = first_batch["image"].__array_interface__["data"][0]
+    del first_batch
+    data_storage.reset_data_storage()
+    data_storage.add_data(event)
+    third_batch = data_storage.retrieve_stored_data()
+    assert third_batch["image"] is not None
+    assert third_batch["image"].__array_interface__["data"][0] == first_pointer
+
+
+def test_data_storage_buffer_ring_growth_is_capped(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(data_storage_module, "_RELEASE_TIMEOUT", 0.05)
+    data_storage: DataStorage = DataStorage(capacity=1, number_of_buffers=2)
+    event = {"image": numpy.ones((4, 5), dtype=numpy.float32)}
+
+    # The ring grows up to twice its initial size while the batches are held
+    batches: list[dict[str, Any]] = []
+    for _ in range(4):
+        data_storage.reset_data_storage()
+        data_storage.add_data(event)
+        batches.append(data_storage.retrieve_stored_data())
+
+    # Beyond that, it waits for a batch to be released
+    waiting: Thread = Thread(target=data_storage.reset_data_storage)
+    waiting.start()
+    waiting.join(timeout=0.3)
+    assert waiting.is_alive()
+    batches.pop(0)
+    waiting.join(timeout=5.0)
+    assert not waiting.is_alive()
+    assert len(data_storage._buffers) == 4
@@ -0,0 +1,33 @@
+from threading import Event
+
+from lclstreamer.data_handlers.common.fan_out import DataHandlerFanOut
+from lclstreamer.utils.typing import SerializedData
+
+
+def test_fan_out_bounds_each_data_handler_separately() -> None:
+    fast_caught_up: Event = Event()
+    fast: list[bytes] = []
+    slow: list[bytes] = []
+    slow_waits: list[bool] = []
+
+    def fast_handler(data: SerializedData) -> None:
+        fast.append(bytes(data))
+        if len(fast) == 3:
+            fast_caught_up.set()
+
+    def slow_handler(data: SerializedData) -> None:
+        if not slow:
+            # The fast data handler gets its own slots while this message is
+            # still in progress
+            slow_waits.append(fast_caught_up.wait(timeout=10.0))
+        slow.append(bytes(data))
+
+    messages: list[bytes] = [f"message {index}".encode() for index in range(6)]
+    fan_out: DataHandlerFanOut = DataHandlerFanOut(
+        [fast_handler, slow_handler], max_in_flight=2
+    )
+
+    assert list(fan_out(iter(messages))) == messages
+    assert slow_waits == [True]
+    assert fast == messages
+    assert slow == messages
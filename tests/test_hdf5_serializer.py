@@ -0,0 +1,172 @@
+import time
+from io import BytesIO
+
+import h5py
+import numpy
+import pytest
+from pydantic import ValidationError
+
+from lclstreamer.data_serializers.files.hdf5 import HDF5BinarySerializer
+from lclstreamer.models.parameters import (
+    HDF5BinarySerializerParameters,
+    HDF5FieldParameters,
+)
+
+
+def _batches() -> list[dict[str, numpy.ndarray | None]]:
+    rng: numpy.random.Generator = numpy.random.default_rng(0)
+    return [
+        {
+            "detector_data": rng.random((4, 64, 64), dtype=numpy.float32),
+            "timestamp": numpy.arange(4, dtype=numpy.float64) + 4 * batch_index,
+        }
+        for batch_index in range(3)
+    ]
+
+
+def test_hdf5_serializer_zero_copy_output() -> None:
+    serializer: HDF5BinarySerializer = HDF5BinarySerializer(
+        HDF5BinarySerializerParameters(
+            type="HDF5BinarySerializer",
+            compression="gzip",
+            fields={"detector_data": "/data/data", "timestamp": "/data/timestamp"},
+            zero_copy_output=True,
+        )
+    )
+    batches = _batches()
+    blobs = list(serializer(iter(batches)))  # type: ignore[arg-type]
+    assert len(blobs) == len(batches)
+
+    blob: bytes | memoryview
+    for blob, batch in zip(blobs, batches):
+        assert isinstance(blob, memoryview)
+        with h5py.File(BytesIO(blob), "r") as fh:
+            assert numpy.array_equal(fh["/data/data"][:], batch["detector_data"])  # type: ignore[index]
+            assert numpy.array_equal(fh["/data/timestamp"][:], batch["timestamp"])  # type: ignore[index]
+
+
+def test_hdf5_serializer_parallel_compression() -> None:
+    compression: str
+    for compression in (
+        "gzip",
+        "gzip_with_shuffle",
+        "bitshuffle_with_lz4",
+        "bitshuffle_with_zstd",
+    ):
+        serializer: HDF5BinarySerializer = HDF5BinarySerializer(
+            HDF5BinarySerializerParameters(
+                type="HDF5BinarySerializer",
+                compression=compression,  # type: ignore[arg-type]
+                fields={"detector_data": "/data/data", "timestamp": "/data/timestamp"},
+                number_of_compression_threads=2,
+            )
+        )
+        batches = _batches()
+        blob: bytes | memoryview
+        for blob, batch in zip(serializer(iter(batches)), batches):  # type: ignore[arg-type]
+            with h5py.File(BytesIO(blob), "r") as fh:
+                assert numpy.array_equal(fh["/data/data"][:], batch["detector_data"])  # type: ignore[index]
+                assert numpy.array_equal(fh["/data/timestamp"][:], batch["timestamp"])  # type: ignore[index]
+
+
+def test_hdf5_serializer_field_policies() -> None:
+    number_of_compression_threads: int
+    for number_of_compression_threads in (0, 2):
+        serializer: HDF5BinarySerializer = HDF5BinarySerializer(
+            HDF5BinarySerializerParameters(
+                type="HDF5BinarySerializer",
+                compression="bitshuffle_with_lz4",
+                fields={
+                    "detector_data": HDF5FieldParameters(
+                        path="/data/data", chunks=[1, 48, 40], dtype="float64"
+                    ),
+                    "timestamp": HDF5FieldParameters(
+                        path="/data/timestamp", chunks="contiguous"
+                    ),
+                },
+                number_of_compression_threads=number_of_compression_threads,
+            )
+        )
+        batches = _batches()
+        blob: bytes | memoryview
+        for blob, batch in zip(serializer(iter(batches)), batches):  # type: ignore[arg-type]
+            with h5py.File(BytesIO(blob), "r") as fh:
+                detector_data: h5py.Dataset = fh["/data/data"]  # type: ignore[assignment]
+                assert detector_data.chunks == (1, 48, 40)
+                assert detector_data.dtype == numpy.float64
+                assert numpy.array_equal(detector_data[:], batch["detector_data"])
+                timestamp: h5py.Dataset = fh["/data/timestamp"]  # type: ignore[assignment]
+                assert timestamp.chunks is None
+                assert timestamp.compression is None
+                assert numpy.array_equal(timestamp[:], batch["timestamp"])
+
+
+def test_hdf5_serializer_incompressible_blocks() -> None:
+    rng: numpy.random.Generator = numpy.random.default_rng(0)
+    serializer: HDF5BinarySerializer = HDF5BinarySerializer(
+        HDF5BinarySerializerParameters(
+            type="HDF5BinarySerializer",
+            compression="gzip",
+            fields={"noise": "/data/noise", "zeros": "/data/zeros"},
+            min_compression_ratio=1.05,
+        )
+    )
+    batch: dict[str, numpy.ndarray | None] = {
+        "noise": rng.integers(0, 256, size=(4, 64, 64), dtype=numpy.uint8),
+        "zeros": numpy.zeros((4, 64, 64), dtype=numpy.uint8),
+    }
+    blob: bytes | memoryview = next(serializer(iter([batch])))  # type: ignore[arg-type]
+
+    with h5py.File(BytesIO(blob), "r") as fh:
+        assert fh["/data/noise"].compression is None  # type: ignore[union-attr]
+        assert fh["/data/zeros"].compression == "gzip"  # type: ignore[union-attr]
+        assert numpy.array_equal(fh["/data/noise"][:], batch["noise"])  # type: ignore[index]
+    assert serializer.statistics() == {"incompressible_blocks": 1}
+
+
+def test_hdf5_serializer_min_compression_ratio_requires_sampled_field() -> None:
+    with pytest.raises(ValidationError):
+        HDF5BinarySerializerParameters(
+            type="HDF5BinarySerializer",
+            compression="zfp",
+            fields={"detector_data": "/data/data"},
+            min_compression_ratio=1.05,
+        )
+    # A single field compressed with a supported algorithm is enough
+    HDF5BinarySerializerParameters(
+        type="HDF5BinarySerializer",
+        compression="zfp",
+        fields={
+            "detector_data": "/data/data",
+            "mask": HDF5FieldParameters(path="/data/mask", compression="gzip"),
+        },
+        min_compression_ratio=1.05,
+    )
+
+
+def test_hdf5_serializer_adaptive_compression() -> None:
+    serializer: HDF5BinarySerializer = HDF5BinarySerializer(
+        HDF5BinarySerializerParameters(
+            type="HDF5BinarySerializer",
+            compression="gzip",
+            compression_level=3,
+            fields={"detector_data": "/data/data", "timestamp": "/data/timestamp"},
+            adaptive_compression=True,
+            min_compression_level=1,
+            max_compression_level=4,
+        )
+    )
+    assert serializer.statistics() == {"compression_level": 3}
+
+    # A slow consumer: the serializer mostly waits for the data handlers
+    blob: bytes | memoryview
+    for blob in serializer(iter(_batches() * 4)):  # type: ignore[arg-type]
+        time.sleep(0.05)
+    assert serializer.statistics() == {"compression_level": 4}
+
+    # A fast consumer: the serializer is the bottleneck
+    for blob in serializer(iter(_batches() * 4)):  # type: ignore[arg-type]
+        pass
+    assert serializer.statistics()["compression_level"] < 4
+    with h5py.File(BytesIO(blob), "r") as fh:
+        assert fh["/data/data"].compression_opts < 4  # type: ignore[union-attr]
@@ -41,6 +41,19 @@ data_handlers:
       write_directory: output
 """
 
+configuration_threaded: str = (
+    configuration
+    + """
+execution:
+    mode: threaded
+    event_source_queue_depth: 8
+    processing_pipeline_queue_depth: 2
+    data_serializer_queue_depth: 2
+    concurrent_data_handlers: true
+    data_handler_max_in_flight: 2
+"""
+)
+
 configuration_err: str = """
 source_identifier: ""
 skip_incomplete_events: false
@@ -91,6 +104,24 @@ def test_app() -> None:
         assert result.exit_code == 0
 
 
+def test_app_threaded() -> None:
+    with runner.isolated_filesystem():
+        current_directory: Path = Path.cwd()
+        Path(current_directory / "output").mkdir()
+        configuration_file_name: Path = current_directory / "lclstreamer.yaml"
+        configuration_file_name.write_text(configuration_threaded, "utf-8")
+        result: Result = runner.invoke(app, ["--config", str(configuration_file_name)])
+        print("--- Output")
+        print(result.output)
+        if result.exception is not None and result.exc_info is not None:
+            print("--- Exceptions")
+            print(result.exception)
+            traceback.print_tb(result.exc_info[2])
+
+        assert result.exit_code == 0
+        assert len(list(Path(current_directory / "output").iterdir())) == 100
+
+
 def test_parse_error() -> None:
     with runner.isolated_filesystem():
         current_directory: Path = Path.cwd()
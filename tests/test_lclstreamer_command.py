@@ -18,3 +18,15 @@ def test_app() -> None:
         traceback.print_tb(result.exc_info[2])
 
     assert result.exit_code == 0
+
+
+def test_tune_compression() -> None:
+    result: Result = runner.invoke(app, ["tune-compression", "--help"])
+    print("--- Output")
+    print(result.output)
+    if result.exception is not None and result.exc_info is not None:
+        print("--- Exceptions")
+        print(result.exception)
+        traceback.print_tb(result.exc_info[2])
+
+    assert result.exit_code == 0
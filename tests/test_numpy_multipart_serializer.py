@@ -0,0 +1,92 @@
+from pathlib import Path
+from typing import Any
+
+import numpy
+from numpy.typing import NDArray
+
+from lclstreamer.data_handlers.files.binary import BinaryFileWritingDataHandler
+from lclstreamer.data_serializers.generic.multipart import (
+    NumpyMultipartSerializer,
+    decode_numpy_multipart,
+)
+from lclstreamer.models.parameters import (
+    BinaryFileWritingDataHandlerParameters,
+    NumpyMultipartSerializerParameters,
+)
+
+
+def _batch() -> dict[str, Any]:
+    rng: numpy.random.Generator = numpy.random.default_rng(0)
+    return {
+        "detector_data": rng.integers(0, 100, size=(4, 32, 32), dtype=numpy.uint16),
+        "timestamp": numpy.arange(4, dtype=numpy.float64),
+        "run_info": numpy.array(["a", "bb", "ccc", "dddd"]),
+        "missing": None,
+    }
+
+
+def test_numpy_multipart_serializer_zero_copy() -> None:
+    serializer: NumpyMultipartSerializer = NumpyMultipartSerializer(
+        NumpyMultipartSerializerParameters(type="NumpyMultipartSerializer")
+    )
+    batch: dict[str, Any] = _batch()
+    message: list[Any] = next(serializer(iter([batch])))
+
+    assert len(message) == 4
+    assert numpy.shares_memory(message[1], batch["detector_data"])
+
+    metadata: dict[str, Any]
+    data: dict[str, NDArray[Any]]
+    metadata, data = decode_numpy_multipart(message)
+    assert metadata["events"] == 4
+    assert metadata["message_id"] == 0
+    assert data.keys() == {"detector_data", "timestamp", "run_info"}
+    name: str
+    for name in data:
+        assert data[name].dtype == batch[name].dtype
+        assert numpy.array_equal(data[name], batch[name])
+
+
+def test_numpy_multipart_serializer_compression() -> None:
+    compression: str
+    for compression in ("bitshuffle_with_lz4", "bitshuffle_with_zstd"):
+        serializer: NumpyMultipartSerializer = NumpyMultipartSerializer(
+            NumpyMultipartSerializerParameters(
+                type="NumpyMultipartSerializer",
+                fields=["detector_data", "run_info"],
+                compression=compression,  # type: ignore[arg-type]
+            )
+        )
+        batch: dict[str, Any] = _batch()
+        message: list[Any] = next(serializer(iter([batch])))
+        assert len(message) == 3
+        assert message[1].nbytes < batch["detector_data"].nbytes
+
+        data: dict[str, NDArray[Any]] = decode_numpy_multipart(message)[1]
+        assert numpy.array_equal(data["detector_data"], batch["detector_data"])
+        assert numpy.array_equal(data["run_info"], batch["run_info"])
+
+
+def test_numpy_multipart_serializer_file(tmp_path: Path) -> None:
+    serializer: NumpyMultipartSerializer = NumpyMultipartSerializer(
+        NumpyMultipartSerializerParameters(
+            type="NumpyMultipartSerializer", compression="bitshuffle_with_lz4"
+        )
+    )
+    data_handler: BinaryFileWritingDataHandler = BinaryFileWritingDataHandler(
+        BinaryFileWritingDataHandlerParameters(
+            type="BinaryFileWritingDataHandler",
+            file_prefix="",
+            file_suffix="npmp",
+            write_directory=tmp_path,
+        )
+    )
+    batch: dict[str, Any] = _batch()
+    data_handler(next(serializer(iter([batch]))))
+
+    data: dict[str, NDArray[Any]] = decode_numpy_multipart(
+        [(tmp_path / "r0_0.npmp").read_bytes()]
+    )[1]
+    name: str
+    for name in data:
+        assert numpy.array_equal(data[name], batch[name])
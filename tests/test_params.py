@@ -13,3 +13,49 @@ def test_example_params():
         print(f"Reading example config. {path.name}")
         params = yaml.safe_load(path.read_text())
         _ = Parameters.model_validate(params)
+
+
+def test_number_of_batch_buffers_from_queue_depths():
+    params = yaml.safe_load(Path("examples/lclstreamer-internal.yaml").read_text())
+    params["execution"] = {
+        "mode": "threaded",
+        "processing_pipeline_queue_depth": 3,
+        "data_serializer_queue_depth": 4,
+    }
+    params["processing_pipeline"].pop("number_of_batch_buffers", None)
+    assert (
+        Parameters.model_validate(params).processing_pipeline.number_of_batch_buffers
+        == 10
+    )
+
+    params["processing_pipeline"]["number_of_batch_buffers"] = 5
+    assert (
+        Parameters.model_validate(params).processing_pipeline.number_of_batch_buffers
+        == 5
+    )
+
+
+def test_number_of_batch_buffers_with_zero_copy_data_handlers():
+    params = yaml.safe_load(Path("examples/lclstreamer-internal.yaml").read_text())
+    params["processing_pipeline"].pop("number_of_batch_buffers", None)
+    params["data_serializer"] = {"type": "NumpyMultipartSerializer"}
+    params["data_handlers"][0]["send_high_water_mark"] = 4
+    # The ZMQ socket keeps up to SNDHWM views of the batch buffers
+    assert (
+        Parameters.model_validate(params).processing_pipeline.number_of_batch_buffers
+        == 7
+    )
+
+    params["data_handlers"][0]["background_sending"] = True
+    params["data_handlers"][0]["send_queue_size"] = 6
+    assert (
+        Parameters.model_validate(params).processing_pipeline.number_of_batch_buffers
+        == 13
+    )
+
+    # Compressed buffers are copies, and do not hold the batch buffers
+    params["data_serializer"]["compression"] = "bitshuffle_with_lz4"
+    assert (
+        Parameters.model_validate(params).processing_pipeline.number_of_batch_buffers
+        == 3
+    )
@@ -0,0 +1,60 @@
+import os
+from io import BytesIO
+from typing import Any
+
+import h5py
+import numpy
+import pytest
+
+from lclstreamer.data_serializers.common.process_pool import SharedMemoryProcessPool
+from lclstreamer.data_serializers.files.hdf5 import HDF5BinarySerializer
+from lclstreamer.models.parameters import HDF5BinarySerializerParameters
+
+
+class _Worker:
+    def crash(self, data: dict[str, Any]) -> None:
+        os._exit(3)
+
+    def unpicklable_result(self, data: dict[str, Any]) -> Any:
+        return lambda: data
+
+
+def test_hdf5_serializer_with_worker_processes() -> None:
+    serializer: HDF5BinarySerializer = HDF5BinarySerializer(
+        HDF5BinarySerializerParameters(
+            type="HDF5BinarySerializer",
+            compression="gzip",
+            fields={"detector_data": "/data/data"},
+            number_of_worker_processes=2,
+            number_of_compression_threads=2,
+        )
+    )
+    batches: list[dict[str, Any]] = [
+        {"detector_data": numpy.full((4, 16, 16), index, dtype=numpy.float32)}
+        for index in range(5)
+    ]
+    blobs: list[Any] = list(serializer(iter(batches)))
+    assert len(blobs) == len(batches)
+    blob: Any
+    batch: dict[str, Any]
+    for blob, batch in zip(blobs, batches):
+        with h5py.File(BytesIO(blob), "r") as fh:
+            assert numpy.array_equal(fh["/data/data"][:], batch["detector_data"])  # type: ignore[index]
+
+
+def test_process_pool_reports_dead_worker() -> None:
+    pool: SharedMemoryProcessPool = SharedMemoryProcessPool(
+        instance=_Worker(), method_name="crash", num_workers=1
+    )
+    with pytest.raises(RuntimeError):
+        list(pool.map([({"data": numpy.zeros(4)},)]))
+    pool.close()
+
+
+def test_process_pool_reports_unpicklable_result() -> None:
+    pool: SharedMemoryProcessPool = SharedMemoryProcessPool(
+        instance=_Worker(), method_name="unpicklable_result", num_workers=1
+    )
+    with pytest.raises(RuntimeError, match="cannot be sent"):
+        list(pool.map([({"data": numpy.zeros(4)},)]))
+    pool.close()
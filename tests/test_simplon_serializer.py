@@ -0,0 +1,150 @@
+from types import SimpleNamespace
+from typing import Any
+
+import numpy
+import pytest
+from bitshuffle import decompress_lz4  # pyright: ignore[reportMissingTypeStubs]
+from cbor import dumps, loads  # pyright: ignore[reportMissingTypeStubs]
+
+from lclstreamer.data_serializers.dectris import simplon
+from lclstreamer.data_serializers.dectris.simplon import SimplonBinarySerializer
+from lclstreamer.models.parameters import SimplonBinarySerializerParameters
+
+
+def _batch(batch_size: int, first_event: int) -> dict[str, Any]:
+    rng: numpy.random.Generator = numpy.random.default_rng(first_event)
+    return {
+        "detector_data": rng.integers(0, 100, size=(batch_size, 16, 16)) * 1.0,
+        "timestamp": numpy.arange(first_event, first_event + batch_size) * 1.0,
+        "run_info": numpy.array(
+            [["mfx100852324", "2026-01-01", 7, "/sdf/mfx/"]] * batch_size,
+            dtype=object,
+        ),
+        "detector_geometry": numpy.array(
+            [["jungfrau", "geometry"]] * batch_size, dtype=object
+        ),
+    }
+
+
+def _check_messages(
+    serializer: SimplonBinarySerializer,
+    block_size: int,
+    message_ids: list[int] | None = None,
+) -> None:
+    batches: list[dict[str, Any]] = [_batch(4, 0), _batch(3, 4)]
+    messages: list[Any] = [
+        loads(bytes(message[1:])) for message in serializer(iter(batches))
+    ]
+
+    assert [message["type"] for message in messages] == (
+        ["start"] + ["image"] * 7 + ["stop"]
+    )
+    images: list[dict[str, Any]] = messages[1:-1]
+    assert [image["message_id"] for image in images] == (
+        list(range(1, 8)) if message_ids is None else message_ids
+    )
+    assert [image["timestamp"] for image in images] == list(range(7))
+
+    frames: numpy.ndarray = numpy.concatenate(
+        [batch["detector_data"] for batch in batches]
+    )
+    image: dict[str, Any]
+    frame: numpy.ndarray
+    for image, frame in zip(images, frames):
+        decompressed: numpy.ndarray = decompress_lz4(
+            numpy.frombuffer(image["compressed_data"], dtype=numpy.uint8),
+            frame.shape,
+            frame.dtype,
+            block_size,
+        )
+        assert numpy.array_equal(decompressed, frame)
+        assert image["sum"] == frame.sum()
+
+
+def _parameters(**kwargs: Any) -> SimplonBinarySerializerParameters:
+    return SimplonBinarySerializerParameters(
+        type="SimplonBinarySerializer",
+        data_source_to_serialize="detector_data",
+        polarization_fraction=0.99,
+        polarization_axis=[0.0, 1.0, 0.0],
+        data_collection_rate="120 Hz",
+        detector_name="Jungfrau 4M",
+        detector_type="Jungfrau",
+        **kwargs,
+    )
+
+
+def test_simplon_serializer_batches() -> None:
+    _check_messages(SimplonBinarySerializer(_parameters()), block_size=4096)
+
+
+def test_simplon_serializer_compression_threads() -> None:
+    _check_messages(
+        SimplonBinarySerializer(
+            _parameters(number_of_compression_threads=2, compression_block_size=256)
+        ),
+        block_size=256,
+    )
+
+
+def test_simplon_serializer_encoding() -> None:
+    serializer: SimplonBinarySerializer = SimplonBinarySerializer(_parameters())
+    batch: dict[str, Any] = _batch(2, 0)
+    batch["beam_data"] = numpy.array([[0.1, 0.2, 1.0, 2.0, 9500.0]] * 2)
+
+    message: Any
+    for message in serializer(iter([batch])):
+        decoded: dict[str, Any] = loads(bytes(message[1:]))
+        # The hand-assembled encoding matches the encoding of the whole message
+        assert dumps(decoded) == bytes(message[1:])
+        if decoded["type"] == "image":
+            assert decoded["photon_energy"] == 9500.0
+            assert decoded["beam_direction"]["angle_y"] == 0.2
+
+
+def test_simplon_serializer_compression_threads_beam_data_per_batch() -> None:
+    serializer: SimplonBinarySerializer = SimplonBinarySerializer(
+        _parameters(number_of_compression_threads=2)
+    )
+    batches: list[dict[str, Any]] = [_batch(4, 4 * index) for index in range(4)]
+    batch: dict[str, Any]
+    for batch in batches[::2]:
+        batch["beam_data"] = numpy.array([[0.1, 0.2, 1.0, 2.0, 9500.0]] * 4)
+
+    images: list[dict[str, Any]] = [
+        decoded
+        for message in serializer(iter(batches))
+        if (decoded := loads(bytes(message[1:])))["type"] == "image"
+    ]
+
+    # Each frame is encoded with the template of its own batch, even when the
+    # following batch has been read before the frame is compressed
+    assert ["photon_energy" in image for image in images] == (
+        [True] * 4 + [False] * 4 + [True] * 4 + [False] * 4
+    )
+
+
+def test_simplon_serializer_worker_processes() -> None:
+    _check_messages(
+        SimplonBinarySerializer(_parameters(number_of_worker_processes=2)),
+        block_size=4096,
+    )
+
+
+def test_simplon_serializer_message_ids_with_rank_offset(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    # The last of three LCLStreamer workers: its ids are interleaved with the ids
+    # of the other two workers
+    monkeypatch.setattr(
+        simplon,
+        "MPI",
+        SimpleNamespace(
+            COMM_WORLD=SimpleNamespace(Get_rank=lambda: 2, Get_size=lambda: 3)
+        ),
+    )
+    _check_messages(
+        SimplonBinarySerializer(_parameters()),
+        block_size=4096,
+        message_ids=[number * 3 + 2 for number in range(1, 8)],
+    )
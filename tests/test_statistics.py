@@ -0,0 +1,84 @@
+import time
+from array import array
+from threading import Thread
+
+import numpy
+
+from lclstreamer.utils.statistics import (
+    RateReporter,
+    StageStatistics,
+    data_size,
+    stage_statistics_report,
+)
+
+
+def test_data_size() -> None:
+    assert data_size(b"abcd") == 4
+    assert data_size(memoryview(b"abcdef")[2:]) == 4
+    assert data_size({"a": numpy.zeros((2, 3), dtype=numpy.float32), "b": None}) == 24
+    assert data_size([b"ab", numpy.zeros(4, dtype=numpy.uint8)]) == 6
+    assert data_size([bytearray(3), array("d", [1.0, 2.0])]) == 19
+    assert data_size("text") == 0
+
+
+def test_stage_statistics() -> None:
+    busy: StageStatistics = StageStatistics("busy")
+    idle: StageStatistics = StageStatistics("idle")
+    busy.start_time = idle.start_time = time.perf_counter() - 1.0
+    busy.next_time = 0.9
+    idle.next_time = 0.9
+    idle.upstream_wait_time = 0.8
+
+    assert abs(busy.busy_time - 0.9) < 1e-9
+    assert abs(idle.busy_time - 0.1) < 1e-9
+    assert busy.utilization() > idle.utilization()
+    assert stage_statistics_report([idle, busy]).endswith("bottleneck: busy")
+
+
+def test_stage_statistics_updates_from_threads() -> None:
+    statistics: StageStatistics = StageStatistics("threaded")
+    statistics.record_start()
+
+    def produce() -> None:
+        for _ in range(10000):
+            statistics.record_item(1e-6, 1000000)
+
+    producers: list[Thread] = [Thread(target=produce) for _ in range(4)]
+    producer: Thread
+    for producer in producers:
+        producer.start()
+    while any(producer.is_alive() for producer in producers):
+        summary: dict[str, int | float] = statistics.summary()
+        # The item count and the data size are always read from the same update
+        assert summary["MB"] == summary["items"]
+    for producer in producers:
+        producer.join()
+
+    assert statistics.items == 40000
+    assert statistics.bytes == 40000 * 1000000
+
+
+def test_rate_reporter() -> None:
+    events: StageStatistics = StageStatistics("event_source")
+    messages: StageStatistics = StageStatistics("data_serializer")
+    reporter: RateReporter = RateReporter(
+        events=events,
+        messages=messages,
+        interval_seconds=0,
+        interval_messages=3,
+        latency_window=2,
+    )
+
+    for _ in range(3):
+        events.items += 10
+        messages.bytes += 1000
+        reporter.message_emitted()
+        assert not reporter.report_due()
+        reporter.message_handled()
+
+    assert reporter.report_due()
+    report: dict[str, int | float] = reporter.report()
+    assert report["events"] == 30
+    assert report["messages"] == 3
+    assert report["latency_p99_ms"] >= report["latency_p50_ms"] >= 0.0
+    assert not reporter.report_due()
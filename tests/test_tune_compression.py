@@ -0,0 +1,75 @@
+from pathlib import Path
+from typing import Any
+
+import numpy
+import yaml
+from click.testing import Result
+from typer.testing import CliRunner
+
+from lclstreamer.cmd.lclstreamer import app
+from lclstreamer.cmd.tune_compression import _benchmark_simplon
+from lclstreamer.models.parameters import SimplonBinarySerializerParameters
+
+runner: CliRunner = CliRunner()
+
+
+def _tune(tmp_path: Path, target_throughput: float) -> dict[str, Any]:
+    configuration: dict[str, Any] = yaml.safe_load(
+        Path("examples/lclstreamer-internal.yaml").read_text()
+    )
+    configuration["data_sources"]["random"]["array_shape"] = "64,64"
+    config: Path = tmp_path / "lclstreamer.yaml"
+    config.write_text(yaml.safe_dump(configuration))
+    output: Path = tmp_path / f"tuned_{target_throughput}.yaml"
+
+    result: Result = runner.invoke(
+        app,
+        [
+            "tune-compression",
+            "--config",
+            str(config),
+            "--num-events",
+            "40",
+            "--target-throughput",
+            str(target_throughput),
+            "--cores",
+            "1",
+            "--output",
+            str(output),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Recommended setting" in result.output
+    return yaml.safe_load(output.read_text())["data_serializer"]
+
+
+def test_tune_compression_recommendation(tmp_path: Path) -> None:
+    # Without a throughput target, the setting with the best compression ratio is
+    # recommended, which for random floats is never the uncompressed one
+    assert _tune(tmp_path, 0.0)["compression"] is not None
+
+    # With an unreachable target, the fastest setting is recommended
+    tuned: dict[str, Any] = _tune(tmp_path, 1e12)
+    assert tuned["type"] == "HDF5BinarySerializer"
+    assert "compression" in tuned
+
+
+def test_benchmark_simplon_uses_all_frames() -> None:
+    rng: numpy.random.Generator = numpy.random.default_rng(0)
+    frames: numpy.ndarray = rng.integers(0, 2**20, size=(4, 64, 64)) * 1.0
+    # The last frame of the batch is the only one that compresses well
+    frames[-1] = 0.0
+    results = _benchmark_simplon(
+        SimplonBinarySerializerParameters(
+            type="SimplonBinarySerializer",
+            data_source_to_serialize="detector_data",
+            polarization_fraction=0.99,
+            polarization_axis=[0.0, 1.0, 0.0],
+            data_collection_rate="120 Hz",
+            detector_name="Jungfrau 4M",
+            detector_type="Jungfrau",
+        ),
+        [{"detector_data": frames}],
+    )
+    assert len(results) > 0
+    assert all(result.ratio < 4.0 for result in results)